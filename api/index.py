@@ -8,6 +8,16 @@ from pathlib import Path
 # Add backend to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+# Serverless: keep cold starts slim (analytics load on first use, hit /warmup
+# to preload), analyze on threads rather than a process pool, and run no
+# background threads that a frozen function could not keep alive (async jobs
+# go to a standalone `python -m app.jobs` worker, and the peer index is not
+# loaded, so responses carry no peer comparison)
+os.environ.setdefault("WARMUP_ON_STARTUP", "false")
+os.environ.setdefault("ANALYSIS_WORKERS", "0")
+os.environ.setdefault("JOB_WORKERS", "0")
+os.environ.setdefault("PEER_REFRESH_SECONDS", "0")
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from backend.app.main import app as fastapi_app
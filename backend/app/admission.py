@@ -0,0 +1,212 @@
+"""
+Request coalescing and per-API-key admission control for the analyze routes.
+
+Concurrent identical requests (same content hash, industry and field
+selection, i.e. the same result cache key) share one in-flight computation
+instead of each running the pipeline.
+
+Each API key gets a token bucket refilled at ADMISSION_RATE_PER_SECOND up to
+ADMISSION_BURST. Only a request that starts a computation spends tokens (cache
+hits and coalesced followers are free), by kind, so a PDF parse costs more
+than a JSON body. Each key may also have only a few requests of each kind
+computing or waiting on a computation at once. Over either limit the request
+is refused with 429 and ``Retry-After`` rather than queued, so bursts from one
+client don't stretch everyone else's tail latency. Routes ``check`` a caller
+before reading or hashing its body, so a caller over its limits is refused
+before its upload costs any I/O, even if the result turns out to be cached. Limits are kept per worker
+process and are checked for each caller, never shared through coalescing.
+"""
+
+from __future__ import annotations
+import asyncio
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Iterator, Optional
+from fastapi import HTTPException
+from .config import settings
+
+JSON = "json"
+FILE = "file"
+PDF = "pdf"
+# Idle buckets are dropped once this many keys are tracked
+MAX_TRACKED_KEYS = 10000
+
+
+def request_kind(file_type: str) -> str:
+    """Admission class of a request from its telemetry file type"""
+    if file_type == "pdf":
+        return PDF
+    if file_type in ("json", "npz", "columnar"):
+        return JSON
+    return FILE
+
+
+class SingleFlight:
+    """Runs one computation per key at a time; concurrent callers with the same key share its result"""
+
+    def __init__(self):
+        self._calls: dict[str, asyncio.Task] = {}
+        self.coalesced = 0
+
+    async def run(
+        self, key: str, compute: Callable[[], Awaitable[Any]], on_lead: Optional[Callable[[], None]] = None
+    ) -> Any:
+        """``compute()``'s result, shared with concurrent callers of the same ``key``.
+
+        ``on_lead`` runs just before this caller starts the computation; if it
+        raises, only this caller fails and nothing is started.
+        """
+        while True:
+            task = self._calls.get(key)
+            if task is None:
+                if on_lead is not None:
+                    on_lead()
+                task = asyncio.ensure_future(compute())
+                self._calls[key] = task
+                task.add_done_callback(lambda done, key=key: self._finished(key, done))
+                # The caller that started the computation owns it: cancelling it cancels the computation
+                return await task
+
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(task)
+            except asyncio.CancelledError:
+                current = asyncio.current_task()
+                if task.cancelled() and not (current and current.cancelling()):
+                    continue  # the owner went away before finishing; compute it ourselves
+                raise
+
+    def _finished(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here so an error nobody awaited is not logged as unhandled
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._calls), "coalesced": self.coalesced}
+
+
+class AdmissionController:
+    """Per-key token buckets plus per-key, per-kind concurrency limits"""
+
+    def __init__(self, enabled: bool, rate: float, burst: float, costs: dict[str, float], concurrency: dict[str, int]):
+        self.enabled = enabled
+        self.rate = rate
+        self.burst = burst
+        self.costs = costs
+        self.concurrency = concurrency
+        self._lock = threading.Lock()
+        self._buckets: dict[str, list[float]] = {}  # key -> [tokens, last refill]
+        self._running: dict[tuple[str, str], int] = {}
+        self.admitted = 0
+        self.rate_limited = 0
+        self.concurrency_limited = 0
+
+    def _refill(self, key: str, now: float) -> list[float]:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= MAX_TRACKED_KEYS:
+                self._prune(now)
+            bucket = self._buckets[key] = [self.burst, now]
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        return bucket
+
+    def _prune(self, now: float) -> None:
+        for key, (tokens, updated) in list(self._buckets.items()):
+            if tokens + (now - updated) * self.rate >= self.burst:
+                del self._buckets[key]
+
+    def check(self, key: str, kind: str) -> None:
+        """Raise 429 if ``key`` could not start a ``kind`` computation now, without spending anything"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._check_rate(key, kind)
+            self._check_concurrency(key, kind)
+
+    def charge(self, key: str, kind: str) -> None:
+        """Spend ``kind``'s token cost from ``key``'s bucket, or raise 429"""
+        if not self.enabled:
+            return
+        with self._lock:
+            bucket, cost = self._check_rate(key, kind)
+            bucket[0] -= cost
+            self.admitted += 1
+
+    def _check_rate(self, key: str, kind: str) -> tuple[list[float], float]:
+        """(refilled bucket, cost) when ``key`` can afford ``kind``; 429 otherwise. Call with the lock held"""
+        cost = min(self.costs.get(kind, 1.0), self.burst)
+        bucket = self._refill(key, time.monotonic())
+        if bucket[0] < cost:
+            self.rate_limited += 1
+            wait = (cost - bucket[0]) / self.rate if self.rate > 0 else settings.analysis_retry_after_seconds
+            raise HTTPException(
+                status_code=429,
+                detail="Rate limit exceeded for this API key, please retry shortly",
+                headers={"Retry-After": str(max(1, math.ceil(wait)))},
+            )
+        return bucket, cost
+
+    @contextmanager
+    def slot(self, key: str, kind: str) -> Iterator[None]:
+        """Hold one of ``key``'s ``kind`` slots for the block (429 when none is free)"""
+        if not self.enabled:
+            yield
+            return
+        self._acquire(key, kind)
+        try:
+            yield
+        finally:
+            self._release(key, kind)
+
+    def _acquire(self, key: str, kind: str) -> None:
+        with self._lock:
+            self._running[(key, kind)] = self._check_concurrency(key, kind) + 1
+
+    def _check_concurrency(self, key: str, kind: str) -> int:
+        """``key``'s running ``kind`` count when below its limit; 429 otherwise. Call with the lock held"""
+        limit = self.concurrency.get(kind, 0)
+        running = self._running.get((key, kind), 0)
+        if limit > 0 and running >= limit:
+            self.concurrency_limited += 1
+            raise HTTPException(
+                status_code=429,
+                detail=f"Too many concurrent {kind} analyses for this API key, please retry shortly",
+                headers={"Retry-After": str(settings.analysis_retry_after_seconds)},
+            )
+        return running
+
+    def _release(self, key: str, kind: str) -> None:
+        with self._lock:
+            running = self._running.pop((key, kind), 1) - 1
+            if running > 0:
+                self._running[(key, kind)] = running
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "keys": len(self._buckets),
+                "running": sum(self._running.values()),
+                "admitted": self.admitted,
+                "rate_limited": self.rate_limited,
+                "concurrency_limited": self.concurrency_limited,
+            }
+
+
+request_coalescer = SingleFlight()
+admission_control = AdmissionController(
+    enabled=settings.admission_enabled,
+    rate=settings.admission_rate_per_second,
+    burst=settings.admission_burst,
+    costs={JSON: settings.admission_json_cost, FILE: settings.admission_file_cost, PDF: settings.admission_pdf_cost},
+    concurrency={
+        JSON: settings.admission_json_concurrency,
+        FILE: settings.admission_file_concurrency,
+        PDF: settings.admission_pdf_concurrency,
+    },
+)
@@ -1,10 +1,15 @@
 from __future__ import annotations
 import io
+import math
 import pandas as pd
 import numpy as np
-import pdfplumber
 from fastapi import UploadFile, HTTPException
-from .ml_analytics import FinancialPredictor, AnomalyDetector, ScenarioAnalyzer, CreditRiskPredictor
+from .ml_analytics import FinancialPredictor, AnomalyDetector, ScenarioAnalyzer, CreditRiskPredictor, MonteCarloSimulator
+from .model_registry import anomaly_registry
+from .series import FinancialSeries
+from .config import settings
+from .telemetry import span
+from .uploads import ARROW_SUFFIXES, PARQUET_SUFFIXES
 
 REQUIRED_FIELDS = ["revenue", "expenses"]
 
@@ -17,170 +22,427 @@ INDUSTRY_BENCHMARKS = {
     "E-commerce": {"net_margin": 0.03, "current_ratio": 1.2, "dso_days": 30},
 }
 
+CREDIT_TIERS = [(80, "Excellent"), (65, "Good"), (50, "Fair")]
+
+COLUMN_ALIASES = {
+    "sales": "revenue",
+    "income": "revenue",
+    "turnover": "revenue",
+    "cost": "expenses",
+    "expense": "expenses",
+    "operating_expenses": "expenses",
+    "cash_in": "cash_in",
+    "cash_out": "cash_out",
+    "accounts_receivable": "ar",
+    "receivables": "ar",
+    "accounts_payable": "ap",
+    "payables": "ap",
+    "inventory_level": "inventory",
+    "loan_obligations": "debt",
+    "tax_deductions": "tax",
+}
+
+TOTAL_COLUMNS = ["revenue", "expenses", "cash_in", "cash_out", "ar", "ap", "inventory", "debt"]
+
+# Risk score is the sum of clip((ratio - offset) / scale, 0, 1) x points per ratio
+RISK_TERMS = {
+    "net_margin": (0.0, 0.15, 25.0),
+    "current_ratio": (1.0, 1.5, 25.0),
+    "dso_days": (120.0, -120.0, 25.0),
+    "dscr": (0.0, 2.0, 25.0),
+}
+# DSCR reported when there is no debt to service
+NO_DEBT_DSCR = 2.0
+
+RISK_FLAG_LABELS = [
+    "Net margin below industry benchmark",
+    "Liquidity below benchmark",
+    "Receivables days higher than benchmark",
+    "Debt service coverage weak",
+]
+
 
 async def parse_upload_to_df(file: UploadFile) -> pd.DataFrame:
-    name = (file.filename or "").lower()
     content = await file.read()
+    return parse_bytes_to_df(file.filename or "", content)
+
+
+def parse_bytes_to_df(filename: str, content: bytes) -> pd.DataFrame:
+    name = filename.lower()
 
     try:
         if name.endswith(".csv"):
-            return pd.read_csv(io.BytesIO(content), on_bad_lines="skip", engine="python")
+            return pd.read_csv(io.BytesIO(content), on_bad_lines="skip")
         if name.endswith(".xlsx") or name.endswith(".xls"):
             return pd.read_excel(io.BytesIO(content))
         if name.endswith(".pdf"):
-            text = ""
-            with pdfplumber.open(io.BytesIO(content)) as pdf:
-                for page in pdf.pages:
-                    text += (page.extract_text() or "") + "\n"
-            lines = [ln for ln in text.splitlines() if "," in ln]
-            if not lines:
-                raise HTTPException(
-                    status_code=400, 
-                    detail="PDF does not contain CSV-like data. Please upload a file with columns: revenue, expenses"
-                )
-            return pd.read_csv(io.StringIO("\n".join(lines)), on_bad_lines="skip", engine="python")
-
-        raise HTTPException(status_code=400, detail="Unsupported file type. Please upload CSV, Excel, or PDF")
+            from .pdf_extract import extract_pdf_frame
+
+            return extract_pdf_frame(content)
+        if name.endswith(PARQUET_SUFFIXES + ARROW_SUFFIXES):
+            from .ingest import read_arrow_frame
+
+            return read_arrow_frame(io.BytesIO(content), filename)
+
+        raise HTTPException(status_code=400, detail="Unsupported file type. Please upload CSV, Excel, PDF, Parquet or Arrow")
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to parse file: {str(e)}")
 
 
+def _normalize_name(column) -> str:
+    return str(column).strip().lower().replace(" ", "_")
+
+
 def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    df.columns = [c.strip().lower().replace(" ", "_") for c in df.columns]
-
-    aliases = {
-        "sales": "revenue",
-        "income": "revenue",
-        "turnover": "revenue",
-        "cost": "expenses",
-        "expense": "expenses",
-        "operating_expenses": "expenses",
-        "cash_in": "cash_in",
-        "cash_out": "cash_out",
-        "accounts_receivable": "ar",
-        "receivables": "ar",
-        "accounts_payable": "ap",
-        "payables": "ap",
-        "inventory_level": "inventory",
-        "loan_obligations": "debt",
-        "tax_deductions": "tax",
-    }
+    df = df.copy(deep=False)
+    df.columns = [_normalize_name(c) for c in df.columns]
 
-    for src, target in aliases.items():
+    for src, target in COLUMN_ALIASES.items():
         if src in df.columns and target not in df.columns:
             df[target] = df[src]
 
     return df
 
 
-def analyze_dataframe(df: pd.DataFrame, industry: str) -> dict:
-    df = _normalize_columns(df)
+def _column_totals(df: pd.DataFrame) -> dict[str, tuple[float, int]]:
+    """(sum, non-null count) per canonical column, the sufficient statistics for headline metrics"""
+    return {c: (float(df[c].sum()), int(df[c].count())) for c in TOTAL_COLUMNS if c in df.columns}
 
-    missing = [f for f in REQUIRED_FIELDS if f not in df.columns]
+
+def _mean(totals: dict[str, tuple[float, int]], column: str) -> float:
+    if column not in totals:
+        return 0.0
+    total, count = totals[column]
+    return total / count if count else float("nan")
+
+
+def _column_labels(df: pd.DataFrame) -> dict[str, object]:
+    """Normalized (and alias-resolved) column name -> the frame's own label, as ``_normalize_columns`` names them"""
+    labels: dict[str, object] = {}
+    for column in df.columns:
+        labels.setdefault(_normalize_name(column), column)
+    for src, target in COLUMN_ALIASES.items():
+        if src in labels and target not in labels:
+            labels[target] = labels[src]
+    return labels
+
+
+def _require(columns) -> None:
+    missing = [f for f in REQUIRED_FIELDS if f not in columns]
     if missing:
-        available = list(df.columns)
+        available = list(columns)
         raise HTTPException(
             status_code=400, 
             detail=f"Missing required fields: {', '.join(missing)}. Found columns: {', '.join(available)}. Please include 'revenue' and 'expenses' columns."
         )
 
-    revenue = float(df["revenue"].sum())
-    expenses = float(df["expenses"].sum())
+
+def _prepare(df: pd.DataFrame) -> pd.DataFrame:
+    df = _normalize_columns(df)
+    _require(df.columns)
+    return df
+
+
+def _prepare_series(df: pd.DataFrame) -> FinancialSeries:
+    """The canonical columns of ``df`` as shared arrays, without copying or normalizing the frame itself"""
+    labels = _column_labels(df)
+    _require(labels)
+    return FinancialSeries.from_frame(df, labels)
+
+
+def _headline_metrics(totals: dict[str, tuple[float, int]]) -> dict:
+    """Headline ratios plus the balance-sheet inputs they were derived from"""
+    revenue = totals["revenue"][0]
+    expenses = totals["expenses"][0]
     net_income = revenue - expenses
     net_margin = net_income / revenue if revenue else 0.0
 
-    cash_in = float(df.get("cash_in", df["revenue"]).sum())
-    cash_out = float(df.get("cash_out", df["expenses"]).sum())
+    cash_in = totals.get("cash_in", totals["revenue"])[0]
+    cash_out = totals.get("cash_out", totals["expenses"])[0]
     net_cashflow = cash_in - cash_out
 
-    ar = float(df.get("ar", pd.Series([0])).mean())
-    ap = float(df.get("ap", pd.Series([0])).mean())
-    inventory = float(df.get("inventory", pd.Series([0])).mean())
+    ar = _mean(totals, "ar")
+    ap = _mean(totals, "ap")
+    inventory = _mean(totals, "inventory")
     current_assets = ar + inventory + max(cash_in - cash_out, 0)
-    current_liabilities = ap + float(df.get("debt", pd.Series([0])).mean())
+    current_liabilities = ap + _mean(totals, "debt")
     current_ratio = current_assets / current_liabilities if current_liabilities else 2.0
 
     dso_days = (ar / revenue) * 365 if revenue else 0.0
 
-    debt = float(df.get("debt", pd.Series([0])).sum())
-    dscr = net_cashflow / debt if debt else 2.0
+    debt = totals.get("debt", (0.0, 0))[0]
+    dscr = net_cashflow / debt if debt and math.isfinite(debt) else NO_DEBT_DSCR
 
-    risk_score = _risk_score(net_margin, current_ratio, dso_days, dscr)
-    creditworthiness = _credit_tier(risk_score)
+    return {
+        "revenue": revenue,
+        "expenses": expenses,
+        "net_income": net_income,
+        "net_margin": net_margin,
+        "cash_in": cash_in,
+        "cash_out": cash_out,
+        "net_cashflow": net_cashflow,
+        "ar": ar,
+        "inventory": inventory,
+        "current_liabilities": current_liabilities,
+        "current_ratio": current_ratio,
+        "dso_days": dso_days,
+        "debt": debt,
+        "dscr": dscr,
+    }
 
-    benchmarks = INDUSTRY_BENCHMARKS.get(industry, INDUSTRY_BENCHMARKS["Services"])
+
+def analyze_dataframe(
+    df: pd.DataFrame,
+    industry: str,
+    totals: dict[str, tuple[float, int]] | None = None,
+    skip: frozenset[str] = frozenset(),
+    offset: int = 0,
+) -> dict:
+    """Full single-company analysis.
+
+    ``totals`` may carry precomputed column sums/counts (e.g. from streaming
+    ingestion over more rows than ``df`` retains); otherwise they come from ``df``.
+    ``offset`` is the number of earlier periods left out of ``df``, so anomalies
+    are numbered by their period in the whole upload.
+    Optional stages named in ``skip`` (see ``fields.STAGE_FIELDS``) are left out.
+    """
+    with span("normalize"):
+        series = _prepare_series(df)
+
+    with span("metrics"):
+        if totals is None:
+            totals = series.totals(TOTAL_COLUMNS)
+        metrics = _headline_metrics(totals)
 
     # ML-based analytics
-    predictor = FinancialPredictor()
-    predictor.fit(df)
-    forecast = predictor.forecast(periods=3)
+    forecast = anomalies = None
+    if "forecast" not in skip:
+        with span("forecast"):
+            predictor = _predictor()
+            predictor.fit(series)
+            forecast = predictor.forecast(periods=3)
+
+    if "anomaly_detection" not in skip:
+        with span("anomaly_detection"):
+            anomalies = _detect_anomalies(series, industry, offset=offset)
+
+    return _assemble_analysis(industry, metrics, forecast, anomalies, series=series, skip=skip)
+
+
+def _predictor(season_length: int | None = None) -> FinancialPredictor:
+    return FinancialPredictor(
+        season_length=settings.forecast_season_length if season_length is None else season_length,
+        confidence=settings.forecast_confidence,
+    )
+
+
+def _detect_anomalies(series: FinancialSeries, industry: str, offset: int = 0) -> list[str]:
+    pretrained = anomaly_registry.get(industry)
+    if pretrained is not None:
+        return pretrained.detect(series, offset=offset)
+    return AnomalyDetector().fit_detect(series, offset=offset)
+
+
+def _assemble_analysis(
+    industry: str,
+    metrics: dict,
+    forecast: dict | None,
+    anomalies: list[str] | None,
+    series: FinancialSeries | None = None,
+    shock_distribution: tuple | None = None,
+    skip: frozenset[str] = frozenset(),
+) -> dict:
+    """Scores, scenarios and credit view from headline metrics plus model outputs.
+
+    The Monte Carlo shocks are fitted to ``series`` unless ``shock_distribution``
+    already supplies their (mean, covariance). A None model output, or a stage
+    named in ``skip``, leaves its fields out.
+    """
+    net_margin = metrics["net_margin"]
+    current_ratio = metrics["current_ratio"]
+    dso_days = metrics["dso_days"]
+    dscr = metrics["dscr"]
 
-    detector = AnomalyDetector()
-    detector.fit(df)
-    anomalies = detector.detect(df)
+    risk_score = _risk_score(net_margin, current_ratio, dso_days, dscr)
+    benchmarks = INDUSTRY_BENCHMARKS.get(industry, INDUSTRY_BENCHMARKS["Services"])
 
     base_analysis = {
         "industry": industry,
-        "revenue": revenue,
-        "expenses": expenses,
-        "net_income": net_income,
+        "revenue": metrics["revenue"],
+        "expenses": metrics["expenses"],
+        "net_income": metrics["net_income"],
         "net_margin": net_margin,
-        "net_cashflow": net_cashflow,
+        "net_cashflow": metrics["net_cashflow"],
         "current_ratio": current_ratio,
         "dso_days": dso_days,
         "dscr": dscr,
+        "debt": metrics["debt"],
         "risk_score": risk_score,
-        "creditworthiness": creditworthiness,
+        "creditworthiness": _credit_tier(risk_score),
         "benchmarks": benchmarks,
         "flags": _risk_flags(net_margin, current_ratio, dso_days, dscr, benchmarks),
     }
 
-    scenarios = ScenarioAnalyzer.analyze(base_analysis)
-    default_probability = CreditRiskPredictor.predict_default_probability(base_analysis)
-    credit_risk_factors = CreditRiskPredictor.get_risk_factors(base_analysis)
+    analysis = dict(base_analysis)
+    if forecast is not None:
+        analysis["forecast"] = forecast
+    if anomalies is not None:
+        analysis["anomalies"] = anomalies
 
-    return {
-        **base_analysis,
-        "forecast": forecast,
-        "anomalies": anomalies,
-        "scenarios": scenarios,
-        "default_probability": default_probability,
-        "credit_risk_factors": credit_risk_factors,
-    }
+    if "scenarios" not in skip:
+        with span("scenarios"):
+            analysis["scenarios"] = ScenarioAnalyzer.analyze(base_analysis)
+            analysis["simulation"] = MonteCarloSimulator(
+                paths=settings.simulation_paths, horizon=settings.simulation_horizon, seed=settings.simulation_seed
+            ).simulate(series, metrics, _risk_score_array, distribution=shock_distribution)
+
+    if "credit_scoring" not in skip:
+        with span("credit_scoring"):
+            analysis["default_probability"] = CreditRiskPredictor.predict_default_probability(base_analysis)
+            analysis["credit_risk_factors"] = CreditRiskPredictor.get_risk_factors(base_analysis)
+
+    return analysis
+
+
+def simulate_dataframe(df: pd.DataFrame, paths: int, horizon: int, seed: int | None) -> dict:
+    """Monte Carlo scenario distribution for one company, without the rest of the analysis"""
+    series = _prepare_series(df)
+    metrics = _headline_metrics(series.totals(TOTAL_COLUMNS))
+    return MonteCarloSimulator(paths=paths, horizon=horizon, seed=seed).simulate(series, metrics, _risk_score_array)
 
 
 def _risk_score(net_margin: float, current_ratio: float, dso_days: float, dscr: float) -> float:
-    margin_score = np.clip(net_margin / 0.15, 0, 1)
-    liquidity_score = np.clip((current_ratio - 1) / 1.5, 0, 1)
-    dso_score = np.clip(1 - dso_days / 120, 0, 1)
-    dscr_score = np.clip(dscr / 2.0, 0, 1)
-    return float(round((margin_score + liquidity_score + dso_score + dscr_score) * 25, 2))
+    return float(_risk_score_array(net_margin, current_ratio, dso_days, dscr))
+
+
+def _risk_score_array(net_margin, current_ratio, dso_days, dscr) -> np.ndarray:
+    ratios = {"net_margin": net_margin, "current_ratio": current_ratio, "dso_days": dso_days, "dscr": dscr}
+    score = sum(
+        np.clip((ratios[name] - offset) / scale, 0, 1) * points for name, (offset, scale, points) in RISK_TERMS.items()
+    )
+    return np.round(score, 2)
 
 
 def _credit_tier(score: float) -> str:
-    if score >= 80:
-        return "Excellent"
-    if score >= 65:
-        return "Good"
-    if score >= 50:
-        return "Fair"
+    for threshold, tier in CREDIT_TIERS:
+        if score >= threshold:
+            return tier
     return "High Risk"
 
 
+def _credit_tier_array(scores: np.ndarray) -> np.ndarray:
+    scores = np.asarray(scores)
+    return np.select(
+        [scores >= threshold for threshold, _ in CREDIT_TIERS],
+        [tier for _, tier in CREDIT_TIERS],
+        default="High Risk",
+    )
+
+
+def analyze_portfolio(df: pd.DataFrame, industry: str = "Services", id_column: str = "company_id") -> pd.DataFrame:
+    """Score every company in a long-format frame with grouped vectorized operations.
+
+    Each row is one period of one company, keyed by ``id_column``. An optional
+    ``industry`` column overrides the default industry per company. Returns one
+    row per company with the same headline metrics as ``analyze_dataframe``.
+    """
+    df = _normalize_columns(df)
+    id_column = id_column.strip().lower().replace(" ", "_")
+
+    if id_column not in df.columns:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Missing company identifier column '{id_column}'. Found columns: {', '.join(df.columns)}.",
+        )
+    missing = [f for f in REQUIRED_FIELDS if f not in df.columns]
+    if missing:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Missing required fields: {', '.join(missing)}. Found columns: {', '.join(df.columns)}.",
+        )
+
+    frame = pd.DataFrame({
+        "revenue": df["revenue"],
+        "expenses": df["expenses"],
+        "cash_in": df["cash_in"] if "cash_in" in df.columns else df["revenue"],
+        "cash_out": df["cash_out"] if "cash_out" in df.columns else df["expenses"],
+        "ar": df["ar"] if "ar" in df.columns else 0.0,
+        "ap": df["ap"] if "ap" in df.columns else 0.0,
+        "inventory": df["inventory"] if "inventory" in df.columns else 0.0,
+        "debt": df["debt"] if "debt" in df.columns else 0.0,
+    }, index=df.index)
+    grouped = frame.groupby(df[id_column], sort=False)
+
+    sums = grouped[["revenue", "expenses", "cash_in", "cash_out", "debt"]].sum()
+    means = grouped[["ar", "ap", "inventory", "debt"]].mean()
+
+    revenue = sums["revenue"].to_numpy(dtype=float)
+    expenses = sums["expenses"].to_numpy(dtype=float)
+    net_income = revenue - expenses
+    with np.errstate(divide="ignore", invalid="ignore"):
+        net_margin = np.where(revenue != 0, net_income / revenue, 0.0)
+
+    net_cashflow = sums["cash_in"].to_numpy(dtype=float) - sums["cash_out"].to_numpy(dtype=float)
+    ar = means["ar"].to_numpy(dtype=float)
+    current_assets = ar + means["inventory"].to_numpy(dtype=float) + np.maximum(net_cashflow, 0)
+    current_liabilities = means["ap"].to_numpy(dtype=float) + means["debt"].to_numpy(dtype=float)
+    debt = sums["debt"].to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        current_ratio = np.where(current_liabilities != 0, current_assets / current_liabilities, 2.0)
+        dso_days = np.where(revenue != 0, ar / revenue * 365, 0.0)
+        dscr = np.where(np.isfinite(debt) & (debt != 0), net_cashflow / debt, NO_DEBT_DSCR)
+
+    risk_score = _risk_score_array(net_margin, current_ratio, dso_days, dscr)
+
+    if "industry" in df.columns:
+        industries = df.groupby(df[id_column], sort=False)["industry"].first()
+        industries = industries.reindex(sums.index).fillna(industry).astype(str)
+    else:
+        industries = pd.Series(industry, index=sums.index)
+    benchmark_keys = industries.where(industries.isin(list(INDUSTRY_BENCHMARKS)), "Services")
+    benchmarks = pd.DataFrame.from_dict(INDUSTRY_BENCHMARKS, orient="index").loc[benchmark_keys]
+
+    flags = np.column_stack([
+        net_margin < benchmarks["net_margin"].to_numpy(),
+        current_ratio < benchmarks["current_ratio"].to_numpy(),
+        dso_days > benchmarks["dso_days"].to_numpy(),
+        dscr < 1.2,
+    ])
+
+    result = pd.DataFrame({
+        "industry": industries.to_numpy(),
+        "revenue": revenue,
+        "expenses": expenses,
+        "net_income": net_income,
+        "net_margin": net_margin,
+        "net_cashflow": net_cashflow,
+        "current_ratio": current_ratio,
+        "dso_days": dso_days,
+        "dscr": dscr,
+        "risk_score": risk_score,
+        "creditworthiness": _credit_tier_array(risk_score),
+        "default_probability": CreditRiskPredictor.predict_default_probability_batch(
+            net_margin, current_ratio, dscr
+        ),
+        "flags": [
+            [label for label, hit in zip(RISK_FLAG_LABELS, row) if hit]
+            for row in flags
+        ],
+    }, index=sums.index)
+    result.index.name = id_column
+    return result
+
+
 def _risk_flags(net_margin: float, current_ratio: float, dso_days: float, dscr: float, benchmarks: dict) -> list[str]:
-    flags = []
-    if net_margin < benchmarks.get("net_margin", 0.08):
-        flags.append("Net margin below industry benchmark")
-    if current_ratio < benchmarks.get("current_ratio", 1.5):
-        flags.append("Liquidity below benchmark")
-    if dso_days > benchmarks.get("dso_days", 45):
-        flags.append("Receivables days higher than benchmark")
-    if dscr < 1.2:
-        flags.append("Debt service coverage weak")
-    return flags
+    hits = [
+        net_margin < benchmarks.get("net_margin", 0.08),
+        current_ratio < benchmarks.get("current_ratio", 1.5),
+        dso_days > benchmarks.get("dso_days", 45),
+        dscr < 1.2,
+    ]
+    return [label for label, hit in zip(RISK_FLAG_LABELS, hits) if hit]
 
 
 def build_recommendations(analysis: dict) -> list[str]:
@@ -0,0 +1,175 @@
+"""
+Content-addressed cache for analysis results.
+
+Keys are sha256 digests over the analysed content, the industry and the model
+version. Lookups hit an in-process LRU first (bounded by entry count, total
+payload bytes and TTL) and then, when enabled, a shared tier stored in the
+``cached_results`` table so every worker and instance can reuse a result.
+Database errors in the shared tier are logged and count as a miss or a
+skipped write, never failing the request whose result was already computed.
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+from .config import settings
+from .db import SessionLocal, json_safe
+from .model_registry import model_version
+
+logger = logging.getLogger(__name__)
+
+
+def records_cache_key(records: list[dict], industry: str) -> str:
+    """Key for a set of records, stable under column order and column-name case and spacing.
+
+    Alias spellings (e.g. ``sales`` for ``revenue``) give different keys: the
+    frame keeps the source column next to the canonical one.
+    """
+    import pandas as pd
+    from .analysis import _normalize_columns
+
+    df = _normalize_columns(pd.DataFrame(records))
+    df = df[sorted(df.columns)]
+    hasher = hashlib.sha256()
+    hasher.update(json.dumps(list(df.columns)).encode())
+    hasher.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return _finish_key(hasher, "records", industry)
+
+
+def upload_cache_key(digest: str, filename: str, industry: str) -> str:
+    """Key for a raw upload, from the sha256 of its content and its file type"""
+    hasher = hashlib.sha256(digest.encode())
+    hasher.update(filename.lower().rsplit(".", 1)[-1].encode())
+    return _finish_key(hasher, "upload", industry)
+
+
+def columnar_cache_key(body: bytes, fmt: str, industry: str) -> str:
+    """Key for a columnar request body, hashed as raw bytes without decoding it"""
+    hasher = hashlib.sha256(body)
+    hasher.update(fmt.encode())
+    return _finish_key(hasher, "columnar", industry)
+
+
+def partial_cache_key(key: str, skipped: frozenset[str]) -> str:
+    """Key for a result computed with some optional stages skipped (see ``fields``)"""
+    return hashlib.sha256(f"{key}|skip:{','.join(sorted(skipped))}".encode()).hexdigest()
+
+
+def _finish_key(hasher, kind: str, industry: str) -> str:
+    hasher.update(f"|{kind}|{industry}|{model_version()}".encode())
+    return hasher.hexdigest()
+
+
+class ResultCache:
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float, shared: bool = False):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.shared = shared
+        self._entries: OrderedDict[str, tuple[float, int, dict]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, _, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._drop(key)
+
+        value = self._shared_get(key, now) if self.shared else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.shared_hits += 1
+        self._store(key, value, now)
+        return value
+
+    def put(self, key: str, value: dict) -> None:
+        now = time.time()
+        self._store(key, value, now)
+        if self.shared:
+            self._shared_put(key, value, now + self.ttl_seconds)
+
+    def _store(self, key: str, value: dict, now: float) -> None:
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (now + self.ttl_seconds, size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _shared_get(self, key: str, now: float) -> Optional[dict]:
+        from .models import CachedResult
+
+        try:
+            with SessionLocal() as session:
+                row = session.get(CachedResult, key)
+                if row is None or row.expires_at <= now:
+                    return None
+                return row.payload
+        except Exception:
+            logger.warning("Shared cache lookup failed; treating it as a miss", exc_info=True)
+            return None
+
+    def _shared_put(self, key: str, value: dict, expires_at: float) -> None:
+        from .models import CachedResult
+
+        try:
+            with SessionLocal() as session:
+                session.merge(CachedResult(key=key, payload=json_safe(value), expires_at=expires_at))
+                session.query(CachedResult).filter(CachedResult.expires_at <= time.time()).delete()
+                session.commit()
+        except Exception:
+            logger.warning("Shared cache write failed; skipping it", exc_info=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+                "shared": self.shared,
+            }
+
+
+result_cache = ResultCache(
+    max_entries=settings.cache_max_entries,
+    max_bytes=settings.cache_max_bytes,
+    ttl_seconds=settings.cache_ttl_seconds,
+    shared=settings.cache_shared,
+)
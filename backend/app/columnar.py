@@ -0,0 +1,79 @@
+"""
+Columnar request bodies for /analyze-columnar.
+
+Payloads arrive as one array per column instead of one dict per period, either
+as JSON (``{"industry": ..., "columns": {"revenue": [...], ...}}``) or as a
+NumPy ``.npz`` archive, and are decoded straight into contiguous float64
+arrays without per-row validation. Decoding runs in the executor worker, so
+the raw body is the only thing shipped to it. NumPy is imported lazily so
+request handlers can sniff the format without loading it.
+"""
+
+from __future__ import annotations
+import io
+import json
+from typing import TYPE_CHECKING, Any, Optional
+from fastapi import HTTPException
+
+if TYPE_CHECKING:
+    import numpy as np
+
+JSON_FORMAT = "json"
+NPZ_FORMAT = "npz"
+
+CONTENT_TYPES = {
+    "application/json": JSON_FORMAT,
+    "application/x-npz": NPZ_FORMAT,
+    "application/octet-stream": NPZ_FORMAT,
+}
+
+
+def body_format(content_type: Optional[str]) -> str:
+    media_type = (content_type or "application/json").split(";", 1)[0].strip().lower()
+    fmt = CONTENT_TYPES.get(media_type)
+    if fmt is None:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Unsupported content type '{media_type}'. Use application/json or application/x-npz.",
+        )
+    return fmt
+
+
+def _as_column(name: str, values: Any) -> np.ndarray:
+    import numpy as np
+
+    try:
+        column = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        # Non-numeric columns (e.g. period labels) are kept as-is, as pandas would
+        column = np.asarray(values, dtype=object)
+    if column.ndim != 1:
+        raise HTTPException(status_code=400, detail=f"Column '{name}' must be a flat array")
+    return column
+
+
+def decode_columns(body: bytes, fmt: str) -> tuple[dict[str, np.ndarray], Optional[str]]:
+    """Decode a columnar body into ``{column: array}`` plus any industry it names"""
+    import numpy as np
+
+    industry = None
+    try:
+        if fmt == NPZ_FORMAT:
+            with np.load(io.BytesIO(body), allow_pickle=False) as archive:
+                raw = {name: archive[name] for name in archive.files}
+        else:
+            payload = json.loads(body)
+            if not isinstance(payload, dict) or not isinstance(payload.get("columns"), dict):
+                raise HTTPException(status_code=400, detail="Body must be an object with a 'columns' mapping")
+            industry = payload.get("industry")
+            raw = payload["columns"]
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to decode columnar body: {str(e)}")
+
+    columns = {str(name): _as_column(str(name), values) for name, values in raw.items()}
+    lengths = {len(column) for column in columns.values()}
+    if len(lengths) > 1:
+        raise HTTPException(status_code=400, detail="All columns must have the same length")
+    return columns, industry
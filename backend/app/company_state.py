@@ -0,0 +1,53 @@
+"""
+Storage for incremental per-company analysis state.
+
+Appends are read-modify-write: the new state is computed in a worker from the
+stored one, and the update only applies if the stored period count is still
+the one it was built from. Concurrent appends for the same company therefore
+fail with 409 instead of silently dropping periods.
+"""
+
+from __future__ import annotations
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from .models import CompanyState
+
+CONFLICT_DETAIL = "Company state changed during the update; retry the request"
+
+
+def load(db: Session, company_id: str) -> Optional[CompanyState]:
+    return db.get(CompanyState, company_id)
+
+
+def save(
+    db: Session, company_id: str, industry: str, previous_periods: Optional[int], state: dict, analysis: dict
+) -> None:
+    """Store ``state``; ``previous_periods`` is the stored count it was built from (None for a new company)"""
+    values = {"industry": industry, "periods": state["periods"], "state": state, "analysis": analysis}
+    try:
+        if previous_periods is None:
+            db.add(CompanyState(company_id=company_id, **values))
+        else:
+            result = db.execute(
+                update(CompanyState)
+                .where(CompanyState.company_id == company_id, CompanyState.periods == previous_periods)
+                .values(**values)
+            )
+            if result.rowcount == 0:
+                raise HTTPException(status_code=409, detail=CONFLICT_DETAIL)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=CONFLICT_DETAIL)
+    except HTTPException:
+        db.rollback()
+        raise
+
+
+def delete(db: Session, company_id: str) -> bool:
+    deleted = db.query(CompanyState).filter(CompanyState.company_id == company_id).delete()
+    db.commit()
+    return bool(deleted)
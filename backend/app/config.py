@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from dotenv import load_dotenv
 import os
+import tempfile
 
 _env_path = os.path.join(os.path.dirname(__file__), "..", ".env")
 load_dotenv(_env_path)
@@ -8,12 +9,113 @@ load_dotenv(_env_path)
 
 class Settings(BaseModel):
     database_url: str = os.getenv("DATABASE_URL", "sqlite:///finance.db")
+    # Connection pooling: "queue" keeps up to size + overflow connections per process,
+    # "null" opens one per checkout (serverless); recycle closes connections older than that
+    db_pool_mode: str = os.getenv("DB_POOL_MODE", "queue").lower()
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+    db_pool_timeout_seconds: float = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "10"))
+    db_pool_recycle_seconds: int = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+    # Async engine for async routes (needs asyncpg or aiosqlite); the URL defaults to DATABASE_URL's async driver
+    db_async: bool = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+    async_database_url: str = os.getenv("ASYNC_DATABASE_URL", "")
     api_key: str = os.getenv("API_KEY", "dev-key")
     cors_origins: list[str] = [
         origin.strip()
         for origin in os.getenv("CORS_ORIGINS", "*").split(",")
         if origin.strip()
     ]
+    # Import the analytics stack at startup instead of on first request
+    warmup_on_startup: bool = os.getenv("WARMUP_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+    # Multi-worker serving (gunicorn.conf.py): 0 workers = one per available core,
+    # 0 BLAS threads = cores / workers, 0 disables the memory and request-count recycling;
+    # the memory limit counts a worker's private pages, not those shared with the master
+    web_concurrency: int = int(os.getenv("WEB_CONCURRENCY", "0"))
+    blas_threads: int = int(os.getenv("BLAS_THREADS", "0"))
+    worker_max_memory_mb: int = int(os.getenv("WORKER_MAX_MEMORY_MB", "1024"))
+    worker_max_requests: int = int(os.getenv("WORKER_MAX_REQUESTS", "5000"))
+    # Analysis execution pool: 0 workers runs jobs on threads instead of processes
+    analysis_workers: int = int(os.getenv("ANALYSIS_WORKERS", str(os.cpu_count() or 1)))
+    analysis_queue_depth: int = int(os.getenv("ANALYSIS_QUEUE_DEPTH", "16"))
+    analysis_timeout_seconds: float = float(os.getenv("ANALYSIS_TIMEOUT_SECONDS", "60"))
+    analysis_retry_after_seconds: int = int(os.getenv("ANALYSIS_RETRY_AFTER_SECONDS", "5"))
+    # Concurrent identical analyze requests share one computation
+    coalesce_requests: bool = os.getenv("COALESCE_REQUESTS", "true").lower() in ("1", "true", "yes")
+    # Per-API-key admission for the analyze routes: token bucket (rate, burst), token cost
+    # and concurrent computations per request kind; limits apply per worker process
+    admission_enabled: bool = os.getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+    admission_rate_per_second: float = float(os.getenv("ADMISSION_RATE_PER_SECOND", "20"))
+    admission_burst: float = float(os.getenv("ADMISSION_BURST", "40"))
+    admission_json_cost: float = float(os.getenv("ADMISSION_JSON_COST", "1"))
+    admission_file_cost: float = float(os.getenv("ADMISSION_FILE_COST", "4"))
+    admission_pdf_cost: float = float(os.getenv("ADMISSION_PDF_COST", "10"))
+    admission_json_concurrency: int = int(os.getenv("ADMISSION_JSON_CONCURRENCY", "8"))
+    admission_file_concurrency: int = int(os.getenv("ADMISSION_FILE_CONCURRENCY", "4"))
+    admission_pdf_concurrency: int = int(os.getenv("ADMISSION_PDF_CONCURRENCY", "2"))
+    # Streaming ingestion for large CSV/XLSX uploads
+    stream_chunk_rows: int = int(os.getenv("STREAM_CHUNK_ROWS", "50000"))
+    stream_max_periods: int = int(os.getenv("STREAM_MAX_PERIODS", "5000"))
+    stream_spool_threshold_bytes: int = int(os.getenv("STREAM_SPOOL_THRESHOLD_BYTES", str(8 * 1024 * 1024)))
+    # Transaction ledgers: pandas period alias per row of the aggregated frame, and an
+    # optional JSON object of exact category -> class overrides (see ledger.CLASSES)
+    ledger_period: str = os.getenv("LEDGER_PERIOD", "M")
+    ledger_category_map: str = os.getenv("LEDGER_CATEGORY_MAP", "")
+    # Page-parallel PDF extraction (pdf_max_periods 0 = read every page); the serving process
+    # keeps one pool of up to pdf_workers page processes (capped at the cores), while
+    # analysis and job pool workers parse pages serially
+    pdf_workers: int = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+    pdf_pages_per_task: int = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+    pdf_max_pages: int = int(os.getenv("PDF_MAX_PAGES", "500"))
+    pdf_max_periods: int = int(os.getenv("PDF_MAX_PERIODS", "0"))
+    pdf_timeout_seconds: float = float(os.getenv("PDF_TIMEOUT_SECONDS", "45"))
+    # Analysis result cache; the shared tier stores entries in the database
+    cache_max_entries: int = int(os.getenv("CACHE_MAX_ENTRIES", "512"))
+    cache_max_bytes: int = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    cache_ttl_seconds: float = float(os.getenv("CACHE_TTL_SECONDS", "3600"))
+    cache_shared: bool = os.getenv("CACHE_SHARED", "false").lower() in ("1", "true", "yes")
+    # Write-behind assessment persistence
+    persist_batch_size: int = int(os.getenv("PERSIST_BATCH_SIZE", "500"))
+    persist_flush_seconds: float = float(os.getenv("PERSIST_FLUSH_SECONDS", "0.5"))
+    persist_max_queue: int = int(os.getenv("PERSIST_MAX_QUEUE", "100000"))
+    # Response compression for clients sending Accept-Encoding: gzip (0 bytes disables)
+    gzip_min_bytes: int = int(os.getenv("GZIP_MIN_BYTES", "1024"))
+    gzip_level: int = int(os.getenv("GZIP_LEVEL", "5"))
+    # Peer percentiles: minimum peers per group, index refresh interval (0 disables)
+    peer_min_count: int = int(os.getenv("PEER_MIN_COUNT", "20"))
+    peer_refresh_seconds: float = float(os.getenv("PEER_REFRESH_SECONDS", "5"))
+    # Forecasting: seasonal period in rows (0 disables), interval confidence
+    forecast_season_length: int = int(os.getenv("FORECAST_SEASON_LENGTH", "0"))
+    forecast_confidence: float = float(os.getenv("FORECAST_CONFIDENCE", "0.95"))
+    # Monte Carlo scenario simulation
+    simulation_paths: int = int(os.getenv("SIMULATION_PATHS", "10000"))
+    simulation_horizon: int = int(os.getenv("SIMULATION_HORIZON", "3"))
+    simulation_seed: int = int(os.getenv("SIMULATION_SEED", "42"))
+    # What-if sensitivity grids: cap on evaluated points per request
+    sensitivity_max_points: int = int(os.getenv("SENSITIVITY_MAX_POINTS", "250000"))
+    # Trailing periods kept per company for incremental anomaly detection
+    incremental_window_periods: int = int(os.getenv("INCREMENTAL_WINDOW_PERIODS", "120"))
+    # Bank/payment providers; an unset URL falls back to the built-in mock summary
+    bank_a_url: str = os.getenv("BANK_A_URL", "")
+    bank_b_url: str = os.getenv("BANK_B_URL", "")
+    bank_a_timeout_seconds: float = float(os.getenv("BANK_A_TIMEOUT_SECONDS", "2"))
+    bank_b_timeout_seconds: float = float(os.getenv("BANK_B_TIMEOUT_SECONDS", "2"))
+    integration_max_connections: int = int(os.getenv("INTEGRATION_MAX_CONNECTIONS", "50"))
+    integration_cache_ttl_seconds: float = float(os.getenv("INTEGRATION_CACHE_TTL_SECONDS", "60"))
+    integration_breaker_failures: int = int(os.getenv("INTEGRATION_BREAKER_FAILURES", "5"))
+    integration_breaker_reset_seconds: float = float(os.getenv("INTEGRATION_BREAKER_RESET_SECONDS", "30"))
+    # Background jobs (POST /jobs): in-process worker count (0 leaves jobs to `python -m app.jobs`)
+    job_workers: int = int(os.getenv("JOB_WORKERS", "1"))
+    job_poll_seconds: float = float(os.getenv("JOB_POLL_SECONDS", "1"))
+    job_lease_seconds: float = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+    job_max_attempts: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    # A job still running this long is stopped and failed (its pool's processes are terminated)
+    job_timeout_seconds: float = float(os.getenv("JOB_TIMEOUT_SECONDS", "900"))
+    job_dir: str = os.getenv("JOB_DIR", os.path.join(tempfile.gettempdir(), "finhealth-jobs"))
+    # Per-request sampling profiler (?profile=true) is only honoured when enabled
+    profiling_enabled: bool = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+    profiler_interval_seconds: float = float(os.getenv("PROFILER_INTERVAL_SECONDS", "0.005"))
+    # Pretrained per-industry anomaly models
+    anomaly_model_dir: str = os.getenv("ANOMALY_MODEL_DIR", os.path.join(os.path.dirname(__file__), "..", "models"))
 
 
 settings = Settings()
@@ -1,20 +1,236 @@
+"""
+Database engines, sessions and connection pool statistics.
+
+Each process keeps one pool sized by DB_POOL_* (or none with
+DB_POOL_MODE=null, for serverless runs where idle connections would outlive
+the instance). Request handlers get a session that is only opened when the
+route actually uses it; async routes can run ORM work on the optional async
+engine (DB_ASYNC) through ``run_db``.
+
+There are no migrations: ``init_db`` creates missing tables and, since
+``create_all`` skips tables that already exist, any of their indexes that an
+older schema lacked.
+"""
+
+from __future__ import annotations
+import logging
+import math
+import threading
+import time
+from typing import Any, Callable, Optional, TypeVar
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from starlette.concurrency import run_in_threadpool
 from .config import settings
 
-engine = create_engine(settings.database_url, pool_pre_ping=True)
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+# Sync driver -> async driver, for deriving the async URL from DATABASE_URL
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+class PoolStats:
+    """Checkout counts and time spent waiting for a connection, across all engines of this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record(self, waited: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds, 6),
+                "wait_ms_avg": round(self.wait_seconds / attempts * 1000, 3) if attempts else 0.0,
+                "wait_ms_max": round(self.max_wait_seconds * 1000, 3),
+            }
+
+
+pool_stats = PoolStats()
+
+
+class _TimedCheckout:
+    """Pool mixin timing ``connect()``, which blocks while the pool is exhausted"""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeout:
+            pool_stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        pool_stats.record(time.perf_counter() - started)
+        return connection
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+class TimedNullPool(_TimedCheckout, NullPool):
+    pass
+
+
+def _pool_options(url: str, queue_pool: type) -> dict:
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}  # an in-memory database lives in its one connection; keep SQLAlchemy's default pool
+    if settings.db_pool_mode == "null":
+        return {"poolclass": TimedNullPool}
+    return {
+        "poolclass": queue_pool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+    }
+
+
+def async_database_url(url: str) -> str:
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise RuntimeError(f"No async driver known for {parsed.drivername}; set ASYNC_DATABASE_URL")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+engine = create_engine(
+    settings.database_url, pool_pre_ping=True, **_pool_options(settings.database_url, TimedQueuePool)
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+async_engine = None
+AsyncSessionLocal = None
+if settings.db_async:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    _async_url = settings.async_database_url or async_database_url(settings.database_url)
+    async_engine = create_async_engine(
+        _async_url, pool_pre_ping=True, **_pool_options(_async_url, TimedAsyncQueuePool)
+    )
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+def json_safe(value: Any) -> Any:
+    """``value`` with non-finite floats replaced by None, which JSON columns (e.g. Postgres) reject"""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(item) for item in value]
+    return value
+
 
 def init_db():
     from . import models
     Base.metadata.create_all(bind=engine)
+    _create_missing_indexes()
+
+
+def _create_missing_indexes() -> None:
+    """Add indexes declared on existing tables that the database does not have yet"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(bind=engine, checkfirst=True)
+            except Exception:
+                # e.g. another worker created it between the check and the CREATE
+                logger.warning("Could not create index %s", index.name, exc_info=True)
+
+
+class LazySession:
+    """Stands in for a Session and opens the real one on first use"""
+
+    __slots__ = ("_session",)
+
+    def __init__(self):
+        self._session: Optional[Session] = None
+
+    def __getattr__(self, name: str) -> Any:
+        if self._session is None:
+            self._session = SessionLocal()
+        return getattr(self._session, name)
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+            self._session = None
 
 
 def get_db():
-    db = SessionLocal()
+    db = LazySession()
     try:
         yield db
     finally:
         db.close()
+
+
+def _run_sync(fn: Callable[..., T], *args) -> T:
+    with SessionLocal(expire_on_commit=False) as session:
+        return fn(session, *args)
+
+
+async def run_db(fn: Callable[..., T], *args) -> T:
+    """Run ``fn(session, *args)`` from an async route.
+
+    With DB_ASYNC it runs on the async engine (``AsyncSession.run_sync``), so
+    no threadpool thread waits on the database; otherwise on a sync session in
+    the threadpool. Returned objects stay readable after the session closes.
+    """
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as session:
+            return await session.run_sync(fn, *args)
+    return await run_in_threadpool(_run_sync, fn, *args)
+
+
+def pool_status() -> dict:
+    """Pool occupancy of the sync (and async) engine plus checkout/wait counters"""
+    status = {"mode": settings.db_pool_mode, **pool_stats.snapshot()}
+    for name, pool in (("sync", engine.pool), ("async", async_engine.sync_engine.pool if async_engine else None)):
+        if isinstance(pool, QueuePool):
+            status[name] = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": max(pool.overflow(), 0),
+                "idle": pool.checkedin(),
+            }
+    return status
+
+
+def dispose_after_fork() -> None:
+    """Drop pooled connections inherited from the parent process without closing them under it"""
+    engine.dispose(close=False)
+    if async_engine is not None:
+        async_engine.sync_engine.dispose(close=False)
+
+
+async def close_engines() -> None:
+    """Close this process's pooled connections so none are left open on the server at shutdown"""
+    engine.dispose()
+    if async_engine is not None:
+        await async_engine.dispose()
@@ -0,0 +1,224 @@
+"""
+Bounded execution pool for CPU-bound parsing and analysis.
+
+Jobs run in worker processes so large uploads never block the event loop.
+Admission is capped at ``workers + queue_depth`` in-flight jobs; beyond that the
+caller gets a 503 with ``Retry-After`` instead of queueing indefinitely.
+
+A process pool that breaks (a worker was OOM-killed or crashed) is replaced,
+and one holding a job past its timeout is terminated and replaced, so neither
+a dead worker nor a hung job keeps the service answering errors.
+"""
+
+from __future__ import annotations
+import asyncio
+import importlib
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, Union
+from fastapi import HTTPException
+from . import profiler, telemetry
+from .config import settings
+
+# Set in analysis and job pool workers; nested pools (e.g. PDF pages) are not started there
+in_pool_worker = False
+
+
+def init_pool_worker(warm: bool = False) -> None:
+    """Process-pool initializer: mark the process as a pool worker and optionally warm it"""
+    global in_pool_worker
+    in_pool_worker = True
+    if warm:
+        from .startup import warm_worker
+
+        warm_worker()
+
+
+class JobError(Exception):
+    """Picklable carrier for an HTTPException raised inside a worker process"""
+
+    def __init__(self, status_code: int, detail: Any):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _resolve(fn: Union[str, Callable]) -> Callable:
+    """Accept "module:function" relative to this package so callers need not import it"""
+    if callable(fn):
+        return fn
+    module, _, name = fn.partition(":")
+    return getattr(importlib.import_module(f".{module}", __package__), name)
+
+
+def _invoke(fn: Union[str, Callable], args: tuple, profile: bool = False) -> tuple:
+    """Run a job, returning (result, telemetry observations, profile summary or None)"""
+    try:
+        fn = _resolve(fn)
+        if not profile:
+            return (*telemetry.collect(fn, *args), None)
+        with profiler.SamplingProfiler(interval=settings.profiler_interval_seconds) as sampler:
+            result, observations = telemetry.collect(fn, *args)
+        return result, observations, sampler.summary()
+    except HTTPException as exc:
+        raise JobError(exc.status_code, exc.detail) from None
+
+
+def terminate_pool(pool: Executor) -> None:
+    """Shut ``pool`` down without waiting, killing its worker processes so running jobs stop too"""
+    # ProcessPoolExecutor has no public way to stop running tasks before Python 3.14; read its
+    # processes first, as shutdown() forgets them
+    processes = list((getattr(pool, "_processes", None) or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+
+
+class AnalysisExecutor:
+    def __init__(self, workers: int, queue_depth: int, timeout: float, retry_after: int):
+        self.workers = max(workers, 0)
+        self.capacity = max(self.workers, 1) + max(queue_depth, 0)
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._pool: Optional[Executor] = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.recycled = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _get_pool(self) -> Executor:
+        with self._lock:
+            if self._pool is None:
+                if self.workers:
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        initializer=init_pool_worker,
+                        initargs=(settings.warmup_on_startup,),
+                    )
+                else:
+                    self._pool = ThreadPoolExecutor(thread_name_prefix="analysis")
+            return self._pool
+
+    def _replace_pool(self, pool: Executor) -> None:
+        """Retire ``pool`` (broken, or running a hung job); the next job starts a fresh one.
+
+        Slots held by the retired pool's jobs are released with it: they have
+        failed or are being terminated, and their late callbacks are ignored.
+        """
+        with self._lock:
+            if self._pool is not pool:
+                return  # another caller already replaced it
+            self._pool = None
+            self._generation += 1
+            self._in_flight = 0
+            self.recycled += 1
+        terminate_pool(pool)
+
+    def _acquire(self) -> Optional[int]:
+        """Take a slot, returning the pool generation it belongs to (None when at capacity)"""
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self.rejected += 1
+                return None
+            self._in_flight += 1
+            return self._generation
+
+    def _release(self, generation: int) -> None:
+        with self._lock:
+            if generation == self._generation:
+                self._in_flight -= 1
+
+    def _submit(self, fn: Union[str, Callable], args: tuple, profile: bool):
+        """Submit a job, replacing the pool once if it turns out to be broken"""
+        for attempt in range(2):
+            pool = self._get_pool()
+            try:
+                return pool, pool.submit(_invoke, fn, args, profile)
+            except BrokenProcessPool:
+                self._replace_pool(pool)
+                if attempt:
+                    raise
+
+    async def run(self, fn: Union[str, Callable], *args: Any, profile_id: Optional[str] = None) -> Any:
+        """Run ``fn(*args)`` in the pool, enforcing backpressure and the job timeout.
+
+        ``fn`` may be a "module:function" string so the analytics modules are
+        only imported where the job actually runs. With ``profile_id`` the job
+        runs under the sampling profiler and its summary is stored under that id.
+        """
+        generation = self._acquire()
+        if generation is None:
+            raise HTTPException(
+                status_code=503,
+                detail="Analysis capacity exhausted, please retry shortly",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+
+        try:
+            pool, future = self._submit(fn, args, profile_id is not None)
+        except Exception:
+            self._release(generation)
+            raise
+        # The slot is held until the worker actually finishes (or its pool is retired)
+        future.add_done_callback(lambda _future: self._release(generation))
+
+        started = time.perf_counter()
+        try:
+            result, observations, profile = await asyncio.wait_for(
+                asyncio.wrap_future(future), timeout=self.timeout
+            )
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            if isinstance(pool, ProcessPoolExecutor):
+                # The job may never finish; kill its worker rather than let it hold a slot and a CPU
+                self._replace_pool(pool)
+            raise HTTPException(status_code=504, detail="Analysis timed out")
+        except BrokenProcessPool:
+            self._replace_pool(pool)
+            raise HTTPException(
+                status_code=503,
+                detail="Analysis worker stopped unexpectedly, please retry shortly",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+        except JobError as exc:
+            raise HTTPException(status_code=exc.status_code, detail=exc.detail)
+        finally:
+            telemetry.STAGE_SECONDS.observe(time.perf_counter() - started, stage="executor_job")
+
+        telemetry.record(observations)
+        if profile_id is not None and profile is not None:
+            profiler.store(profile_id, profile)
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "capacity": self.capacity,
+            "in_flight": self._in_flight,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "recycled": self.recycled,
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+analysis_executor = AnalysisExecutor(
+    workers=settings.analysis_workers,
+    queue_depth=settings.analysis_queue_depth,
+    timeout=settings.analysis_timeout_seconds,
+    retry_after=settings.analysis_retry_after_seconds,
+)
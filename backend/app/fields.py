@@ -0,0 +1,53 @@
+"""
+Response field selection (``?fields=risk_score,creditworthiness``).
+
+A request that names its fields gets only those back, and pipeline stages
+whose outputs it did not ask for are skipped. Kept free of pandas/NumPy
+imports so handlers can parse the selection without the analytics stack.
+"""
+
+from __future__ import annotations
+from typing import Optional
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+# Optional pipeline stages (named after their telemetry spans) and the fields they produce
+STAGE_FIELDS = {
+    "forecast": {"forecast"},
+    "anomaly_detection": {"anomalies"},
+    "scenarios": {"scenarios", "simulation"},
+    "credit_scoring": {"default_probability", "credit_risk_factors"},
+    "recommendations": {"recommendations"},
+}
+# Recommendations are derived from the outputs of these stages
+STAGE_DEPENDENCIES = {"recommendations": {"forecast", "anomaly_detection", "scenarios", "credit_scoring"}}
+
+
+def parse_fields(fields: Optional[str], model: type[BaseModel]) -> Optional[frozenset[str]]:
+    """Validate a comma-separated selection against ``model``; None selects everything"""
+    if fields is None or not fields.strip():
+        return None
+    selected = frozenset(name.strip() for name in fields.split(",") if name.strip())
+    unknown = sorted(selected - set(model.model_fields))
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(model.model_fields)}",
+        )
+    return selected
+
+
+def skipped_stages(fields: Optional[frozenset[str]]) -> frozenset[str]:
+    """Optional stages none of whose fields (directly or via a dependent stage) were selected"""
+    if fields is None:
+        return frozenset()
+    needed = {stage for stage, produced in STAGE_FIELDS.items() if produced & fields}
+    for stage in list(needed):
+        needed |= STAGE_DEPENDENCIES.get(stage, set())
+    return frozenset(STAGE_FIELDS) - needed
+
+
+def select_fields(payload: dict, fields: Optional[frozenset[str]]) -> dict:
+    if fields is None:
+        return payload
+    return {name: value for name, value in payload.items() if name in fields}
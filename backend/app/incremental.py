@@ -0,0 +1,177 @@
+"""
+Incremental per-company analysis.
+
+A company's history is folded into a compact, JSON-serializable state: column
+(sum, count) totals for the headline metrics, regression moments for the
+trend forecaster, log-change moments for the Monte Carlo shocks and a bounded
+trailing window of periods for anomaly detection. Appending periods updates
+the state in O(new rows) and re-derives the analysis from it; metrics,
+forecast, scores and simulation match a full recompute over the whole history,
+while anomalies (as with streamed uploads) cover the trailing window.
+"""
+
+from __future__ import annotations
+from typing import Optional
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+from .analysis import (
+    _assemble_analysis,
+    _column_totals,
+    _detect_anomalies,
+    _headline_metrics,
+    _predictor,
+    _prepare,
+)
+from .config import settings
+from .ml_analytics import FinancialPredictor, MonteCarloSimulator
+from .series import FinancialSeries
+from .telemetry import span
+
+STATE_VERSION = 1
+FORECAST_COLUMNS = FinancialPredictor.COLUMNS
+# Columns the anomaly detectors build their features from
+WINDOW_COLUMNS = ["revenue", "expenses", "cash_in", "cash_out"]
+
+
+def new_state(season_length: Optional[int] = None) -> dict:
+    season_length = settings.forecast_season_length if season_length is None else season_length
+    # Trend design: intercept, time index and one dummy per non-reference season
+    features = 2 + (season_length - 1 if season_length > 1 else 0)
+    return {
+        "version": STATE_VERSION,
+        "periods": 0,
+        "season_length": season_length,
+        "totals": {},
+        "forecast": {
+            "columns": [],
+            "xtx": np.zeros((features, features)).tolist(),
+            "xty": np.zeros((features, len(FORECAST_COLUMNS))).tolist(),
+            "yty": [0.0] * len(FORECAST_COLUMNS),
+        },
+        "shocks": {
+            "sums": [0.0] * 3,
+            "cross": np.zeros((3, 3)).tolist(),
+            "valid": [True, True, True],
+            "ar_seen": False,
+            "last": None,
+        },
+        "window": {},
+        "window_length": 0,
+    }
+
+
+def _numeric(df: pd.DataFrame, column: str) -> np.ndarray:
+    if column not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=float)
+
+
+def _json_values(values: np.ndarray) -> list:
+    return [float(v) if np.isfinite(v) else None for v in values]
+
+
+def _update_totals(state: dict, batch: pd.DataFrame) -> None:
+    for column, (total, count) in _column_totals(batch).items():
+        previous_total, previous_count = state["totals"].get(column, (0.0, 0))
+        state["totals"][column] = [previous_total + total, previous_count + count]
+
+
+def _update_forecast(state: dict, batch: pd.DataFrame, start: int) -> None:
+    moments = state["forecast"]
+    for column in FORECAST_COLUMNS:
+        if column in batch.columns and column not in moments["columns"]:
+            moments["columns"].append(column)
+    moments["columns"].sort(key=FORECAST_COLUMNS.index)
+
+    # Columns missing from earlier periods count as zeros, exactly as the full fit treats them
+    series = np.vstack([_numeric(batch, column) for column in FORECAST_COLUMNS])
+    xtx, xty, yty = _predictor(state["season_length"]).engine.moments(series, start=start)
+    moments["xtx"] = (np.asarray(moments["xtx"]) + xtx).tolist()
+    moments["xty"] = (np.asarray(moments["xty"]) + xty).tolist()
+    moments["yty"] = (np.asarray(moments["yty"]) + yty).tolist()
+
+
+def _update_shocks(state: dict, batch: pd.DataFrame) -> None:
+    shocks = state["shocks"]
+    revenue = _numeric(batch, "revenue")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        levels = np.column_stack([revenue, _numeric(batch, "expenses"), _numeric(batch, "ar") / revenue])
+        usable = np.isfinite(levels) & (levels > 0)
+        logs = np.where(usable, np.log(np.where(usable, levels, 1.0)), 0.0)
+
+    shocks["valid"] = [bool(v and ok) for v, ok in zip(shocks["valid"], usable.all(axis=0))]
+    shocks["ar_seen"] = shocks["ar_seen"] or "ar" in batch.columns
+
+    if shocks["last"] is not None:
+        logs = np.vstack([shocks["last"], logs])
+    changes = np.diff(logs, axis=0)
+    shocks["sums"] = (np.asarray(shocks["sums"]) + changes.sum(axis=0)).tolist()
+    shocks["cross"] = (np.asarray(shocks["cross"]) + changes.T @ changes).tolist()
+    shocks["last"] = logs[-1].tolist()
+
+
+def _update_window(state: dict, batch: pd.DataFrame) -> None:
+    window = state["window"]
+    limit = settings.incremental_window_periods
+    for column in WINDOW_COLUMNS:
+        if column in batch.columns and column not in window:
+            window[column] = [None] * state["window_length"]
+    for column, values in window.items():
+        values.extend(_json_values(_numeric(batch, column)))
+        del values[:-limit]
+    state["window_length"] = min(state["window_length"] + len(batch), limit)
+
+
+def append_periods(state: Optional[dict], df: pd.DataFrame, industry: str) -> tuple[dict, dict]:
+    """Fold new periods (oldest first) into ``state`` and return it with the refreshed analysis"""
+    state = state or new_state()
+    if state.get("version") != STATE_VERSION:
+        raise HTTPException(status_code=409, detail="Stored state is from an incompatible version; reset it")
+
+    with span("normalize"):
+        batch = _prepare(df)
+    if len(batch) == 0 and state["periods"] == 0:
+        raise HTTPException(status_code=400, detail="No periods to analyze")
+
+    with span("incremental_update"):
+        start = state["periods"]
+        _update_totals(state, batch)
+        _update_forecast(state, batch, start)
+        _update_shocks(state, batch)
+        _update_window(state, batch)
+        state["periods"] = start + len(batch)
+
+    return state, analyze_state(state, industry)
+
+
+def analyze_state(state: dict, industry: str) -> dict:
+    """Analysis derived from an incremental state alone"""
+    periods = state["periods"]
+    with span("metrics"):
+        metrics = _headline_metrics({column: tuple(v) for column, v in state["totals"].items()})
+
+    with span("forecast"):
+        moments = state["forecast"]
+        selected = [FORECAST_COLUMNS.index(column) for column in moments["columns"]]
+        predictor = _predictor(state["season_length"])
+        predictor.fit_moments(
+            moments["columns"],
+            periods,
+            np.asarray(moments["xtx"]),
+            np.asarray(moments["xty"])[:, selected],
+            np.asarray(moments["yty"])[selected],
+        )
+        forecast = predictor.forecast(periods=3)
+
+    with span("anomaly_detection"):
+        window = FinancialSeries.from_arrays({c: np.array(v, dtype=float) for c, v in state["window"].items()})
+        anomalies = _detect_anomalies(window, industry, offset=periods - state["window_length"])
+
+    shocks = state["shocks"]
+    valid = [shocks["valid"][0], shocks["valid"][1], shocks["valid"][2] and shocks["ar_seen"]]
+    distribution = MonteCarloSimulator(
+        paths=settings.simulation_paths, horizon=settings.simulation_horizon, seed=settings.simulation_seed
+    ).distribution_from_moments(periods, np.asarray(shocks["sums"]), np.asarray(shocks["cross"]), valid)
+
+    return _assemble_analysis(industry, metrics, forecast, anomalies, shock_distribution=distribution)
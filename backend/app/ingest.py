@@ -0,0 +1,293 @@
+"""
+Streaming ingestion for large tabular uploads.
+
+CSV, XLSX, Parquet and Arrow IPC sources are read in fixed-size chunks,
+projected down to the columns ``_normalize_columns`` understands, and folded
+into running column totals. Only a bounded trailing window of periods is kept
+in memory (as float32) for the forecasting and anomaly models, so peak memory
+does not grow with file size.
+
+Parquet and Arrow files are memory-mapped when spooled to disk (or wrapped
+zero-copy when held in memory) and only the projected columns are decoded.
+
+Raw transaction ledgers are detected from the header and aggregated into
+period frames by ``app.ledger`` instead.
+"""
+
+from __future__ import annotations
+import importlib
+import io
+from collections import deque
+from typing import IO, Callable, Iterator, Union
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+from .analysis import COLUMN_ALIASES, REQUIRED_FIELDS, TOTAL_COLUMNS, _normalize_name
+from .config import settings
+from .telemetry import report_progress
+from .uploads import ARROW_SUFFIXES, PARQUET_SUFFIXES
+
+Source = Union[str, IO[bytes]]
+
+KNOWN_COLUMNS = frozenset(COLUMN_ALIASES) | frozenset(COLUMN_ALIASES.values()) | frozenset(TOTAL_COLUMNS)
+
+# float32 carries 24 bits of mantissa; beyond this, integral amounts lose precision
+FLOAT32_EXACT_LIMIT = 2 ** 24
+
+
+def _project(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Normalize names, resolve aliases and coerce to numeric, dropping everything else"""
+    chunk.columns = [_normalize_name(c) for c in chunk.columns]
+    chunk = chunk.loc[:, ~chunk.columns.duplicated()]
+    for src, target in COLUMN_ALIASES.items():
+        if src in chunk.columns and target not in chunk.columns:
+            chunk[target] = chunk[src]
+    columns = [c for c in TOTAL_COLUMNS if c in chunk.columns]
+    projected = chunk[columns]
+    # Typed sources (Parquet/Arrow, clean CSV) are already numeric; only coerce the rest
+    mixed = [c for c in columns if not pd.api.types.is_numeric_dtype(projected[c])]
+    if mixed:
+        projected = projected.copy()
+        projected[mixed] = projected[mixed].apply(pd.to_numeric, errors="coerce")
+    return projected
+
+
+def _downcast(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Convert columns to float32 when every value fits without losing precision"""
+    for column in chunk.columns:
+        values = chunk[column].to_numpy(dtype=np.float64)
+        finite = values[np.isfinite(values)]
+        if finite.size and np.abs(finite).max() >= FLOAT32_EXACT_LIMIT:
+            continue
+        if np.array_equal(finite, finite.astype(np.float32).astype(np.float64)):
+            chunk[column] = values.astype(np.float32)
+    return chunk
+
+
+def _csv_chunks(
+    source: Source, chunksize: int, header: list[str], wanted: frozenset[str] = KNOWN_COLUMNS
+) -> Iterator[pd.DataFrame]:
+    def usecols(column) -> bool:
+        if str(column) not in header:
+            header.append(str(column))
+        return _normalize_name(column) in wanted
+
+    reader = pd.read_csv(
+        source,
+        usecols=usecols,
+        chunksize=chunksize,
+        on_bad_lines="skip",
+        engine="c",
+        low_memory=True,
+    )
+    with reader:
+        yield from reader
+
+
+def _projection(names: list[str], wanted: frozenset[str] = KNOWN_COLUMNS) -> list[str]:
+    """Source column names worth decoding, in schema order and without duplicates"""
+    keep: list[str] = []
+    for name in names:
+        if name not in keep and _normalize_name(name) in wanted:
+            keep.append(name)
+    return keep
+
+
+def _pyarrow(module: str = "pyarrow"):
+    """Import a pyarrow module, or 415 when pyarrow is not installed (e.g. the serverless build)"""
+    try:
+        return importlib.import_module(module)
+    except ImportError:
+        raise HTTPException(
+            status_code=415, detail="Parquet and Arrow uploads require pyarrow, which is not installed"
+        )
+
+
+def _arrow_input(source: Source):
+    """Memory-map a file on disk; wrap in-memory bytes without copying"""
+    pa = _pyarrow()
+
+    if isinstance(source, str):
+        return pa.memory_map(source, "r")
+    if isinstance(source, io.BytesIO):
+        return pa.BufferReader(pa.py_buffer(source.getbuffer()))
+    return pa.PythonFile(source, mode="r")
+
+
+def _open_ipc(handle):
+    """Open an Arrow IPC file (random access) or, failing that, an IPC stream"""
+    import pyarrow as pa
+
+    try:
+        return pa.ipc.open_file(handle)
+    except pa.ArrowInvalid:
+        handle.seek(0)
+        return pa.ipc.open_stream(handle)
+
+
+def _ipc_batches(reader) -> Iterator:
+    import pyarrow as pa
+
+    if isinstance(reader, pa.ipc.RecordBatchFileReader):
+        return (reader.get_batch(i) for i in range(reader.num_record_batches))
+    return iter(reader)
+
+
+def _parquet_chunks(
+    source: Source, chunksize: int, header: list[str], wanted: frozenset[str] = KNOWN_COLUMNS
+) -> Iterator[pd.DataFrame]:
+    pq = _pyarrow("pyarrow.parquet")
+
+    with _arrow_input(source) as handle:
+        parquet = pq.ParquetFile(handle)
+        names = parquet.schema_arrow.names
+        header.extend(names)
+        keep = _projection(names, wanted)
+        if not keep:
+            return
+        for batch in parquet.iter_batches(batch_size=chunksize, columns=keep):
+            yield batch.to_pandas()
+
+
+def _arrow_chunks(
+    source: Source, chunksize: int, header: list[str], wanted: frozenset[str] = KNOWN_COLUMNS
+) -> Iterator[pd.DataFrame]:
+    with _arrow_input(source) as handle:
+        reader = _open_ipc(handle)
+        names = reader.schema.names
+        header.extend(names)
+        keep = [names.index(name) for name in _projection(names, wanted)]
+        if not keep:
+            return
+        for batch in _ipc_batches(reader):
+            batch = batch.select(keep)
+            for offset in range(0, batch.num_rows, chunksize):
+                yield batch.slice(offset, chunksize).to_pandas()
+
+
+def read_arrow_frame(source: Source, filename: str) -> pd.DataFrame:
+    """Read every column of a Parquet/Arrow file, for callers that need more than the metric columns"""
+    pq = _pyarrow("pyarrow.parquet")
+
+    with _arrow_input(source) as handle:
+        if filename.lower().endswith(PARQUET_SUFFIXES):
+            table = pq.read_table(handle)
+        else:
+            table = _open_ipc(handle).read_all()
+        return table.to_pandas()
+
+
+def read_header(source: Source, filename: str) -> list[str]:
+    """Column names of a tabular source without reading its rows; file objects are rewound"""
+    name = filename.lower()
+    if name.endswith(".csv"):
+        names = list(pd.read_csv(source, nrows=0).columns)
+    elif name.endswith(PARQUET_SUFFIXES):
+        pq = _pyarrow("pyarrow.parquet")
+        with _arrow_input(source) as handle:
+            names = pq.ParquetFile(handle).schema_arrow.names
+    elif name.endswith(ARROW_SUFFIXES):
+        with _arrow_input(source) as handle:
+            names = _open_ipc(handle).schema.names
+    else:
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(source, read_only=True, data_only=True)
+        try:
+            first = next(workbook.active.iter_rows(values_only=True), None) or ()
+            names = [str(c) for c in first if c is not None]
+        finally:
+            workbook.close()
+    if not isinstance(source, str):
+        source.seek(0)
+    return [str(n) for n in names]
+
+
+def _chunk_reader(filename: str) -> Callable[..., Iterator[pd.DataFrame]]:
+    name = filename.lower()
+    if name.endswith(".csv"):
+        return _csv_chunks
+    if name.endswith(PARQUET_SUFFIXES):
+        return _parquet_chunks
+    if name.endswith(ARROW_SUFFIXES):
+        return _arrow_chunks
+    return _xlsx_chunks
+
+
+def _xlsx_chunks(
+    source: Source, chunksize: int, header: list[str], wanted: frozenset[str] = KNOWN_COLUMNS
+) -> Iterator[pd.DataFrame]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        first = next(rows, None)
+        if first is None:
+            return
+        header.extend(str(c) for c in first if c is not None)
+        keep = [i for i, c in enumerate(first) if c is not None and _normalize_name(c) in wanted]
+        names = [first[i] for i in keep]
+
+        batch = []
+        for row in rows:
+            batch.append([row[i] if i < len(row) else None for i in keep])
+            if len(batch) >= chunksize:
+                yield pd.DataFrame(batch, columns=names)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=names)
+    finally:
+        workbook.close()
+
+
+def stream_tabular(
+    source: Source,
+    filename: str,
+    chunksize: int | None = None,
+    max_periods: int | None = None,
+) -> tuple[pd.DataFrame, dict[str, tuple[float, int]], int]:
+    """Read a CSV/XLSX/Parquet/Arrow source chunk by chunk.
+
+    Returns the trailing ``max_periods`` rows as a compact frame, running
+    (sum, count) totals over every row, in the shape ``analyze_dataframe``
+    accepts, and the number of leading rows dropped from the frame.
+    """
+    chunksize = chunksize or settings.stream_chunk_rows
+    max_periods = max_periods or settings.stream_max_periods
+    chunks = _chunk_reader(filename)
+
+    totals: dict[str, tuple[float, int]] = {}
+    window: deque[pd.DataFrame] = deque()
+    retained = 0
+    periods = 0
+    rows_read = 0
+    header: list[str] = []
+
+    for raw in chunks(source, chunksize, header):
+        chunk = _project(raw)
+        for column in chunk.columns:
+            values = chunk[column]
+            total, count = totals.get(column, (0.0, 0))
+            totals[column] = (total + float(values.sum()), count + int(values.count()))
+
+        window.append(_downcast(chunk))
+        retained += len(chunk)
+        periods += len(chunk)
+        rows_read += len(raw)
+        report_progress(rows_read=rows_read)
+        while window and retained - len(window[0]) >= max_periods:
+            retained -= len(window.popleft())
+
+    missing = [f for f in REQUIRED_FIELDS if f not in totals]
+    if missing:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Missing required fields: {', '.join(missing)}. Found columns: {', '.join(header)}. Please include 'revenue' and 'expenses' columns.",
+        )
+
+    if not window:
+        return pd.DataFrame(columns=list(totals)), totals, 0
+
+    frame = pd.concat(window, ignore_index=True).iloc[-max_periods:].reset_index(drop=True)
+    return frame, totals, periods - len(frame)
@@ -1,3 +1,32 @@
+"""
+Bank and payment provider integrations.
+
+Providers are called over one shared ``httpx.AsyncClient`` (pooled keep-alive
+connections) and fanned out concurrently, each with its own timeout and
+circuit breaker; successful responses are cached for a short TTL. Provider
+cash-flow series become cash_in/cash_out periods for the analysis pipeline.
+
+Every provider speaks the same small protocol (served locally by
+``benchmarks.bank_stub``):
+
+    GET {base_url}/accounts/{company_id}/summary
+    GET {base_url}/accounts/{company_id}/cashflow?periods=N
+        -> {"periods": [{"period": "2025-01", "inflows": ..., "outflows": ...}, ...]}
+
+Providers without a configured URL fall back to the built-in mock summaries.
+"""
+
+from __future__ import annotations
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+import httpx
+from .config import settings
+
+MAX_CACHED_RESPONSES = 1024
+
+
 def bank_a_summary() -> dict:
     return {
         "provider": "MockBank A",
@@ -17,3 +46,240 @@ def bank_b_summary() -> dict:
         "chargebacks": 1200.0,
         "note": "Replace with real payment API integration",
     }
+
+
+class IntegrationError(Exception):
+    def __init__(self, provider: str, reason: str, status_code: int = 502):
+        super().__init__(f"{provider}: {reason}")
+        self.provider = provider
+        self.reason = reason
+        self.status_code = status_code
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures and lets one trial call through after ``reset_seconds``"""
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def release(self) -> None:
+        """Give back a trial call that ended without an outcome (e.g. cancelled)"""
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class Provider:
+    def __init__(self, name: str, base_url: str, timeout: float, fallback_summary=None):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.fallback_summary = fallback_summary
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.base_url)
+
+
+class IntegrationHub:
+    def __init__(
+        self,
+        providers: list[Provider],
+        max_connections: int,
+        cache_ttl: float,
+        breaker_failures: int,
+        breaker_reset: float,
+    ):
+        self.providers = {provider.name: provider for provider in providers}
+        self.max_connections = max_connections
+        self.cache_ttl = cache_ttl
+        self.breakers = {name: CircuitBreaker(breaker_failures, breaker_reset) for name in self.providers}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._cache: OrderedDict[tuple[str, str], tuple[float, Any]] = OrderedDict()
+        self.requests = 0
+        self.cache_hits = 0
+        self.failures = 0
+        self.short_circuited = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections, max_keepalive_connections=self.max_connections
+                ),
+            )
+        return self._client
+
+    def _cached(self, key: tuple[str, str]) -> Optional[Any]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires_at, payload = entry
+        if expires_at < time.monotonic():
+            del self._cache[key]
+            return None
+        return payload
+
+    def _store(self, key: tuple[str, str], payload: Any) -> None:
+        if self.cache_ttl <= 0:
+            return
+        self._cache[key] = (time.monotonic() + self.cache_ttl, payload)
+        self._cache.move_to_end(key)
+        while len(self._cache) > MAX_CACHED_RESPONSES:
+            self._cache.popitem(last=False)
+
+    async def fetch(self, name: str, path: str, params: Optional[dict] = None) -> Any:
+        """GET ``path`` from one provider through its cache and circuit breaker"""
+        provider = self.providers.get(name)
+        if provider is None:
+            raise IntegrationError(name, "unknown provider", status_code=404)
+        if not provider.configured:
+            raise IntegrationError(name, "provider URL not configured", status_code=503)
+
+        key = (name, f"{path}?{sorted((params or {}).items())}")
+        payload = self._cached(key)
+        if payload is not None:
+            self.cache_hits += 1
+            return payload
+
+        breaker = self.breakers[name]
+        if not breaker.allow():
+            self.short_circuited += 1
+            raise IntegrationError(name, "circuit open", status_code=503)
+
+        self.requests += 1
+        try:
+            response = await self._get_client().get(
+                f"{provider.base_url}{path}", params=params, timeout=provider.timeout
+            )
+            response.raise_for_status()
+            payload = response.json()
+        except httpx.TimeoutException:
+            breaker.record_failure()
+            self.failures += 1
+            raise IntegrationError(name, "timed out", status_code=504)
+        except (httpx.HTTPError, ValueError) as exc:
+            breaker.record_failure()
+            self.failures += 1
+            raise IntegrationError(name, str(exc) or type(exc).__name__)
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+
+        breaker.record_success()
+        self._store(key, payload)
+        return payload
+
+    async def fan_out(self, path: str, params: Optional[dict] = None) -> dict[str, Any]:
+        """Fetch ``path`` from every configured provider concurrently; failures come back as IntegrationError values"""
+        names = [name for name, provider in self.providers.items() if provider.configured]
+        results = await asyncio.gather(
+            *(self.fetch(name, path, params) for name in names), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, BaseException) and not isinstance(result, IntegrationError):
+                raise result
+        return dict(zip(names, results))
+
+    async def summary(self, name: str, company_id: str) -> dict:
+        provider = self.providers.get(name)
+        if provider is not None and not provider.configured and provider.fallback_summary is not None:
+            return provider.fallback_summary()
+        return await self.fetch(name, f"/accounts/{company_id}/summary")
+
+    async def cashflow(self, company_id: str, periods: int) -> dict:
+        """Per-period cash_in/cash_out summed across providers, oldest first, with each provider's status"""
+        results = await self.fan_out(f"/accounts/{company_id}/cashflow", {"periods": periods})
+        totals: dict[str, list[float]] = {}
+        status: dict[str, str] = {}
+        for name, result in results.items():
+            if isinstance(result, IntegrationError):
+                status[name] = result.reason
+                continue
+            status[name] = "ok"
+            for row in result.get("periods", []):
+                cash = totals.setdefault(str(row["period"]), [0.0, 0.0])
+                cash[0] += float(row.get("inflows") or 0.0)
+                cash[1] += float(row.get("outflows") or 0.0)
+
+        series = [
+            {"period": period, "cash_in": cash_in, "cash_out": cash_out}
+            for period, (cash_in, cash_out) in sorted(totals.items())
+        ]
+        return {"providers": status, "periods": series[-periods:]}
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "failures": self.failures,
+            "short_circuited": self.short_circuited,
+            "cached_responses": len(self._cache),
+            "breakers": {name: breaker.state for name, breaker in self.breakers.items()},
+        }
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def merge_cash_flows(records: list[dict], periods: list[dict]) -> list[dict]:
+    """Overlay provider cash flows on the most recent ``records`` (both oldest first).
+
+    Without records the cash series itself stands in as a cash-basis P&L.
+    """
+    if not records:
+        return [
+            {"revenue": p["cash_in"], "expenses": p["cash_out"], "cash_in": p["cash_in"], "cash_out": p["cash_out"]}
+            for p in periods
+        ]
+    merged = [dict(record) for record in records]
+    overlap = min(len(merged), len(periods))
+    if overlap:
+        for record, period in zip(merged[-overlap:], periods[-overlap:]):
+            record["cash_in"] = period["cash_in"]
+            record["cash_out"] = period["cash_out"]
+    return merged
+
+
+integration_hub = IntegrationHub(
+    providers=[
+        Provider("bank_a", settings.bank_a_url, settings.bank_a_timeout_seconds, bank_a_summary),
+        Provider("bank_b", settings.bank_b_url, settings.bank_b_timeout_seconds, bank_b_summary),
+    ],
+    max_connections=settings.integration_max_connections,
+    cache_ttl=settings.integration_cache_ttl_seconds,
+    breaker_failures=settings.integration_breaker_failures,
+    breaker_reset=settings.integration_breaker_reset_seconds,
+)
@@ -0,0 +1,415 @@
+"""
+Background analysis jobs, queued in the application database.
+
+POST /jobs stores the upload under JOB_DIR and inserts a queued row. Workers
+claim rows with a conditional UPDATE, so any number of worker threads or
+processes can share the table without a message broker. A running job holds
+a lease that its worker keeps renewing; if the lease lapses (say the worker
+died) the job is claimed again, up to JOB_MAX_ATTEMPTS. A job running past
+JOB_TIMEOUT_SECONDS is failed with a 504 and its pool terminated, so a hung
+job neither renews its lease forever nor holds a worker slot. Progress (stage
+reached, pages or rows parsed) is written back to the row as the job runs.
+
+Workers run inside the API process (JOB_WORKERS threads feeding a process
+pool) and/or standalone on the same host, sharing DATABASE_URL and JOB_DIR:
+
+    cd backend
+    python -m app.jobs --concurrency 4
+"""
+
+from __future__ import annotations
+import argparse
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from typing import Any, Optional
+from sqlalchemy import and_, or_, update
+from sqlalchemy.orm import Session
+from . import telemetry
+from .config import settings
+from .db import SessionLocal, dispose_after_fork
+from .executor import JobError, _invoke, init_pool_worker, terminate_pool
+from .models import AnalysisJob
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+# Progress is written at most this often (stage changes are always written)
+PROGRESS_INTERVAL_SECONDS = 0.5
+CLAIM_CANDIDATES = 8
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def submit(
+    db: Session,
+    job_id: str,
+    filename: str,
+    industry: str,
+    input_path: Optional[str],
+    digest: str,
+    cached_result: Optional[dict] = None,
+) -> AnalysisJob:
+    """Queue a job; with ``cached_result`` it is recorded as already finished"""
+    job = AnalysisJob(id=job_id, filename=filename, industry=industry, digest=digest, progress={"stage": QUEUED})
+    if cached_result is None:
+        job.status = QUEUED
+        job.input_path = input_path
+    else:
+        job.status = SUCCEEDED
+        job.result = cached_result
+        job.progress = {"stage": "done", "cached": True}
+        job.finished_at = _now()
+        _remove_input(input_path)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def get(db: Session, job_id: str) -> Optional[AnalysisJob]:
+    return db.get(AnalysisJob, job_id)
+
+
+def _claimable(now: float):
+    return or_(
+        AnalysisJob.status == QUEUED,
+        and_(AnalysisJob.status == RUNNING, AnalysisJob.lease_expires_at < now),
+    )
+
+
+def claim(worker_id: str, lease_seconds: float, max_attempts: int) -> Optional[dict]:
+    """Atomically take the oldest claimable job, or None when the queue is empty"""
+    with SessionLocal() as db:
+        now = time.time()
+        candidates = (
+            db.query(AnalysisJob.id)
+            .filter(_claimable(now))
+            .order_by(AnalysisJob.created_at, AnalysisJob.id)
+            .limit(CLAIM_CANDIDATES)
+            .all()
+        )
+        for (job_id,) in candidates:
+            claimed = db.execute(
+                update(AnalysisJob)
+                .where(AnalysisJob.id == job_id, _claimable(now))
+                .values(
+                    status=RUNNING,
+                    worker=worker_id,
+                    attempts=AnalysisJob.attempts + 1,
+                    lease_expires_at=now + lease_seconds,
+                    started_at=_now(),
+                    progress={"stage": "claimed"},
+                )
+            )
+            db.commit()
+            if not claimed.rowcount:
+                continue  # another worker got there first
+
+            job = db.get(AnalysisJob, job_id)
+            if job.attempts > max_attempts:
+                _finish(job_id, worker_id, FAILED, error={
+                    "status_code": 500, "detail": f"Job abandoned after {max_attempts} attempts",
+                })
+                continue
+            return {
+                "id": job.id,
+                "filename": job.filename,
+                "industry": job.industry,
+                "input_path": job.input_path,
+                "digest": job.digest,
+            }
+    return None
+
+
+def _update_running(job_id: str, worker_id: str, **values: Any) -> bool:
+    """Update a job this worker still holds; False once the lease was lost to another worker"""
+    with SessionLocal() as db:
+        result = db.execute(
+            update(AnalysisJob)
+            .where(AnalysisJob.id == job_id, AnalysisJob.worker == worker_id, AnalysisJob.status == RUNNING)
+            .values(**values)
+        )
+        db.commit()
+        return bool(result.rowcount)
+
+
+def _finish(job_id: str, worker_id: str, status: str, result: Optional[dict] = None, error: Optional[dict] = None):
+    stage = "done" if status == SUCCEEDED else FAILED
+    finished = _update_running(
+        job_id, worker_id,
+        status=status, result=result, error=error, progress={"stage": stage},
+        finished_at=_now(), lease_expires_at=None,
+    )
+    if finished:
+        with SessionLocal() as db:
+            job = db.get(AnalysisJob, job_id)
+            _remove_input(job.input_path if job else None)
+    return finished
+
+
+def _remove_input(path: Optional[str]) -> None:
+    if path:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+class _ProgressWriter:
+    """Progress callback for ``telemetry.progress_reporter``; also renews the job's lease"""
+
+    def __init__(self, job_id: str, worker_id: str, lease_seconds: float):
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.progress: dict = {}
+        self._written_at = 0.0
+
+    def __call__(self, fields: dict) -> None:
+        stage_changed = "stage" in fields and fields["stage"] != self.progress.get("stage")
+        self.progress.update(fields)
+        now = time.monotonic()
+        if stage_changed or now - self._written_at >= PROGRESS_INTERVAL_SECONDS:
+            self._written_at = now
+            _update_running(
+                self.job_id, self.worker_id,
+                progress=dict(self.progress), lease_expires_at=time.time() + self.lease_seconds,
+            )
+
+
+def run_job(job_id: str, worker_id: str, filename: str, industry: str, input_path: str, lease_seconds: float) -> dict:
+    """Analyze a claimed job's upload, reporting progress to its row (runs in a pool worker)"""
+    from .pipeline import analyze_upload
+
+    with telemetry.progress_reporter(_ProgressWriter(job_id, worker_id, lease_seconds)):
+        return analyze_upload(filename, input_path, industry)
+
+
+def _init_pool_process() -> None:
+    # Connections inherited from the parent must not be reused by the child
+    dispose_after_fork()
+    init_pool_worker()
+
+
+class JobWorker:
+    def __init__(
+        self,
+        concurrency: int,
+        poll_interval: float,
+        lease_seconds: float,
+        max_attempts: int,
+        timeout: float,
+        processes: bool = True,
+    ):
+        self.concurrency = max(concurrency, 0)
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.processes = processes
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._pool: Optional[Executor] = None
+        self._threads: list[threading.Thread] = []
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.active = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.recycled = 0
+
+    def _get_pool(self) -> Executor:
+        with self._lock:
+            if self._pool is None:
+                if self.processes:
+                    self._pool = ProcessPoolExecutor(max_workers=self.concurrency, initializer=_init_pool_process)
+                else:
+                    self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="job")
+            return self._pool
+
+    def _replace_pool(self, pool: Executor) -> None:
+        """Drop a broken pool so the next job starts a fresh one"""
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+            self.recycled += 1
+        terminate_pool(pool)
+
+    def start(self) -> None:
+        if self._threads or self.concurrency == 0:
+            return
+        self._stop.clear()
+        for index in range(self.concurrency):
+            thread = threading.Thread(target=self._loop, name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop claiming jobs; running ones keep their lease until it lapses and are then retried"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job = claim(self.worker_id, self.lease_seconds, self.max_attempts)
+            except Exception:
+                logger.exception("Failed to claim a job")
+                job = None
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            with self._lock:
+                self.active += 1
+            try:
+                self._run(job)
+            finally:
+                with self._lock:
+                    self.active -= 1
+
+    def _run(self, job: dict) -> None:
+        args = (job["id"], self.worker_id, job["filename"], job["industry"], job["input_path"], self.lease_seconds)
+        pool = self._get_pool()
+        try:
+            future = pool.submit(_invoke, "jobs:run_job", args)
+        except BrokenProcessPool:
+            self._replace_pool(pool)
+            pool = self._get_pool()
+            future = pool.submit(_invoke, "jobs:run_job", args)
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                remaining = deadline - time.monotonic()
+                result, observations, _ = future.result(timeout=max(min(self.lease_seconds / 3, remaining), 0))
+                break
+            except FuturesTimeout:
+                if time.monotonic() >= deadline:
+                    self._time_out(job, pool, future)
+                    return
+                # Heartbeat in case the job is in a long stage without progress updates
+                if not _update_running(job["id"], self.worker_id, lease_expires_at=time.time() + self.lease_seconds):
+                    logger.warning("Lost the lease on job %s", job["id"])
+                    return
+            except BrokenProcessPool:
+                # A worker died (possibly running this job): replace the pool and hand the
+                # job back right away, so it is retried up to JOB_MAX_ATTEMPTS
+                logger.warning("Worker pool broke while running job %s", job["id"])
+                self._replace_pool(pool)
+                _update_running(job["id"], self.worker_id, lease_expires_at=time.time())
+                return
+            except JobError as exc:
+                self._record(_finish(job["id"], self.worker_id, FAILED, error={
+                    "status_code": exc.status_code, "detail": exc.detail,
+                }), success=False)
+                return
+            except Exception as exc:
+                logger.exception("Job %s failed", job["id"])
+                self._record(_finish(job["id"], self.worker_id, FAILED, error={
+                    "status_code": 500, "detail": f"Analysis failed: {exc}",
+                }), success=False)
+                return
+
+        telemetry.record(observations)
+        if self._record(_finish(job["id"], self.worker_id, SUCCEEDED, result=result), success=True):
+            self._publish(job, result)
+
+    def _time_out(self, job: dict, pool: Executor, future) -> None:
+        """Fail a job past JOB_TIMEOUT_SECONDS; failing it also ends the lease renewals"""
+        logger.warning("Job %s timed out after %.0f seconds", job["id"], self.timeout)
+        finished = _finish(job["id"], self.worker_id, FAILED, error={
+            "status_code": 504, "detail": f"Analysis timed out after {self.timeout:.0f} seconds",
+        })
+        with self._lock:
+            self.timed_out += 1
+        self._record(finished, success=False)
+        if not future.cancel() and isinstance(pool, ProcessPoolExecutor):
+            # Other jobs running in this pool break too and are handed back for a retry
+            self._replace_pool(pool)
+
+    def _record(self, finished: bool, success: bool) -> bool:
+        with self._lock:
+            if finished and success:
+                self.succeeded += 1
+            elif finished:
+                self.failed += 1
+        return finished
+
+    @staticmethod
+    def _publish(job: dict, result: dict) -> None:
+        """Share a finished result with the assessment history and the result cache"""
+        from .cache import result_cache, upload_cache_key
+        from .persistence import assessment_writer
+
+        assessment_writer.submit(result)
+        if job.get("digest"):
+            result_cache.put(upload_cache_key(job["digest"], job["filename"], job["industry"]), result)
+
+    def stats(self) -> dict:
+        return {
+            "worker_id": self.worker_id,
+            "concurrency": self.concurrency,
+            "active": self.active,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "recycled": self.recycled,
+        }
+
+
+job_worker = JobWorker(
+    concurrency=settings.job_workers,
+    poll_interval=settings.job_poll_seconds,
+    lease_seconds=settings.job_lease_seconds,
+    max_attempts=settings.job_max_attempts,
+    timeout=settings.job_timeout_seconds,
+    processes=settings.analysis_workers > 0,
+)
+
+
+def main() -> None:
+    from .db import init_db
+    from .persistence import assessment_writer
+
+    parser = argparse.ArgumentParser(description="Run background analysis job workers")
+    parser.add_argument("--concurrency", type=int, default=os.cpu_count() or 1, help="jobs run at once")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    assessment_writer.start()
+    worker = JobWorker(
+        concurrency=args.concurrency,
+        poll_interval=settings.job_poll_seconds,
+        lease_seconds=settings.job_lease_seconds,
+        max_attempts=settings.job_max_attempts,
+        timeout=settings.job_timeout_seconds,
+    )
+    stopped = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stopped.set())
+
+    worker.start()
+    logger.info("Job worker %s running %d jobs at a time", worker.worker_id, worker.concurrency)
+    stopped.wait()
+    worker.stop()
+    assessment_writer.stop()
+
+
+if __name__ == "__main__":
+    main()
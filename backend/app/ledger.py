@@ -0,0 +1,259 @@
+"""
+Transaction ledger aggregation.
+
+Clients often export raw ledgers (date, amount, category, counterparty)
+rather than one row per period. Such inputs are detected by their columns and
+folded, chunk by chunk, into the per-period frame ``analyze_dataframe``
+expects:
+
+- each distinct category is classified once against ``CATEGORY_RULES``, and
+  rows pick up their class through the category codes;
+- amounts are bucketed by period and class with one groupby per chunk;
+- receivable and payable balances are running sums of invoices less
+  settlements;
+- receivables are aged FIFO per counterparty at the last ledger date.
+
+Memory is bounded by periods x classes plus counterparties x periods,
+independent of the number of transactions.
+"""
+
+from __future__ import annotations
+import json
+import re
+from typing import Iterable, Optional
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+from .analysis import _column_totals, _normalize_name
+from .config import settings
+from .ingest import Source, _chunk_reader
+from .telemetry import report_progress, span
+
+# Normalized source names recognised for each ledger field
+LEDGER_ALIASES = {
+    "date": ["date", "transaction_date", "txn_date", "posting_date", "posted_at", "value_date", "booking_date"],
+    "amount": ["amount", "transaction_amount", "amt", "value"],
+    "debit": ["debit", "dr", "withdrawal"],
+    "credit": ["credit", "cr", "deposit"],
+    "category": ["category", "account", "account_name", "gl_account", "transaction_type", "type"],
+    "counterparty": ["counterparty", "customer", "vendor", "party", "payee", "payer"],
+}
+LEDGER_COLUMNS = frozenset(name for names in LEDGER_ALIASES.values() for name in names)
+
+# First matching rule wins; unmatched categories fall back to the amount's sign
+CATEGORY_RULES = [
+    ("ignore", r"transfer|opening balance|closing balance|contra"),
+    ("receipt", r"customer payment|payment received|receipt|collection|ar payment"),
+    ("receivable", r"invoice|credit sale|receivable|billing"),
+    ("payment", r"vendor payment|supplier payment|bill payment|payment made|ap payment"),
+    ("payable", r"\bbills?\b|payable|purchase order"),
+    ("debt", r"loan|emi|interest|repayment|debt"),
+    ("tax", r"\btax|gst|vat|tds"),
+    ("revenue", r"sale|revenue|income|fee|commission|upi|card"),
+    ("expenses", r"salar|wage|payroll|rent|utilit|purchase|cogs|expense|cost|marketing|freight|fuel|insurance|suppl|maintenance"),
+]
+CLASSES = ["revenue", "expenses", "receivable", "receipt", "payable", "payment", "debt", "tax", "ignore"]
+PERIOD_COLUMNS = ["revenue", "expenses", "cash_in", "cash_out", "ar", "ap", "debt", "tax"]
+
+# How one unit of each class moves each period column (ar/ap rows are balance changes)
+_EFFECTS = pd.DataFrame(0.0, index=CLASSES, columns=PERIOD_COLUMNS)
+_EFFECTS.loc["revenue", ["revenue", "cash_in"]] = 1.0
+_EFFECTS.loc["expenses", ["expenses", "cash_out"]] = 1.0
+_EFFECTS.loc["receivable", ["revenue", "ar"]] = 1.0
+_EFFECTS.loc["receipt", "cash_in"] = 1.0
+_EFFECTS.loc["receipt", "ar"] = -1.0
+_EFFECTS.loc["payable", ["expenses", "ap"]] = 1.0
+_EFFECTS.loc["payment", "cash_out"] = 1.0
+_EFFECTS.loc["payment", "ap"] = -1.0
+_EFFECTS.loc["debt", ["debt", "cash_out"]] = 1.0
+_EFFECTS.loc["tax", ["tax", "cash_out"]] = 1.0
+
+AGING_BUCKETS = [(30, "0-30"), (60, "31-60"), (90, "61-90")]
+OLDEST_BUCKET = "90+"
+
+_COMPILED_RULES = [(label, re.compile(pattern, re.IGNORECASE)) for label, pattern in CATEGORY_RULES]
+
+
+def _fields(columns: Iterable) -> dict[str, str]:
+    """Ledger field -> normalized source column"""
+    normalized = {_normalize_name(c) for c in columns}
+    found = {}
+    for field, aliases in LEDGER_ALIASES.items():
+        for alias in aliases:
+            if alias in normalized:
+                found[field] = alias
+                break
+    return found
+
+
+def is_ledger(columns: Iterable) -> bool:
+    """Transaction-level data: a date and an amount (or debit/credit), and no revenue/expenses columns"""
+    columns = list(columns)
+    normalized = {_normalize_name(c) for c in columns}
+    if normalized & {"revenue", "expenses", "sales", "income", "turnover", "cost", "expense"}:
+        return False
+    fields = _fields(columns)
+    return "date" in fields and ("amount" in fields or {"debit", "credit"} <= fields.keys())
+
+
+class CategoryClassifier:
+    """Maps category labels to ledger classes, evaluating the rules once per distinct label"""
+
+    def __init__(self, overrides: Optional[dict[str, str]] = None):
+        self.overrides = {str(k).strip().lower(): v for k, v in (overrides or {}).items()}
+        unknown = sorted(set(self.overrides.values()) - set(CLASSES))
+        if unknown:
+            raise ValueError(f"Unknown ledger classes in category map: {', '.join(unknown)}")
+        self._memo: dict[str, int] = {}
+
+    def classify(self, label: str) -> int:
+        """Index into CLASSES, or -1 to fall back to the amount's sign"""
+        code = self._memo.get(label)
+        if code is None:
+            key = label.strip().lower()
+            cls = self.overrides.get(key)
+            if cls is None:
+                cls = next((name for name, pattern in _COMPILED_RULES if pattern.search(key)), None)
+            code = CLASSES.index(cls) if cls is not None else -1
+            self._memo[label] = code
+        return code
+
+    def codes(self, categories: pd.Series, amounts: np.ndarray) -> np.ndarray:
+        categorical = pd.Categorical(categories.astype("string"))
+        lookup = np.array([self.classify(str(c)) for c in categorical.categories] + [-1], dtype=np.int8)
+        codes = lookup[categorical.codes]  # NaN category has code -1, which indexes the trailing -1
+        fallback = np.where(amounts >= 0, CLASSES.index("revenue"), CLASSES.index("expenses"))
+        return np.where(codes >= 0, codes, fallback).astype(np.int8)
+
+
+def _numeric(values: pd.Series) -> np.ndarray:
+    if not pd.api.types.is_numeric_dtype(values):
+        values = pd.to_numeric(values.astype("string").str.replace(",", "", regex=False), errors="coerce")
+    return values.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+class LedgerAggregator:
+    def __init__(self, freq: str, classifier: CategoryClassifier):
+        self.freq = freq
+        self.classifier = classifier
+        self._flows: Optional[pd.Series] = None  # (period ordinal, class) -> amount
+        self._receivables: Optional[pd.DataFrame] = None  # (counterparty, period ordinal) -> invoiced, received
+        self.last_date: Optional[pd.Timestamp] = None
+        self.rows = 0
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        fields = _fields(chunk.columns)
+        chunk = chunk.copy()
+        chunk.columns = [_normalize_name(c) for c in chunk.columns]
+        chunk = chunk.loc[:, ~chunk.columns.duplicated()]
+
+        if "amount" in fields:
+            amounts = _numeric(chunk[fields["amount"]])
+        else:
+            amounts = np.nan_to_num(_numeric(chunk[fields["credit"]])) - np.nan_to_num(_numeric(chunk[fields["debit"]]))
+        dates = pd.to_datetime(chunk[fields["date"]], errors="coerce")
+        valid = dates.notna().to_numpy() & np.isfinite(amounts)
+        self.rows += len(chunk)
+        if not valid.any():
+            return
+
+        dates, amounts = dates[valid], amounts[valid]
+        if "category" in fields:
+            classes = self.classifier.codes(chunk[fields["category"]][valid], amounts)
+        else:
+            classes = np.where(amounts >= 0, CLASSES.index("revenue"), CLASSES.index("expenses")).astype(np.int8)
+        periods = dates.dt.to_period(self.freq).array.asi8
+        magnitude = np.abs(amounts)
+
+        flows = pd.Series(magnitude).groupby([periods, classes]).sum()
+        self._flows = flows if self._flows is None else self._flows.add(flows, fill_value=0.0)
+
+        is_invoice = classes == CLASSES.index("receivable")
+        is_receipt = classes == CLASSES.index("receipt")
+        receivable = is_invoice | is_receipt
+        if receivable.any():
+            parties = (
+                chunk[fields["counterparty"]][valid][receivable].astype("string").fillna("")
+                if "counterparty" in fields
+                else pd.Series("", index=range(int(receivable.sum())), dtype="string")
+            )
+            frame = pd.DataFrame({
+                "invoiced": np.where(is_invoice, magnitude, 0.0)[receivable],
+                "received": np.where(is_receipt, magnitude, 0.0)[receivable],
+            })
+            partial = frame.groupby([parties.to_numpy(), periods[receivable]]).sum()
+            self._receivables = partial if self._receivables is None else self._receivables.add(partial, fill_value=0.0)
+
+        latest = dates.max()
+        if self.last_date is None or latest > self.last_date:
+            self.last_date = latest
+
+    def frame(self) -> tuple[pd.DataFrame, Optional[dict]]:
+        """Per-period frame (oldest first, gaps filled) and receivables aging, or None without receivables"""
+        if self._flows is None or self._flows.empty:
+            raise HTTPException(status_code=400, detail="Ledger contains no dated transactions with amounts")
+
+        by_class = self._flows.unstack(fill_value=0.0).reindex(columns=range(len(CLASSES)), fill_value=0.0)
+        first, last = int(by_class.index.min()), int(by_class.index.max())
+        by_class = by_class.reindex(range(first, last + 1), fill_value=0.0)
+        by_class.columns = CLASSES
+        frame = by_class @ _EFFECTS
+        frame[["ar", "ap"]] = frame[["ar", "ap"]].cumsum().clip(lower=0.0)
+
+        present = by_class.sum()
+        keep = ["revenue", "expenses", "cash_in", "cash_out"]
+        keep += [c for c, classes in (("ar", ["receivable", "receipt"]), ("ap", ["payable", "payment"]),
+                                      ("debt", ["debt"]), ("tax", ["tax"])) if present[classes].sum() > 0]
+        return frame[keep].reset_index(drop=True), self._aging()
+
+    def _aging(self) -> Optional[dict]:
+        """Outstanding receivables by age, settling each counterparty's oldest invoices first"""
+        if self._receivables is None or self._receivables["invoiced"].sum() <= 0:
+            return None
+        ledger = self._receivables.sort_index()
+        grouped = ledger.groupby(level=0)
+        outstanding = (grouped["invoiced"].transform("sum") - grouped["received"].transform("sum")).clip(lower=0.0)
+        # Invoices issued after each period; whatever is still outstanding beyond them is this period's
+        issued_later = grouped["invoiced"].transform("sum") - grouped["invoiced"].cumsum()
+        open_amount = (outstanding - issued_later).clip(lower=0.0).clip(upper=ledger["invoiced"])
+
+        ordinals = ledger.index.get_level_values(1).to_numpy()
+        period_end = pd.PeriodIndex.from_ordinals(ordinals, freq=self.freq).end_time
+        age_days = np.maximum((self.last_date - period_end).days.to_numpy(), 0)
+        bounds = [bound for bound, _ in AGING_BUCKETS]
+        buckets = np.searchsorted(bounds, age_days, side="left")
+        totals = np.bincount(buckets, weights=open_amount.to_numpy(), minlength=len(bounds) + 1)
+
+        labels = [label for _, label in AGING_BUCKETS] + [OLDEST_BUCKET]
+        aging = {label: round(float(total), 2) for label, total in zip(labels, totals)}
+        aging["total"] = round(float(totals.sum()), 2)
+        return aging
+
+
+def _classifier() -> CategoryClassifier:
+    overrides = json.loads(settings.ledger_category_map) if settings.ledger_category_map else None
+    return CategoryClassifier(overrides)
+
+
+def aggregate_ledger(
+    chunks: Iterable[pd.DataFrame], max_periods: int | None = None
+) -> tuple[pd.DataFrame, dict[str, tuple[float, int]], Optional[dict], int]:
+    """Fold ledger chunks into (trailing period frame, totals over every period, receivables aging,
+    leading periods dropped from the frame)"""
+    max_periods = max_periods or settings.stream_max_periods
+    aggregator = LedgerAggregator(settings.ledger_period, _classifier())
+    with span("ledger_aggregation"):
+        for chunk in chunks:
+            aggregator.add(chunk)
+            report_progress(rows_read=aggregator.rows)
+        frame, aging = aggregator.frame()
+    dropped = max(len(frame) - max_periods, 0)
+    return frame.iloc[dropped:].reset_index(drop=True), _column_totals(frame), aging, dropped
+
+
+def stream_ledger(
+    source: Source, filename: str, chunksize: int | None = None, max_periods: int | None = None
+) -> tuple[pd.DataFrame, dict[str, tuple[float, int]], Optional[dict], int]:
+    """Read a CSV/XLSX/Parquet/Arrow ledger chunk by chunk, decoding only the ledger columns"""
+    chunks = _chunk_reader(filename)(source, chunksize or settings.stream_chunk_rows, [], LEDGER_COLUMNS)
+    return aggregate_ledger(chunks, max_periods)
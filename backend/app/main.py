@@ -1,11 +1,42 @@
-from fastapi import FastAPI, File, UploadFile, Depends, HTTPException, Header
+import time
+
+_import_started = time.perf_counter()
+
+import os
+import sys
+import uuid
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+from fastapi import FastAPI, File, UploadFile, Depends, HTTPException, Header, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from .config import settings
-from .db import get_db, init_db
-from .analysis import analyze_dataframe, parse_upload_to_df, build_recommendations
-from .schemas import AnalysisResponse, AnalysisRequest
-from .integrations import bank_a_summary, bank_b_summary
+from .db import close_engines, get_db, init_db, pool_status, run_db
+from .uploads import save_upload, spooled_upload
+from .admission import admission_control, request_coalescer, request_kind
+from .executor import analysis_executor
+from .fields import parse_fields, select_fields, skipped_stages
+from .cache import result_cache, columnar_cache_key, partial_cache_key, records_cache_key, upload_cache_key
+from .persistence import assessment_writer
+from .peers import peer_index
+from . import columnar, company_state, jobs, profiler, startup, telemetry
+from .models import Assessment
+from .schemas import (
+    AnalysisResponse,
+    AnalysisRequest,
+    CompanyAnalysisResponse,
+    IntegratedAnalysisResponse,
+    JobStatus,
+    PortfolioResponse,
+    AssessmentPage,
+    AssessmentDetail,
+    SensitivityRequest,
+    SensitivityResponse,
+)
+from .integrations import IntegrationError, integration_hub, merge_cash_flows
 
 app = FastAPI(title="Financial Health Assessment Tool", version="1.0.0")
 
@@ -16,6 +47,23 @@ app.add_middleware(
     allow_methods=["*"] ,
     allow_headers=["*"] ,
 )
+if settings.gzip_min_bytes > 0:
+    app.add_middleware(GZipMiddleware, minimum_size=settings.gzip_min_bytes, compresslevel=settings.gzip_level)
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    if route is not None:
+        path = route.path
+        kind = getattr(request.state, "file_type", "none")
+        telemetry.REQUEST_SECONDS.observe(time.perf_counter() - started, route=path, file_type=kind)
+        size = request.headers.get("content-length")
+        if size and size.isdigit():
+            telemetry.PAYLOAD_BYTES.observe(int(size), route=path, file_type=kind)
+    return response
 
 
 def verify_api_key(x_api_key: str = Header(default="")):
@@ -26,33 +74,469 @@ def verify_api_key(x_api_key: str = Header(default="")):
 @app.on_event("startup")
 def on_startup():
     init_db()
+    assessment_writer.start()
+    peer_index.start()
+    jobs.job_worker.start()
+    if settings.warmup_on_startup:
+        startup.warm_up()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    jobs.job_worker.stop()
+    analysis_executor.shutdown()
+    assessment_writer.stop()
+    peer_index.stop()
+    if f"{__package__}.pdf_extract" in sys.modules:  # imported on the first PDF
+        sys.modules[f"{__package__}.pdf_extract"].shutdown_page_pool()
+    await integration_hub.aclose()
+    await close_engines()
 
 
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    return {
+        "status": "ok",
+        "executor": analysis_executor.stats(),
+        "cache": result_cache.stats(),
+        "persistence": assessment_writer.stats(),
+        "peers": peer_index.stats(),
+        "integrations": integration_hub.stats(),
+        "jobs": jobs.job_worker.stats(),
+        "database": pool_status(),
+        "admission": {**admission_control.stats(), "coalescing": request_coalescer.stats()},
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    executor, cache, persistence = analysis_executor.stats(), result_cache.stats(), assessment_writer.stats()
+    database, admission = pool_status(), admission_control.stats()
+    gauges = {
+        "finhealth_executor_in_flight": executor["in_flight"],
+        "finhealth_executor_rejected_total": executor["rejected"],
+        "finhealth_executor_timed_out_total": executor["timed_out"],
+        "finhealth_executor_recycled_total": executor["recycled"],
+        "finhealth_cache_entries": cache["entries"],
+        "finhealth_cache_hits_total": cache["hits"],
+        "finhealth_cache_misses_total": cache["misses"],
+        "finhealth_persistence_queued": persistence["queued"],
+        "finhealth_persistence_written_total": persistence["written"],
+        "finhealth_peer_index_assessments": peer_index.stats()["indexed"],
+        "finhealth_db_pool_checked_out": database.get("sync", {}).get("checked_out", 0),
+        "finhealth_db_pool_checkouts_total": database["checkouts"],
+        "finhealth_db_pool_timeouts_total": database["timeouts"],
+        "finhealth_db_pool_wait_seconds_total": database["wait_seconds_total"],
+        "finhealth_admission_running": admission["running"],
+        "finhealth_admission_rate_limited_total": admission["rate_limited"],
+        "finhealth_admission_concurrency_limited_total": admission["concurrency_limited"],
+        "finhealth_coalesced_requests_total": request_coalescer.stats()["coalesced"],
+    }
+    return PlainTextResponse(telemetry.render(gauges), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/profiles/{profile_id}", dependencies=[Depends(verify_api_key)])
+def get_profile(profile_id: str):
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+
+@app.get("/startup")
+def startup_report():
+    return startup.report()
+
+
+@app.post("/warmup")
+def warmup():
+    return startup.warm_up()
+
+
+def _caller(request: Request) -> tuple[str, str]:
+    """(API key, admission kind) a request is limited by"""
+    return request.headers.get("x-api-key", ""), request_kind(request.state.file_type)
+
+
+def _precheck(request: Request) -> None:
+    """Refuse a caller over its admission limits before its body is read or hashed"""
+    admission_control.check(*_caller(request))
+
+
+async def _cached(
+    request: Request,
+    key: str,
+    compute: Callable[[], Awaitable[dict]],
+    bypass: bool = False,
+    skip: frozenset[str] = frozenset(),
+) -> dict:
+    """Cached result for ``key``; a partial request (``skip``) is also served by a cached full result.
+
+    Routes ``_precheck`` the caller first. On a miss the caller needs a free
+    admission slot, and concurrent requests for the same key share one
+    computation (COALESCE_REQUESTS), charged to the caller that starts it. Each full result computed here is recorded once in
+    the assessment history; cache hits, coalesced followers and partial
+    (``skip``) results are not.
+    """
+    keys = [key, partial_cache_key(key, skip)] if skip else [key]
+    analysis = None
+    if not bypass:
+        with telemetry.span("cache_lookup"):
+            for candidate in keys:
+                analysis = await run_in_threadpool(result_cache.get, candidate)
+                if analysis is not None:
+                    break
+    if analysis is None:
+        async def compute_and_store() -> dict:
+            result = await compute()
+            await run_in_threadpool(result_cache.put, keys[-1], result)
+            if not skip:
+                assessment_writer.submit(result)
+            return result
+
+        api_key, kind = _caller(request)
+        with admission_control.slot(api_key, kind):
+            if bypass or not settings.coalesce_requests:
+                admission_control.charge(api_key, kind)
+                analysis = await compute_and_store()
+            else:
+                analysis = await request_coalescer.run(
+                    keys[-1], compute_and_store, on_lead=lambda: admission_control.charge(api_key, kind)
+                )
+    return analysis
+
+
+def _profile_id(requested: bool) -> Optional[str]:
+    """Allocate a profile id when profiling was requested and is enabled"""
+    if not (requested and settings.profiling_enabled):
+        return None
+    return uuid.uuid4().hex
+
+
+def _respond(
+    analysis: dict, selected: Optional[frozenset[str]] = None, profile_id: Optional[str] = None
+) -> ORJSONResponse:
+    """Serialize an analysis (limited to ``selected`` fields) straight to JSON.
+
+    Pipeline output already has the AnalysisResponse shape, so it is not
+    re-validated through Pydantic on the way out.
+    """
+    with telemetry.span("response_serialization"):
+        if selected is None or "peers" in selected:
+            analysis = {**analysis, "peers": peer_index.compare(analysis)}
+        headers = {"X-Profile-Id": profile_id} if profile_id else None
+        return ORJSONResponse(select_fields(analysis, selected), headers=headers)
+
+
+FIELDS_QUERY = Query(
+    default=None,
+    description="Comma-separated response fields (e.g. risk_score,creditworthiness); "
+    "stages that only produce unrequested fields are skipped",
+)
 
 
 @app.post("/analyze", response_model=AnalysisResponse, dependencies=[Depends(verify_api_key)])
-async def analyze_file(file: UploadFile = File(...), industry: str = "Services", db: Session = Depends(get_db)):
-    df = await parse_upload_to_df(file)
-    analysis = analyze_dataframe(df, industry=industry)
-    recommendations = build_recommendations(analysis)
-    return AnalysisResponse(**analysis, recommendations=recommendations)
+async def analyze_file(
+    request: Request,
+    file: UploadFile = File(...),
+    industry: str = "Services",
+    profile: bool = Query(default=False, description="Profile this request (requires PROFILING_ENABLED)"),
+    fields: Optional[str] = FIELDS_QUERY,
+):
+    filename = file.filename or ""
+    request.state.file_type = telemetry.file_type(filename)
+    profile_id = _profile_id(profile)
+    selected = parse_fields(fields, AnalysisResponse)
+    skip = skipped_stages(selected)
+    _precheck(request)
+    async with spooled_upload(file) as upload:
+        analysis = await _cached(
+            request,
+            upload_cache_key(upload.digest, filename, industry),
+            lambda: analysis_executor.run(
+                "pipeline:analyze_upload", filename, upload.source, industry, skip, profile_id=profile_id
+            ),
+            bypass=profile_id is not None,
+            skip=skip,
+        )
+    return _respond(analysis, selected, profile_id)
 
 
 @app.post("/analyze-json", response_model=AnalysisResponse, dependencies=[Depends(verify_api_key)])
-def analyze_json(payload: AnalysisRequest, db: Session = Depends(get_db)):
-    analysis = analyze_dataframe(payload.to_dataframe(), industry=payload.industry)
-    recommendations = build_recommendations(analysis)
-    return AnalysisResponse(**analysis, recommendations=recommendations)
+async def analyze_json(
+    request: Request,
+    payload: AnalysisRequest,
+    profile: bool = Query(default=False, description="Profile this request (requires PROFILING_ENABLED)"),
+    fields: Optional[str] = FIELDS_QUERY,
+):
+    request.state.file_type = "json"
+    profile_id = _profile_id(profile)
+    selected = parse_fields(fields, AnalysisResponse)
+    skip = skipped_stages(selected)
+    _precheck(request)
+    key = await run_in_threadpool(records_cache_key, payload.records, payload.industry)
+    analysis = await _cached(
+        request,
+        key,
+        lambda: analysis_executor.run(
+            "pipeline:analyze_records", payload.records, payload.industry, None, skip, profile_id=profile_id
+        ),
+        bypass=profile_id is not None,
+        skip=skip,
+    )
+    return _respond(analysis, selected, profile_id)
+
+
+@app.post("/analyze-columnar", response_model=AnalysisResponse, dependencies=[Depends(verify_api_key)])
+async def analyze_columnar(
+    request: Request,
+    industry: str = "Services",
+    profile: bool = Query(default=False, description="Profile this request (requires PROFILING_ENABLED)"),
+    fields: Optional[str] = FIELDS_QUERY,
+    content_type: Optional[str] = Header(default=None),
+):
+    """Analyze a column-oriented body: JSON ``{"industry", "columns": {name: [values]}}`` or a NumPy .npz archive.
+
+    Results match /analyze-json for the same data; the body is decoded in the
+    worker straight into arrays, skipping per-record validation.
+    """
+    fmt = columnar.body_format(content_type)
+    request.state.file_type = fmt
+    profile_id = _profile_id(profile)
+    selected = parse_fields(fields, AnalysisResponse)
+    skip = skipped_stages(selected)
+    _precheck(request)
+    with telemetry.span("upload_read"):
+        body = await request.body()
+    analysis = await _cached(
+        request,
+        columnar_cache_key(body, fmt, industry),
+        lambda: analysis_executor.run(
+            "pipeline:analyze_columnar", body, fmt, industry, skip, profile_id=profile_id
+        ),
+        bypass=profile_id is not None,
+        skip=skip,
+    )
+    return _respond(analysis, selected, profile_id)
+
+
+@app.post("/simulate-json", dependencies=[Depends(verify_api_key)])
+async def simulate_json(
+    payload: AnalysisRequest,
+    paths: int = Query(default=10000, ge=1, le=200000),
+    horizon: int = Query(default=3, ge=1, le=36),
+    seed: Optional[int] = 42,
+):
+    return await analysis_executor.run("pipeline:simulate_records", payload.records, paths, horizon, seed)
+
+
+@app.post("/sensitivity", response_model=SensitivityResponse, dependencies=[Depends(verify_api_key)])
+async def sensitivity(payload: SensitivityRequest):
+    """Score a grid of what-if input changes against one base analysis, with credit tier break-evens.
+
+    The base is a stored assessment (``assessment_id``) or a previous analysis response (``base``).
+    """
+    if (payload.assessment_id is None) == (payload.base is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of assessment_id or base")
+    if payload.assessment_id is not None:
+        assessment = await run_db(Session.get, Assessment, payload.assessment_id)
+        if assessment is None or not assessment.details:
+            raise HTTPException(status_code=404, detail="Assessment not found")
+        base = assessment.details
+    else:
+        base = payload.base.model_dump()
+    axes = [axis.model_dump() for axis in payload.axes]
+    result = await analysis_executor.run("sensitivity:analyze_sensitivity", base, axes)
+    with telemetry.span("response_serialization"):
+        return ORJSONResponse(result)
+
+
+@app.post("/analyze-batch", response_model=PortfolioResponse, dependencies=[Depends(verify_api_key)])
+async def analyze_batch(
+    request: Request, file: UploadFile = File(...), industry: str = "Services", id_column: str = "company_id"
+):
+    request.state.file_type = telemetry.file_type(file.filename or "")
+    api_key, kind = _caller(request)
+    with admission_control.slot(api_key, kind):
+        admission_control.charge(api_key, kind)
+        async with spooled_upload(file) as upload:
+            portfolio = await analysis_executor.run(
+                "pipeline:analyze_portfolio_upload", file.filename or "", upload.source, industry, id_column
+            )
+    assessment_writer.submit_many(portfolio["results"])
+    return portfolio
+
+
+@app.post("/jobs", status_code=202, response_model=JobStatus, dependencies=[Depends(verify_api_key)])
+async def submit_job(
+    request: Request, file: UploadFile = File(...), industry: str = "Services"
+):
+    """Queue an upload for background analysis; poll GET /jobs/{id} for progress"""
+    filename = file.filename or ""
+    request.state.file_type = telemetry.file_type(filename)
+    job_id = uuid.uuid4().hex
+    path = os.path.join(settings.job_dir, job_id + os.path.splitext(filename)[1])
+    digest = await save_upload(file, path)
+    cached = await run_in_threadpool(result_cache.get, upload_cache_key(digest, filename, industry))
+    return await run_db(jobs.submit, job_id, filename, industry, path, digest, cached)
+
+
+def _job(db: Session, job_id: str):
+    job = jobs.get(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/jobs/{job_id}", response_model=JobStatus, dependencies=[Depends(verify_api_key)])
+def get_job(job_id: str, db: Session = Depends(get_db)):
+    return _job(db, job_id)
+
+
+@app.get("/jobs/{job_id}/result", response_model=AnalysisResponse, dependencies=[Depends(verify_api_key)])
+def get_job_result(job_id: str, fields: Optional[str] = FIELDS_QUERY, db: Session = Depends(get_db)):
+    """The finished analysis; 202 with the job status while it is still queued or running"""
+    selected = parse_fields(fields, AnalysisResponse)
+    job = _job(db, job_id)
+    if job.status == jobs.FAILED:
+        error = job.error or {}
+        raise HTTPException(status_code=error.get("status_code", 500), detail=error.get("detail", "Job failed"))
+    if job.status != jobs.SUCCEEDED:
+        return JSONResponse(status_code=202, content=JobStatus.model_validate(job).model_dump(mode="json"))
+    return _respond(job.result, selected)
+
+
+@app.post(
+    "/companies/{company_id}/periods", response_model=CompanyAnalysisResponse, dependencies=[Depends(verify_api_key)]
+)
+async def append_company_periods(
+    request: Request, company_id: str, payload: AnalysisRequest
+):
+    """Append new periods (oldest first) to a company's history and return the updated analysis"""
+    request.state.file_type = "json"
+    stored = await run_db(company_state.load, company_id)
+    previous_state, previous_periods = (stored.state, stored.periods) if stored is not None else (None, None)
+    state, analysis = await analysis_executor.run(
+        "pipeline:append_company_periods", previous_state, payload.records, payload.industry
+    )
+    await run_db(company_state.save, company_id, payload.industry, previous_periods, state, analysis)
+    assessment_writer.submit(analysis)
+    with telemetry.span("response_validation"):
+        return CompanyAnalysisResponse(
+            **analysis, company_id=company_id, periods=state["periods"], peers=peer_index.compare(analysis)
+        )
+
+
+@app.get(
+    "/companies/{company_id}/analysis", response_model=CompanyAnalysisResponse, dependencies=[Depends(verify_api_key)]
+)
+def get_company_analysis(company_id: str, db: Session = Depends(get_db)):
+    stored = company_state.load(db, company_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Company not found")
+    return {
+        **stored.analysis,
+        "company_id": company_id,
+        "periods": stored.periods,
+        "peers": peer_index.compare(stored.analysis),
+    }
+
+
+@app.delete("/companies/{company_id}", status_code=204, dependencies=[Depends(verify_api_key)])
+def reset_company(company_id: str, db: Session = Depends(get_db)):
+    if not company_state.delete(db, company_id):
+        raise HTTPException(status_code=404, detail="Company not found")
+
+
+@app.get("/assessments", response_model=AssessmentPage, dependencies=[Depends(verify_api_key)])
+def list_assessments(
+    industry: Optional[str] = None,
+    creditworthiness: Optional[str] = None,
+    min_risk_score: Optional[float] = None,
+    max_risk_score: Optional[float] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    cursor: Optional[int] = Query(default=None, description="next_cursor from the previous page"),
+    limit: int = Query(default=50, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
+    query = db.query(Assessment)
+    if industry is not None:
+        query = query.filter(Assessment.industry == industry)
+    if creditworthiness is not None:
+        query = query.filter(Assessment.creditworthiness == creditworthiness)
+    if min_risk_score is not None:
+        query = query.filter(Assessment.risk_score >= min_risk_score)
+    if max_risk_score is not None:
+        query = query.filter(Assessment.risk_score <= max_risk_score)
+    if created_after is not None:
+        query = query.filter(Assessment.created_at >= created_after)
+    if created_before is not None:
+        query = query.filter(Assessment.created_at < created_before)
+    if cursor is not None:
+        query = query.filter(Assessment.id < cursor)
+
+    rows = query.order_by(Assessment.id.desc()).limit(limit + 1).all()
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return {"items": rows[:limit], "next_cursor": next_cursor}
+
+
+@app.get("/assessments/{assessment_id}", response_model=AssessmentDetail, dependencies=[Depends(verify_api_key)])
+def get_assessment(assessment_id: int, db: Session = Depends(get_db)):
+    assessment = db.get(Assessment, assessment_id)
+    if assessment is None:
+        raise HTTPException(status_code=404, detail="Assessment not found")
+    return assessment
+
+
+async def _provider_summary(name: str, company_id: str) -> dict:
+    try:
+        return await integration_hub.summary(name, company_id)
+    except IntegrationError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=str(exc))
 
 
 @app.get("/integrations/bank-a", dependencies=[Depends(verify_api_key)])
-def get_bank_a_summary():
-    return bank_a_summary()
+async def get_bank_a_summary(company_id: str = "demo"):
+    return await _provider_summary("bank_a", company_id)
 
 
 @app.get("/integrations/bank-b", dependencies=[Depends(verify_api_key)])
-def get_bank_b_summary():
-    return bank_b_summary()
+async def get_bank_b_summary(company_id: str = "demo"):
+    return await _provider_summary("bank_b", company_id)
+
+
+@app.post(
+    "/integrations/{company_id}/analyze",
+    response_model=IntegratedAnalysisResponse,
+    dependencies=[Depends(verify_api_key)],
+)
+async def analyze_with_integrations(
+    request: Request,
+    company_id: str,
+    payload: AnalysisRequest,
+    periods: int = Query(default=12, ge=1, le=120),
+):
+    """Analyze ``records`` with cash_in/cash_out taken from the bank providers.
+
+    Without records the provider cash flows are analyzed as a cash-basis P&L.
+    """
+    request.state.file_type = "integrations"
+    _precheck(request)
+    with telemetry.span("integrations_fetch"):
+        cash = await integration_hub.cashflow(company_id, periods)
+    if not cash["periods"]:
+        raise HTTPException(status_code=502, detail={"message": "No provider returned cash flows", **cash})
+
+    records = merge_cash_flows(payload.records, cash["periods"])
+    key = await run_in_threadpool(records_cache_key, records, payload.industry)
+    analysis = await _cached(
+        request, key, lambda: analysis_executor.run("pipeline:analyze_records", records, payload.industry)
+    )
+    with telemetry.span("response_validation"):
+        return IntegratedAnalysisResponse(
+            **analysis, providers=cash["providers"], peers=peer_index.compare(analysis)
+        )
+
+
+startup.record_app_import(time.perf_counter() - _import_started)
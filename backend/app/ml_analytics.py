@@ -3,58 +3,175 @@ ML-based Financial Analytics Module
 Includes: Forecasting, Anomaly Detection, Risk Prediction, Scenario Analysis
 """
 
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Optional, Tuple, Union
 import numpy as np
 import pandas as pd
 from sklearn.preprocessing import StandardScaler
-from sklearn.linear_model import LinearRegression
 from sklearn.ensemble import IsolationForest
 from scipy import stats
+from .series import FinancialSeries
+
+# Stand-in for a missing revenue/expense column
+_ZERO = np.zeros(1)
+
+# Default probability (%) is 100 minus the sum of clip((ratio - offset) / scale, 0, 1) x points per ratio
+DEFAULT_TERMS = {
+    "net_margin": (-0.1, 0.25, 30.0),  # scale: -0.1 to 0.15
+    "current_ratio": (0.0, 2.0, 40.0),  # scale: 0 to 2
+    "dscr": (0.0, 2.5, 30.0),  # scale: 0 to 2.5
+}
+
+
+class TrendForecaster:
+    """Closed-form least-squares trend (plus optional seasonal dummies) over stacked series.
+
+    ``fit`` takes a 2-D array of shape (n_series, n_periods) and solves every
+    series in one batched least-squares pass; forecasts start at period
+    ``n_periods`` and carry Student-t prediction intervals.
+    """
+
+    def __init__(self, season_length: int = 0, confidence: float = 0.95):
+        self.season_length = season_length
+        self.confidence = confidence
+        self.n_periods = 0
+        self.coef = None
+        self.sigma = None
+        self._xtx_inv = None
+        self._use_seasonal = False
+        self._dof = 0
+
+    def _seasonal(self, n_periods: int) -> bool:
+        return self.season_length > 1 and n_periods >= 2 * self.season_length
+
+    def _design(self, t: np.ndarray, seasonal: bool) -> np.ndarray:
+        columns = [np.ones_like(t, dtype=float), t.astype(float)]
+        if seasonal:
+            phase = t % self.season_length
+            columns += [(phase == k).astype(float) for k in range(1, self.season_length)]
+        return np.column_stack(columns)
+
+    def fit(self, series: np.ndarray) -> "TrendForecaster":
+        Y = np.nan_to_num(np.atleast_2d(np.asarray(series, dtype=float)))
+        n_periods = Y.shape[1]
+        self.n_periods = n_periods
+        if n_periods < 2:
+            self.coef = None
+            return self
+
+        self._use_seasonal = self._seasonal(n_periods)
+        X = self._design(np.arange(n_periods), self._use_seasonal)
+        self._xtx_inv = np.linalg.pinv(X.T @ X)
+        self.coef = self._xtx_inv @ X.T @ Y.T  # (n_features, n_series)
+
+        residuals = Y - (X @ self.coef).T
+        dof = n_periods - X.shape[1]
+        self.sigma = np.sqrt((residuals ** 2).sum(axis=1) / dof) if dof > 0 else np.zeros(len(Y))
+        self._dof = dof
+        return self
+
+    def moments(self, series: np.ndarray, start: int = 0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Sufficient statistics (X'X, X'Y, per-series Y'Y) of periods ``start`` onwards.
+
+        Moments of consecutive blocks add up, so a history can be fitted with
+        ``fit_moments`` without revisiting earlier periods. The seasonal
+        columns are always included; ``fit_moments`` drops them when the
+        history is too short for a seasonal fit.
+        """
+        Y = np.nan_to_num(np.atleast_2d(np.asarray(series, dtype=float)))
+        X = self._design(np.arange(start, start + Y.shape[1]), self.season_length > 1)
+        return X.T @ X, X.T @ Y.T, (Y ** 2).sum(axis=1)
+
+    def fit_moments(self, n_periods: int, xtx: np.ndarray, xty: np.ndarray, yty: np.ndarray) -> "TrendForecaster":
+        """Equivalent of ``fit`` from accumulated ``moments`` over all ``n_periods``"""
+        self.n_periods = n_periods
+        if n_periods < 2:
+            self.coef = None
+            return self
+
+        self._use_seasonal = self._seasonal(n_periods)
+        k = len(xtx) if self._use_seasonal else 2
+        xtx = np.asarray(xtx, dtype=float)[:k, :k]
+        xty = np.asarray(xty, dtype=float)[:k]
+        yty = np.asarray(yty, dtype=float)
+        self._xtx_inv = np.linalg.pinv(xtx)
+        self.coef = self._xtx_inv @ xty
+
+        rss = yty - 2 * np.einsum("ks,ks->s", self.coef, xty) + np.einsum("ks,kl,ls->s", self.coef, xtx, self.coef)
+        dof = n_periods - k
+        self.sigma = np.sqrt(np.maximum(rss, 0) / dof) if dof > 0 else np.zeros(len(yty))
+        self._dof = dof
+        return self
+
+    def forecast(self, periods: int) -> Dict[str, np.ndarray]:
+        """Point forecasts and interval bounds, each of shape (n_series, periods)"""
+        if self.coef is None:
+            empty = np.empty((0, periods))
+            return {"mean": empty, "lower": empty, "upper": empty}
+
+        X_future = self._design(np.arange(self.n_periods, self.n_periods + periods), self._use_seasonal)
+        mean = (X_future @ self.coef).T
+
+        leverage = np.einsum("ij,jk,ik->i", X_future, self._xtx_inv, X_future)
+        quantile = stats.t.ppf((1 + self.confidence) / 2, self._dof) if self._dof > 0 else 0.0
+        half_width = quantile * np.outer(self.sigma, np.sqrt(1 + leverage))
+
+        return {"mean": mean, "lower": mean - half_width, "upper": mean + half_width}
 
 
 class FinancialPredictor:
-    """Predict revenue and expense trends using Linear Regression"""
+    """Predict revenue, expense and cash-flow trends with a batched closed-form fit"""
 
-    def __init__(self):
-        self.revenue_model = LinearRegression()
-        self.expense_model = LinearRegression()
-        self.scaler = StandardScaler()
+    COLUMNS = ["revenue", "expenses", "cash_in", "cash_out"]
 
-    def fit(self, df: pd.DataFrame) -> None:
+    def __init__(self, season_length: int = 0, confidence: float = 0.95):
+        self.engine = TrendForecaster(season_length=season_length, confidence=confidence)
+        self.columns: List[str] = []
+
+    def fit(self, data: Union[FinancialSeries, pd.DataFrame]) -> None:
         """Train forecasting models on historical data"""
-        if len(df) < 2:
+        series = FinancialSeries.of(data)
+        if len(series) < 2:
             return
 
-        X = np.arange(len(df)).reshape(-1, 1)
-        revenue = df.get("revenue", pd.Series([0])).values
-        expenses = df.get("expenses", pd.Series([0])).values
+        self.columns = [c for c in self.COLUMNS if series.get(c) is not None]
+        if "revenue" not in self.columns or "expenses" not in self.columns:
+            self.columns = []
+            return
+        self.engine.fit(series.stack(self.columns))
 
-        if len(X) > 1 and len(revenue) > 1:
-            self.revenue_model.fit(X, revenue)
-            self.expense_model.fit(X, expenses)
+    def fit_moments(
+        self, columns: List[str], n_periods: int, xtx: np.ndarray, xty: np.ndarray, yty: np.ndarray
+    ) -> None:
+        """Train from accumulated ``TrendForecaster.moments`` of ``columns`` instead of raw history"""
+        if n_periods < 2 or "revenue" not in columns or "expenses" not in columns:
+            return
+        self.columns = list(columns)
+        self.engine.fit_moments(n_periods, xtx, xty, yty)
 
     def forecast(self, periods: int = 3) -> Dict[str, List[float]]:
-        """Forecast next N periods"""
-        if not hasattr(self, "revenue_model"):
+        """Forecast the next N periods after the observed history"""
+        if not self.columns or self.engine.coef is None:
             return {"revenue": [], "expenses": [], "net_margin": []}
 
-        X_future = np.arange(periods).reshape(-1, 1)
+        result = self.engine.forecast(periods)
+        series = {column: row for column, row in zip(self.columns, result["mean"])}
+        revenue_forecast = series["revenue"].tolist()
+        expense_forecast = series["expenses"].tolist()
 
-        try:
-            revenue_forecast = self.revenue_model.predict(X_future).tolist()
-            expense_forecast = self.expense_model.predict(X_future).tolist()
-            net_margin_forecast = [
+        output = {
+            "revenue": [max(0, v) for v in revenue_forecast],
+            "expenses": [max(0, v) for v in expense_forecast],
+            "net_margin": [
                 (r - e) / r if r > 0 else 0
                 for r, e in zip(revenue_forecast, expense_forecast)
-            ]
-
-            return {
-                "revenue": [max(0, v) for v in revenue_forecast],
-                "expenses": [max(0, v) for v in expense_forecast],
-                "net_margin": net_margin_forecast,
-            }
-        except Exception:
-            return {"revenue": [], "expenses": [], "net_margin": []}
+            ],
+        }
+        for idx, column in enumerate(self.columns):
+            if column not in output:
+                output[column] = [max(0, v) for v in series[column].tolist()]
+            output[f"{column}_lower"] = [max(0, v) for v in result["lower"][idx].tolist()]
+            output[f"{column}_upper"] = [max(0, v) for v in result["upper"][idx].tolist()]
+        return output
 
 
 class AnomalyDetector:
@@ -65,9 +182,26 @@ class AnomalyDetector:
         self.scaler = StandardScaler()
         self.is_fitted = False
 
-    def fit(self, df: pd.DataFrame) -> None:
+    def fit(self, data: Union[FinancialSeries, pd.DataFrame]) -> None:
         """Train anomaly detection model"""
-        features = self._extract_features(df)
+        self._fit_features(self._extract_features(FinancialSeries.of(data)))
+
+    def detect(self, data: Union[FinancialSeries, pd.DataFrame], offset: int = 0) -> List[str]:
+        """Detect anomalies in financial data; ``offset`` is the period number of the first row minus one"""
+        series = FinancialSeries.of(data)
+        if not self.is_fitted or len(series) < 1:
+            return []
+        return self._detect_features(self._extract_features(series), offset)
+
+    def fit_detect(self, data: Union[FinancialSeries, pd.DataFrame], offset: int = 0) -> List[str]:
+        """``fit`` then ``detect`` on the same periods, extracting their features once"""
+        features = self._extract_features(FinancialSeries.of(data))
+        self._fit_features(features)
+        if not self.is_fitted:
+            return []
+        return self._detect_features(features, offset)
+
+    def _fit_features(self, features: np.ndarray) -> None:
         if len(features) < 2:
             return
 
@@ -78,12 +212,7 @@ class AnomalyDetector:
         except Exception:
             pass
 
-    def detect(self, df: pd.DataFrame) -> List[str]:
-        """Detect anomalies in financial data"""
-        if not self.is_fitted or len(df) < 1:
-            return []
-
-        features = self._extract_features(df)
+    def _detect_features(self, features: np.ndarray, offset: int) -> List[str]:
         if len(features) < 1:
             return []
 
@@ -94,18 +223,18 @@ class AnomalyDetector:
 
             for idx, pred in enumerate(predictions):
                 if pred == -1:  # -1 indicates anomaly
-                    anomalies.append(f"Unusual pattern detected in period {idx + 1}")
+                    anomalies.append(f"Unusual pattern detected in period {offset + idx + 1}")
 
             return anomalies
         except Exception:
             return []
 
-    def _extract_features(self, df: pd.DataFrame) -> np.ndarray:
+    def _extract_features(self, series: FinancialSeries) -> np.ndarray:
         """Extract features for anomaly detection"""
-        revenue = df.get("revenue", pd.Series([0])).values
-        expenses = df.get("expenses", pd.Series([0])).values
-        cash_in = df.get("cash_in", revenue).values
-        cash_out = df.get("cash_out", expenses).values
+        revenue = series.get("revenue", _ZERO)
+        expenses = series.get("expenses", _ZERO)
+        cash_in = series.get("cash_in", revenue)
+        cash_out = series.get("cash_out", expenses)
 
         if len(revenue) == 0:
             return np.array([]).reshape(0, 4)
@@ -120,6 +249,31 @@ class AnomalyDetector:
         return np.nan_to_num(features, 0)
 
 
+class PeerAnomalyDetector(AnomalyDetector):
+    """Isolation Forest over scale-free ratios, trained offline across an industry's companies.
+
+    Because the features do not depend on company size, one fitted model can
+    score any company in the industry without refitting per request.
+    """
+
+    def _extract_features(self, series: FinancialSeries) -> np.ndarray:
+        revenue = np.asarray(series.get("revenue", _ZERO), dtype=float)
+        expenses = np.asarray(series.get("expenses", _ZERO), dtype=float)
+        cash_in = np.asarray(series.get("cash_in", revenue), dtype=float)
+        cash_out = np.asarray(series.get("cash_out", expenses), dtype=float)
+
+        if len(revenue) == 0:
+            return np.array([]).reshape(0, 2)
+
+        denominator = np.abs(revenue) + 1e-9
+        features = np.column_stack([
+            (revenue - expenses) / denominator,  # net margin
+            (cash_in - cash_out) / denominator,  # cash conversion
+        ])
+
+        return np.clip(np.nan_to_num(features, 0), -5, 5)
+
+
 class ScenarioAnalyzer:
     """Scenario analysis: Optimistic, Base, Pessimistic cases"""
 
@@ -163,6 +317,145 @@ class ScenarioAnalyzer:
         }
 
 
+class MonteCarloSimulator:
+    """Stochastic scenarios drawn from the company's own period-over-period history.
+
+    Revenue, expense and collection-delay (DSO) log-changes are modelled as a
+    correlated multivariate normal fitted to the history, aggregated over
+    ``horizon`` periods, and applied to every path at once in NumPy.
+    """
+
+    # revenue, expenses, collection delay; used when history is too short to estimate
+    DEFAULT_VOLATILITY = np.array([0.10, 0.08, 0.15])
+    DEFAULT_CORRELATION = np.array([
+        [1.0, 0.6, -0.2],
+        [0.6, 1.0, 0.0],
+        [-0.2, 0.0, 1.0],
+    ])
+    MIN_PERIODS = 4
+    PERCENTILES = [1, 5, 25, 50, 75, 95, 99]
+
+    def __init__(self, paths: int = 10000, horizon: int = 3, seed: Optional[int] = 42):
+        self.paths = paths
+        self.horizon = horizon
+        self.seed = seed
+
+    @staticmethod
+    def _log_changes(values: np.ndarray) -> Optional[np.ndarray]:
+        values = np.asarray(values, dtype=float)
+        if len(values) < 2 or not np.all(np.isfinite(values)) or np.any(values <= 0):
+            return None
+        return np.diff(np.log(values))
+
+    def _shock_distribution(self, data: Union[FinancialSeries, pd.DataFrame]) -> Tuple[np.ndarray, np.ndarray]:
+        """Per-period mean and covariance of (revenue, expenses, DSO) log-changes"""
+        default_cov = self.DEFAULT_CORRELATION * np.outer(self.DEFAULT_VOLATILITY, self.DEFAULT_VOLATILITY)
+        series = FinancialSeries.of(data)
+        if len(series) < self.MIN_PERIODS:
+            return np.zeros(3), default_cov
+
+        revenue = np.asarray(series.revenue, dtype=float)
+        changes = [
+            self._log_changes(revenue),
+            self._log_changes(series.expenses),
+            self._log_changes(np.asarray(series.ar, dtype=float) / revenue) if series.ar is not None else None,
+        ]
+        if changes[0] is None or changes[1] is None:
+            return np.zeros(3), default_cov
+
+        if changes[2] is None:
+            stacked = np.vstack(changes[:2])
+            mean = np.append(stacked.mean(axis=1), 0.0)
+            cov = default_cov.copy()
+            cov[:2, :2] = np.cov(stacked)
+            cov[:2, 2] = cov[2, :2] = 0.0
+            return mean, cov
+
+        stacked = np.vstack(changes)
+        return stacked.mean(axis=1), np.cov(stacked)
+
+    def distribution_from_moments(
+        self, periods: int, sums: np.ndarray, cross: np.ndarray, valid: List[bool]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """``_shock_distribution`` from running log-change moments.
+
+        ``sums`` and ``cross`` accumulate the (revenue, expenses, DSO) log-change
+        vectors and their outer products over ``periods - 1`` changes; ``valid``
+        says whether each series has been positive and finite throughout.
+        """
+        default_cov = self.DEFAULT_CORRELATION * np.outer(self.DEFAULT_VOLATILITY, self.DEFAULT_VOLATILITY)
+        if periods < self.MIN_PERIODS or not (valid[0] and valid[1]):
+            return np.zeros(3), default_cov
+
+        changes = periods - 1
+        mean = np.asarray(sums, dtype=float) / changes
+        cov = (np.asarray(cross, dtype=float) - changes * np.outer(mean, mean)) / (changes - 1)
+        if not valid[2]:
+            mean[2] = 0.0
+            cov[2, :] = cov[:, 2] = 0.0
+            cov[2, 2] = default_cov[2, 2]
+        return mean, cov
+
+    def simulate(
+        self,
+        data: Union[FinancialSeries, pd.DataFrame, None],
+        base: Dict,
+        risk_fn: Callable,
+        distribution: Optional[Tuple] = None,
+    ) -> Dict:
+        """Distributions of net margin, DSCR, current ratio and risk score across all paths.
+
+        ``distribution`` may supply a precomputed (mean, covariance) of the
+        period shocks, in which case ``data`` is not needed.
+        """
+        if self.paths < 1 or not base.get("revenue"):
+            return {}
+
+        mean, cov = distribution if distribution is not None else self._shock_distribution(data)
+        rng = np.random.default_rng(self.seed)
+        shocks = stats.multivariate_normal(
+            mean=mean * self.horizon, cov=cov * self.horizon, allow_singular=True
+        ).rvs(size=self.paths, random_state=rng).reshape(-1, 3)
+        revenue_factor, expense_factor, delay_factor = np.exp(shocks).T
+
+        revenue = base["revenue"] * revenue_factor
+        expenses = base["expenses"] * expense_factor
+        ar = base["ar"] * revenue_factor * delay_factor
+        # Receivables that build up through slower collection are cash not yet received
+        cash_in = base["cash_in"] * revenue_factor - (ar - base["ar"])
+        cash_out = base["cash_out"] * expense_factor
+        net_cashflow = cash_in - cash_out
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            net_margin = np.where(revenue != 0, (revenue - expenses) / revenue, 0.0)
+            dso_days = np.where(revenue != 0, ar / revenue * 365, 0.0)
+        current_assets = ar + base["inventory"] + np.maximum(net_cashflow, 0)
+        liabilities = base["current_liabilities"]
+        current_ratio = current_assets / liabilities if liabilities else np.full(self.paths, 2.0)
+        dscr = net_cashflow / base["debt"] if base["debt"] else np.full(self.paths, 2.0)
+        risk_score = risk_fn(net_margin, current_ratio, dso_days, dscr)
+
+        return {
+            "paths": self.paths,
+            "horizon": self.horizon,
+            "seed": self.seed,
+            "net_margin": self._summarize(net_margin),
+            "dscr": self._summarize(dscr),
+            "current_ratio": self._summarize(current_ratio),
+            "dso_days": self._summarize(dso_days),
+            "risk_score": self._summarize(risk_score),
+            "probability_negative_margin": float(np.mean(net_margin < 0)),
+            "probability_dscr_below_1": float(np.mean(dscr < 1.0)),
+            "probability_high_risk": float(np.mean(risk_score < 50)),
+        }
+
+    def _summarize(self, values: np.ndarray) -> Dict[str, float]:
+        percentiles = np.percentile(values, self.PERCENTILES)
+        summary = {"mean": float(np.mean(values)), "std": float(np.std(values))}
+        summary.update({f"p{q}": float(v) for q, v in zip(self.PERCENTILES, percentiles)})
+        return summary
+
+
 class CreditRiskPredictor:
     """Predict probability of credit default using historical patterns"""
 
@@ -172,22 +465,36 @@ class CreditRiskPredictor:
         Predict default probability (0-100%) based on financial metrics.
         Uses logistic regression logic.
         """
-        risk_score = analysis_result.get("risk_score", 50)
-        net_margin = analysis_result.get("net_margin", 0)
-        current_ratio = analysis_result.get("current_ratio", 1)
-        dscr = analysis_result.get("dscr", 1.5)
-
-        # Normalize scores
-        margin_score = max(0, min(1, (net_margin + 0.1) / 0.25))  # Scale: -0.1 to 0.15
-        liquidity_score = max(0, min(1, current_ratio / 2.0))  # Scale: 0 to 2
-        dscr_score = max(0, min(1, dscr / 2.5))  # Scale: 0 to 2.5
+        ratios = {
+            "net_margin": analysis_result.get("net_margin", 0),
+            "current_ratio": analysis_result.get("current_ratio", 1),
+            "dscr": analysis_result.get("dscr", 1.5),
+        }
 
-        # Calculate risk: high margin/liquidity/dscr = low default probability
-        composite = 1 - (margin_score * 0.3 + liquidity_score * 0.4 + dscr_score * 0.3)
-        default_probability = max(0, min(100, composite * 100))
+        # High margin/liquidity/dscr = low default probability
+        composite = 100.0 - sum(
+            max(0, min(1, (ratios[name] - offset) / scale)) * points
+            for name, (offset, scale, points) in DEFAULT_TERMS.items()
+        )
+        default_probability = max(0, min(100, composite))
 
         return round(default_probability, 2)
 
+    @staticmethod
+    def predict_default_probability_batch(
+        net_margin: np.ndarray, current_ratio: np.ndarray, dscr: np.ndarray
+    ) -> np.ndarray:
+        """Vectorized ``predict_default_probability`` over arrays of companies.
+
+        A NaN input scores 1, as ``max(0, min(1, nan))`` does in the scalar version.
+        """
+        ratios = {"net_margin": net_margin, "current_ratio": current_ratio, "dscr": dscr}
+        composite = 100.0 - sum(
+            np.clip(np.nan_to_num((np.asarray(ratios[name], dtype=float) - offset) / scale, nan=1.0), 0, 1) * points
+            for name, (offset, scale, points) in DEFAULT_TERMS.items()
+        )
+        return np.round(np.clip(composite, 0, 100), 2)
+
     @staticmethod
     def get_risk_factors(analysis_result: Dict) -> List[str]:
         """Identify key risk factors"""
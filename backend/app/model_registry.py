@@ -0,0 +1,206 @@
+"""
+Registry of pretrained, per-industry anomaly models.
+
+Models are trained offline and written to ``ANOMALY_MODEL_DIR`` as joblib
+files plus a ``manifest.json``. Detectors score a company one period at a
+time, so they are trained on periods too: the trailing windows of the
+incremental company histories (see ``incremental``), the per-period rows the
+app keeps. Assessments hold only whole-upload totals, whose ratios are far
+less spread out than single periods', and are not used.
+
+At runtime each model is loaded lazily (memory-mapped) the first time its
+industry is analyzed, so request-time anomaly detection is a pure scoring
+call. The manifest is re-read when its mtime changes, so retraining under a
+running server swaps in the new models and cache keys.
+
+Train with:
+
+    python -m app.model_registry train [--min-samples 50]
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Optional
+from .config import settings
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from .ml_analytics import PeerAnomalyDetector
+
+MANIFEST = "manifest.json"
+
+# Bump whenever analysis/model behaviour changes so cached analyses are invalidated
+MODEL_VERSION = "3"
+
+
+# Per-period inputs of PeerAnomalyDetector's features
+TRAINING_COLUMNS = ["revenue", "expenses", "cash_in", "cash_out"]
+
+
+def _model_filename(industry: str) -> str:
+    slug = "".join(ch if ch.isalnum() else "-" for ch in industry.lower())
+    return f"anomaly-{slug}.joblib"
+
+
+class ModelRegistry:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._models: dict[str, Optional["PeerAnomalyDetector"]] = {}
+        self._manifest: Optional[dict] = None
+        self._mtime: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def manifest(self) -> dict:
+        """The manifest on disk, re-read (dropping loaded models) whenever its mtime changes"""
+        path = os.path.join(self.directory, MANIFEST)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if self._manifest is None or mtime != self._mtime:
+            with self._lock:
+                if self._manifest is None or mtime != self._mtime:
+                    try:
+                        with open(path) as fh:
+                            manifest = json.load(fh)
+                    except (OSError, ValueError):
+                        manifest = {"version": "none", "models": {}}
+                    self._models = {}
+                    self._manifest, self._mtime = manifest, mtime
+        return self._manifest
+
+    @property
+    def version(self) -> str:
+        return self.manifest.get("version", "none")
+
+    def get(self, industry: str) -> Optional["PeerAnomalyDetector"]:
+        """Return the fitted detector for ``industry``, or None when none was trained"""
+        manifest = self.manifest
+        models = self._models
+        if industry in models:
+            return models[industry]
+        with self._lock:
+            if industry not in models:
+                models[industry] = self._load(manifest, industry)
+            return models[industry]
+
+    def preload(self) -> int:
+        """Load every model in the manifest up front; returns how many were loaded"""
+        return sum(self.get(industry) is not None for industry in self.manifest.get("models", {}))
+
+    def _load(self, manifest: dict, industry: str) -> Optional["PeerAnomalyDetector"]:
+        entry = manifest.get("models", {}).get(industry)
+        if entry is None:
+            return None
+        import joblib
+
+        try:
+            return joblib.load(os.path.join(self.directory, entry["file"]), mmap_mode="r")
+        except Exception:
+            return None
+
+    def train(self, frame: "pd.DataFrame", min_samples: int = 50) -> dict:
+        """Fit one detector per industry from a frame of periods and write them out.
+
+        ``frame`` has one row per period with ``industry``, ``revenue``,
+        ``expenses``, ``cash_in`` and ``cash_out`` columns; ``min_samples``
+        counts periods.
+        """
+        import joblib
+        import pandas as pd
+        from .ml_analytics import PeerAnomalyDetector
+
+        os.makedirs(self.directory, exist_ok=True)
+        trained_at = datetime.now(timezone.utc)
+        manifest = {"version": trained_at.strftime("%Y%m%d%H%M%S"), "models": {}}
+
+        for industry, group in frame.groupby("industry"):
+            if len(group) < min_samples:
+                continue
+            training = pd.DataFrame({name: group[name].to_numpy() for name in TRAINING_COLUMNS})
+            detector = PeerAnomalyDetector()
+            detector.fit(training)
+            if not detector.is_fitted:
+                continue
+
+            filename = _model_filename(str(industry))
+            joblib.dump(detector, os.path.join(self.directory, filename))
+            manifest["models"][str(industry)] = {
+                "file": filename,
+                "samples": int(len(group)),
+                "trained_at": trained_at.isoformat(),
+            }
+
+        with open(os.path.join(self.directory, MANIFEST), "w") as fh:
+            json.dump(manifest, fh, indent=2)
+
+        # Picked up by the next manifest read through the mtime check
+        return manifest
+
+
+def load_training_frame(batch_size: int = 1000) -> "pd.DataFrame":
+    """Every period with positive revenue in the stored company windows, one row each.
+
+    Missing cash flows fall back to revenue and expenses, as the detectors'
+    features do when scoring.
+    """
+    import pandas as pd
+    from .db import SessionLocal
+    from .models import CompanyState
+
+    frames = []
+    with SessionLocal() as session:
+        query = session.query(CompanyState.industry, CompanyState.state).yield_per(batch_size)
+        for industry, state in query:
+            window = (state or {}).get("window") or {}
+            if "revenue" not in window:
+                continue
+            periods = pd.DataFrame({
+                name: pd.to_numeric(pd.Series(values, dtype=object), errors="coerce")
+                for name, values in window.items()
+                if name in TRAINING_COLUMNS
+            })
+            periods["industry"] = industry
+            frames.append(periods)
+    if not frames:
+        return pd.DataFrame(columns=["industry", *TRAINING_COLUMNS])
+
+    frame = pd.concat(frames, ignore_index=True)
+    for name in TRAINING_COLUMNS:
+        if name not in frame:
+            frame[name] = float("nan")
+    frame["expenses"] = frame["expenses"].fillna(0.0)
+    frame["cash_in"] = frame["cash_in"].fillna(frame["revenue"])
+    frame["cash_out"] = frame["cash_out"].fillna(frame["expenses"])
+    return frame[frame["revenue"] > 0][["industry", *TRAINING_COLUMNS]]
+
+
+anomaly_registry = ModelRegistry(settings.anomaly_model_dir)
+
+
+def model_version() -> str:
+    """Code model version plus the trained-artifact version, for cache keys"""
+    return f"{MODEL_VERSION}:{anomaly_registry.version}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage pretrained anomaly models")
+    sub = parser.add_subparsers(dest="command", required=True)
+    train = sub.add_parser("train", help="Train per-industry models from stored company periods")
+    train.add_argument("--min-samples", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.command == "train":
+        manifest = anomaly_registry.train(load_training_frame(), min_samples=args.min_samples)
+        for industry, entry in manifest["models"].items():
+            print(f"{industry}: {entry['samples']} periods -> {entry['file']}")
+        print(f"version {manifest['version']}, {len(manifest['models'])} models")
+
+
+if __name__ == "__main__":
+    main()
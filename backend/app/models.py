@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, Index
 from sqlalchemy.sql import func
 from .db import Base
 
@@ -15,3 +15,59 @@ class Assessment(Base):
     creditworthiness = Column(String, nullable=True)
     details = Column(JSON, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # History queries filter on one of these and page by id (keyset), so each
+    # index ends in id to serve both the filter and the ordering.
+    __table_args__ = (
+        Index("ix_assessments_industry_id", "industry", "id"),
+        Index("ix_assessments_creditworthiness_id", "creditworthiness", "id"),
+        Index("ix_assessments_risk_score_id", "risk_score", "id"),
+        Index("ix_assessments_created_at_id", "created_at", "id"),
+    )
+
+
+class CachedResult(Base):
+    __tablename__ = "cached_results"
+
+    key = Column(String(64), primary_key=True)
+    payload = Column(JSON, nullable=False)
+    expires_at = Column(Float, nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class CompanyState(Base):
+    """Incremental analysis state per company (see ``incremental``)"""
+
+    __tablename__ = "company_states"
+
+    company_id = Column(String, primary_key=True)
+    industry = Column(String, nullable=False)
+    periods = Column(Integer, nullable=False, default=0)
+    state = Column(JSON, nullable=False)
+    analysis = Column(JSON, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class AnalysisJob(Base):
+    """Queued/background analysis of an upload (see ``jobs``)"""
+
+    __tablename__ = "analysis_jobs"
+
+    id = Column(String(32), primary_key=True)
+    status = Column(String(16), nullable=False, default="queued")
+    filename = Column(String, nullable=False)
+    industry = Column(String, nullable=False)
+    input_path = Column(String, nullable=True)
+    digest = Column(String(64), nullable=True)
+    progress = Column(JSON, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(JSON, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    worker = Column(String, nullable=True)
+    lease_expires_at = Column(Float, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Workers claim the oldest queued (or lease-expired) job first
+    __table_args__ = (Index("ix_analysis_jobs_status_created_at", "status", "created_at"),)
@@ -0,0 +1,251 @@
+"""
+Page-parallel PDF extraction.
+
+Page ranges are farmed out to a long-lived page pool in this process, whose
+workers each open the PDF from its path on disk (uploads received as bytes
+are spooled to a temporary file once, so no task pickles the document) and
+pull rows from pdfplumber's table detection (falling back to comma-separated
+text lines on pages without tables). Finished pages are fed, in page order,
+into a row collector that builds the DataFrame and can stop early once enough
+periods are collected. A page cap and an overall deadline bound the work done
+for any single document: when the deadline passes or the collector stops
+early with pages still being parsed, the pool's workers are terminated (and
+the pool recreated on next use) rather than left running.
+
+Only the serving process keeps a page pool, of at most one page process per
+core; inside analysis and job pool workers pages are parsed serially, so no
+worker owns child processes that would keep it from exiting. The pool is shut
+down with the app (``shutdown_page_pool``).
+"""
+
+from __future__ import annotations
+import csv
+import io
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeout, as_completed
+from contextlib import contextmanager
+from typing import Iterator, Optional, Union
+import numpy as np
+import pandas as pd
+import pdfplumber
+from fastapi import HTTPException
+from .analysis import COLUMN_ALIASES, TOTAL_COLUMNS, _normalize_name
+from .config import settings
+from . import executor
+from .executor import terminate_pool
+from .telemetry import report_progress
+
+PdfSource = Union[bytes, str]
+
+HEADER_NAMES = set(COLUMN_ALIASES) | set(COLUMN_ALIASES.values()) | set(TOTAL_COLUMNS)
+
+_NUMBER_NOISE = re.compile(r"[,\s₹$€£]")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_users = 0
+_pool_lock = threading.Lock()
+
+
+def _open(source: PdfSource):
+    return pdfplumber.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+
+
+def _page_rows(page) -> list[list[str]]:
+    rows = [
+        [cell or "" for cell in row]
+        for table in page.extract_tables()
+        for row in table
+    ]
+    if rows:
+        return rows
+    lines = [ln for ln in (page.extract_text() or "").splitlines() if "," in ln]
+    return [row for row in csv.reader(lines)]
+
+
+def _extract_pages(source: PdfSource, start: int, stop: int) -> list[tuple[int, list[list[str]]]]:
+    pages = []
+    with _open(source) as pdf:
+        for number in range(start, stop):
+            page = pdf.pages[number]
+            pages.append((number, _page_rows(page)))
+            page.close()
+    return pages
+
+
+def _page_workers(workers: int) -> int:
+    """Page processes to use: none inside a pool worker, never more than the cores"""
+    if executor.in_pool_worker:
+        return 0
+    return min(workers, os.cpu_count() or 1)
+
+
+@contextmanager
+def _page_pool(workers: int) -> Iterator[ProcessPoolExecutor]:
+    """This process's page pool, created on first use and kept across documents"""
+    global _pool, _pool_workers, _pool_users
+    with _pool_lock:
+        if _pool is not None and _pool_workers != workers and not _pool_users:
+            _pool.shutdown(wait=False)
+            _pool = None
+        if _pool is None:
+            _pool, _pool_workers = ProcessPoolExecutor(max_workers=workers), workers
+        pool = _pool
+        _pool_users += 1
+    try:
+        yield pool
+    finally:
+        with _pool_lock:
+            _pool_users -= 1
+
+
+def shutdown_page_pool() -> None:
+    """Terminate the page pool, e.g. when the app shuts down"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        terminate_pool(pool)
+
+
+def _stop_pages(pool: ProcessPoolExecutor, futures) -> None:
+    """Cancel a document's remaining page tasks, terminating the pool if any are already running"""
+    global _pool
+    for future in futures:
+        future.cancel()
+    if all(future.done() for future in futures):
+        return
+    with _pool_lock:
+        if _pool is not pool or _pool_users > 1:
+            return  # another document is using the pool (thread-pool analysis); let its tasks finish
+        _pool = None
+    terminate_pool(pool)
+
+
+@contextmanager
+def _on_disk(source: PdfSource) -> Iterator[str]:
+    """A path to the PDF, spooling bytes to a temporary file for the page workers"""
+    if not isinstance(source, bytes):
+        yield source
+        return
+    handle, path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(handle, "wb") as spool:
+            spool.write(source)
+        yield path
+    finally:
+        os.unlink(path)
+
+
+def _to_number(value: str) -> float:
+    text = _NUMBER_NOISE.sub("", str(value))
+    negative = text.startswith("(") and text.endswith(")")
+    try:
+        number = float(text.strip("()"))
+    except ValueError:
+        return np.nan
+    return -number if negative else number
+
+
+class RowCollector:
+    """Accepts pages in any order and emits their rows in page order"""
+
+    def __init__(self, max_periods: int = 0):
+        self.max_periods = max_periods
+        self.header: Optional[list[str]] = None
+        self.rows: list[list[str]] = []
+        self._pending: dict[int, list[list[str]]] = {}
+        self._next_page = 0
+
+    @property
+    def done(self) -> bool:
+        return bool(self.max_periods) and len(self.rows) >= self.max_periods
+
+    def add(self, number: int, rows: list[list[str]]) -> None:
+        self._pending[number] = rows
+        while self._next_page in self._pending and not self.done:
+            self._consume(self._pending.pop(self._next_page))
+            self._next_page += 1
+
+    def _consume(self, rows: list[list[str]]) -> None:
+        for row in rows:
+            cells = [str(c).strip() for c in row]
+            if self.header is None:
+                if any(_normalize_name(c) in HEADER_NAMES for c in cells):
+                    self.header = cells
+                continue
+            if len(cells) != len(self.header) or cells == self.header:
+                continue
+            self.rows.append(cells)
+            if self.done:
+                return
+
+    def to_frame(self) -> pd.DataFrame:
+        if self.header is None or not self.rows:
+            raise HTTPException(
+                status_code=400,
+                detail="PDF does not contain tabular data. Please upload a file with columns: revenue, expenses",
+            )
+        df = pd.DataFrame(self.rows[: self.max_periods or None], columns=self.header)
+        for column in df.columns:
+            if _normalize_name(column) in HEADER_NAMES:
+                df[column] = df[column].map(_to_number)
+        return df
+
+
+def extract_pdf_frame(
+    source: PdfSource,
+    workers: Optional[int] = None,
+    pages_per_task: Optional[int] = None,
+    max_pages: Optional[int] = None,
+    max_periods: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> pd.DataFrame:
+    workers = _page_workers(settings.pdf_workers if workers is None else workers)
+    pages_per_task = pages_per_task or settings.pdf_pages_per_task
+    max_pages = max_pages or settings.pdf_max_pages
+    max_periods = settings.pdf_max_periods if max_periods is None else max_periods
+    timeout = timeout or settings.pdf_timeout_seconds
+
+    with _open(source) as pdf:
+        page_count = len(pdf.pages)
+    if page_count > max_pages:
+        raise HTTPException(status_code=400, detail=f"PDF has {page_count} pages; the limit is {max_pages}")
+
+    collector = RowCollector(max_periods=max_periods)
+    ranges = [(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)]
+    deadline = time.monotonic() + timeout
+
+    parsed = 0
+    if workers <= 1 or len(ranges) <= 1:
+        for start, stop in ranges:
+            if time.monotonic() > deadline:
+                raise HTTPException(status_code=504, detail="PDF extraction timed out")
+            for number, rows in _extract_pages(source, start, stop):
+                collector.add(number, rows)
+            parsed += stop - start
+            report_progress(pages_parsed=parsed, pages_total=page_count)
+            if collector.done:
+                break
+        return collector.to_frame()
+
+    with _on_disk(source) as path, _page_pool(workers) as pool:
+        futures = {pool.submit(_extract_pages, path, start, stop): stop - start for start, stop in ranges}
+        try:
+            for future in as_completed(futures, timeout=max(deadline - time.monotonic(), 0)):
+                for number, rows in future.result():
+                    collector.add(number, rows)
+                parsed += futures[future]
+                report_progress(pages_parsed=parsed, pages_total=page_count)
+                if collector.done:
+                    break
+        except FuturesTimeout:
+            raise HTTPException(status_code=504, detail="PDF extraction timed out")
+        finally:
+            _stop_pages(pool, futures)
+
+    return collector.to_frame()
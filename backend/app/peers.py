@@ -0,0 +1,220 @@
+"""
+Peer percentile index over persisted assessments.
+
+Every stored assessment is filed under its industry and under its industry's
+revenue band, with one sorted float64 array per metric, so a company's
+percentile rank among its peers is two binary searches. A background thread
+tails the assessments table by id (rows written by any process), so the index
+is refreshed incrementally rather than by rescanning the table. Under
+gunicorn the master loads the index before forking (``serving.preload``) and
+catches up again before each fork, so workers, including recycled ones,
+inherit it copy-on-write and only read rows added since.
+
+Kept free of pandas/NumPy imports (the arrays are stdlib ``array``) so
+request handlers can rank results without loading the analytics stack.
+"""
+
+from __future__ import annotations
+import bisect
+import logging
+import math
+import threading
+from array import array
+from itertools import chain
+from typing import Iterable, Optional
+from sqlalchemy import select
+from .config import settings
+from .db import SessionLocal
+from .models import Assessment
+
+logger = logging.getLogger(__name__)
+
+PEER_METRICS = ["net_margin", "current_ratio", "dso_days", "dscr", "risk_score"]
+# Upper bounds on total revenue for each band; anything larger is the last band
+REVENUE_BANDS = [(1e6, "<1M"), (1e7, "1M-10M"), (1e8, "10M-100M")]
+LARGEST_BAND = "100M+"
+REFRESH_PAGE_ROWS = 10000
+MIN_RECENT_BUFFER = 256
+# A refresh merges what it read into the arrays once it has this many rows pending
+# (or as many as are already indexed, whichever is more), so loading n rows costs O(n log n)
+MIN_MERGE_ROWS = 100000
+
+
+def revenue_band(revenue: Optional[float]) -> Optional[str]:
+    if revenue is None or not math.isfinite(revenue):
+        return None
+    for bound, label in REVENUE_BANDS:
+        if revenue < bound:
+            return label
+    return LARGEST_BAND
+
+
+class SortedValues:
+    """Sorted values in a compact float64 array, with O(log n) rank queries.
+
+    Single inserts go to a small sorted buffer that is merged into the array
+    once it outgrows roughly sqrt(n); ``merged``/``replace`` fold in a whole
+    batch at once.
+    """
+
+    __slots__ = ("_base", "_recent")
+
+    def __init__(self):
+        self._base = array("d")
+        self._recent: list[float] = []
+
+    def __len__(self) -> int:
+        return len(self._base) + len(self._recent)
+
+    def add(self, value: float) -> None:
+        bisect.insort(self._recent, value)
+        if len(self._recent) > max(MIN_RECENT_BUFFER, math.isqrt(len(self._base))):
+            self.replace(self.merged(()))
+
+    def merged(self, values: Iterable[float]) -> array:
+        """The indexed values plus ``values``, sorted; reads but does not change this index"""
+        # Timsort finds the already-sorted run and merges the rest into it in C
+        return array("d", sorted(chain(self._base, self._recent, values)))
+
+    def replace(self, values: array) -> None:
+        self._base = values
+        self._recent = []
+
+    def rank(self, value: float) -> tuple[int, int]:
+        """(values strictly below ``value``, values equal to it)"""
+        below = bisect.bisect_left(self._base, value) + bisect.bisect_left(self._recent, value)
+        not_above = bisect.bisect_right(self._base, value) + bisect.bisect_right(self._recent, value)
+        return below, not_above - below
+
+
+def _group_keys(industry: str, revenue: Optional[float]) -> list[tuple[str, Optional[str]]]:
+    """The industry group and, when revenue is known, the industry's revenue band group"""
+    band = revenue_band(revenue)
+    return [(industry, None)] if band is None else [(industry, None), (industry, band)]
+
+
+class PeerIndex:
+    def __init__(self, min_peers: int, refresh_seconds: float):
+        self.min_peers = min_peers
+        self.refresh_seconds = refresh_seconds
+        self._groups: dict[tuple[str, Optional[str]], dict[str, SortedValues]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.last_id = 0
+        self.indexed = 0
+
+    def start(self) -> None:
+        if self._thread is not None or self.refresh_seconds <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="peer-index", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Failed to refresh the peer index")
+            self._stop.wait(self.refresh_seconds)
+
+    def refresh(self) -> int:
+        """Index assessments stored since the last refresh; returns how many were added.
+
+        Rows are read a page at a time and merged into the arrays in batches
+        that grow with the index, never rescanning rows already indexed.
+        """
+        added = 0
+        columns = [Assessment.id, Assessment.industry, Assessment.revenue, Assessment.net_margin, Assessment.risk_score]
+        # Ratios without their own column are read from the stored analysis
+        columns += [Assessment.details[name].as_float() for name in ("current_ratio", "dso_days", "dscr")]
+        pending: dict[tuple[str, Optional[str]], dict[str, array]] = {}
+        pending_rows, last_id = 0, self.last_id
+        while True:
+            with SessionLocal() as db:
+                rows = db.execute(
+                    select(*columns)
+                    .where(Assessment.id > last_id)
+                    .order_by(Assessment.id)
+                    .limit(REFRESH_PAGE_ROWS)
+                ).all()
+            for row_id, industry, revenue, net_margin, risk_score, current_ratio, dso_days, dscr in rows:
+                values = (net_margin, current_ratio, dso_days, dscr, risk_score)
+                for key in _group_keys(industry, revenue):
+                    group = pending.setdefault(key, {name: array("d") for name in PEER_METRICS})
+                    for name, value in zip(PEER_METRICS, values):
+                        if value is not None and math.isfinite(value):
+                            group[name].append(value)
+                last_id = row_id
+            added += len(rows)
+            pending_rows += len(rows)
+            done = len(rows) < REFRESH_PAGE_ROWS
+            if pending_rows and (done or pending_rows >= max(MIN_MERGE_ROWS, self.indexed)):
+                self._merge(pending, pending_rows, last_id)
+                pending, pending_rows = {}, 0
+            if done:
+                return added
+
+    def _merge(self, pending: dict, rows: int, last_id: int) -> None:
+        """Fold a batch of refreshed values into the index; the lock is held only to swap arrays in"""
+        merged = {}
+        for key, batch in pending.items():
+            group = self._groups.get(key) or {name: SortedValues() for name in PEER_METRICS}
+            merged[key] = (group, {name: group[name].merged(batch[name]) for name in PEER_METRICS})
+        with self._lock:
+            for key, (group, arrays) in merged.items():
+                self._groups.setdefault(key, group)
+                for name, values in arrays.items():
+                    group[name].replace(values)
+            self.indexed += rows
+            self.last_id = last_id
+
+    def add(self, industry: str, revenue: Optional[float], values: dict) -> None:
+        with self._lock:
+            for key in _group_keys(industry, revenue):
+                group = self._groups.setdefault(key, {name: SortedValues() for name in PEER_METRICS})
+                for name in PEER_METRICS:
+                    value = values.get(name)
+                    if value is not None and math.isfinite(value):
+                        group[name].add(float(value))
+            self.indexed += 1
+
+    def compare(self, analysis: dict) -> Optional[dict]:
+        """Percentile rank (share of peers with a lower value, ties counted half) per metric.
+
+        Peers are the same industry and revenue band, or the whole industry
+        when the band has fewer than ``min_peers``; None without enough peers.
+        """
+        industry = analysis.get("industry")
+        band = revenue_band(analysis.get("revenue"))
+        with self._lock:
+            for key in ((industry, band), (industry, None)):
+                group = self._groups.get(key) if key[0] is not None else None
+                if group is None:
+                    continue
+                count = max(len(values) for values in group.values())
+                if count < self.min_peers:
+                    continue
+                percentiles = {}
+                for name in PEER_METRICS:
+                    value, values = analysis.get(name), group[name]
+                    if value is None or not math.isfinite(value) or not len(values):
+                        continue
+                    below, equal = values.rank(float(value))
+                    percentiles[name] = round(100.0 * (below + 0.5 * equal) / len(values), 2)
+                return {"industry": industry, "revenue_band": key[1], "peers": count, "percentiles": percentiles}
+        return None
+
+    def stats(self) -> dict:
+        return {"indexed": self.indexed, "groups": len(self._groups), "last_id": self.last_id}
+
+
+peer_index = PeerIndex(min_peers=settings.peer_min_count, refresh_seconds=settings.peer_refresh_seconds)
@@ -0,0 +1,126 @@
+"""
+Write-behind persistence for assessments.
+
+Request handlers enqueue finished analyses and return immediately; a single
+background thread drains the queue and inserts rows in batches. When the queue
+is full new items are dropped (and counted) rather than blocking a request.
+"""
+
+from __future__ import annotations
+import logging
+import queue
+import threading
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+from sqlalchemy import insert
+from .config import settings
+from .db import SessionLocal, json_safe
+from .models import Assessment
+
+logger = logging.getLogger(__name__)
+
+COLUMN_FIELDS = ["industry", "revenue", "expenses", "net_margin", "risk_score", "creditworthiness"]
+
+
+def assessment_row(analysis: dict) -> dict:
+    analysis = json_safe(analysis)
+    row = {field: analysis.get(field) for field in COLUMN_FIELDS}
+    row["details"] = analysis
+    row["created_at"] = datetime.now(timezone.utc)
+    return row
+
+
+class AssessmentWriter:
+    def __init__(self, batch_size: int, flush_interval: float, max_queue: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="assessment-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the writer after flushing whatever is already queued"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, analysis: dict) -> None:
+        self.submit_many([analysis])
+
+    def submit_many(self, analyses: Iterable[dict]) -> None:
+        for analysis in analyses:
+            try:
+                self._queue.put_nowait(assessment_row(analysis))
+            except queue.Full:
+                self.dropped += 1
+
+    def _run(self) -> None:
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+
+    def _next_batch(self) -> list[dict]:
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: list[dict]) -> None:
+        """Insert ``batch`` in one statement; if that fails, retry row by row so only bad rows are lost"""
+        try:
+            self._insert(batch)
+            return
+        except Exception:
+            if len(batch) == 1:
+                self.failed += 1
+                logger.exception("Failed to persist an assessment")
+                return
+            logger.warning(
+                "Failed to persist %d assessments at once; retrying one at a time", len(batch), exc_info=True
+            )
+        for row in batch:
+            try:
+                self._insert([row])
+            except Exception:
+                self.failed += 1
+                logger.exception("Failed to persist an assessment")
+
+    def _insert(self, rows: list[dict]) -> None:
+        with SessionLocal() as session:
+            session.execute(insert(Assessment), rows)
+            session.commit()
+        self.written += len(rows)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+assessment_writer = AssessmentWriter(
+    batch_size=settings.persist_batch_size,
+    flush_interval=settings.persist_flush_seconds,
+    max_queue=settings.persist_max_queue,
+)
@@ -0,0 +1,129 @@
+"""
+Worker entry points for the analysis pipeline.
+
+Everything here takes and returns picklable values so it can run inside the
+``AnalysisExecutor`` process pool.
+"""
+
+from __future__ import annotations
+import io
+from typing import Union
+import pandas as pd
+from fastapi import HTTPException
+from .analysis import analyze_dataframe, analyze_portfolio, build_recommendations, parse_bytes_to_df, simulate_dataframe
+from .columnar import decode_columns
+from .incremental import append_periods
+from .ingest import read_header, stream_tabular
+from .ledger import aggregate_ledger, is_ledger, stream_ledger
+from .uploads import is_streamable
+from .pdf_extract import extract_pdf_frame
+from .telemetry import ROWS, file_type, span
+
+# Raw upload bytes, or the path of an upload already spooled to local disk
+UploadSource = Union[bytes, str]
+
+
+def analyze_upload(filename: str, source: UploadSource, industry: str, skip: frozenset[str] = frozenset()) -> dict:
+    """Parse and analyze an uploaded file end to end"""
+    totals = aging = None
+    offset = 0
+    with span("parse"):
+        if is_streamable(filename):
+            stream = io.BytesIO(source) if isinstance(source, bytes) else source
+            try:
+                if is_ledger(read_header(stream, filename)):
+                    df, totals, aging, offset = stream_ledger(stream, filename)
+                else:
+                    df, totals, offset = stream_tabular(stream, filename)
+            except HTTPException:
+                raise
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"Failed to parse file: {str(e)}")
+        elif filename.lower().endswith(".pdf"):
+            try:
+                df = extract_pdf_frame(source)
+            except HTTPException:
+                raise
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"Failed to parse file: {str(e)}")
+        else:
+            df = parse_bytes_to_df(filename, _read_source(source))
+
+    rows = totals["revenue"][1] if totals and "revenue" in totals else len(df)
+    ROWS.observe(rows, file_type=file_type(filename))
+    return _analyze(df, industry, totals, skip, aging, offset)
+
+
+def analyze_records(
+    df: pd.DataFrame | list[dict],
+    industry: str,
+    totals: dict[str, tuple[float, int]] | None = None,
+    skip: frozenset[str] = frozenset(),
+) -> dict:
+    if not isinstance(df, pd.DataFrame):
+        with span("to_dataframe"):
+            df = pd.DataFrame(df)
+    ROWS.observe(len(df), file_type="json")
+    return _analyze(df, industry, totals, skip)
+
+
+def analyze_columnar(body: bytes, fmt: str, industry: str, skip: frozenset[str] = frozenset()) -> dict:
+    """Analyze a columnar body, decoded straight into column arrays (no per-row dicts)"""
+    with span("parse"):
+        columns, body_industry = decode_columns(body, fmt)
+        df = pd.DataFrame(columns, copy=False)
+    ROWS.observe(len(df), file_type=fmt)
+    return _analyze(df, body_industry or industry, None, skip)
+
+
+def append_company_periods(state: dict | None, records: list[dict], industry: str) -> tuple[dict, dict]:
+    """Fold new periods into a company's incremental state; returns (state, analysis)"""
+    state, analysis = append_periods(state, pd.DataFrame(records), industry)
+    ROWS.observe(len(records), file_type="incremental")
+    with span("recommendations"):
+        recommendations = build_recommendations(analysis)
+    return state, {**analysis, "recommendations": recommendations}
+
+
+def _analyze(
+    df: pd.DataFrame,
+    industry: str,
+    totals: dict[str, tuple[float, int]] | None,
+    skip: frozenset[str] = frozenset(),
+    aging: dict | None = None,
+    offset: int = 0,
+) -> dict:
+    if totals is None and is_ledger(df.columns):
+        df, totals, aging, offset = aggregate_ledger([df])
+    analysis = analyze_dataframe(df, industry=industry, totals=totals, skip=skip, offset=offset)
+    if aging is not None:
+        analysis["receivables_aging"] = aging
+    if "recommendations" in skip:
+        return analysis
+    with span("recommendations"):
+        recommendations = build_recommendations(analysis)
+    return {**analysis, "recommendations": recommendations}
+
+
+def simulate_records(records: list[dict], paths: int, horizon: int, seed: int | None) -> dict:
+    return simulate_dataframe(pd.DataFrame(records), paths=paths, horizon=horizon, seed=seed)
+
+
+def analyze_portfolio_upload(filename: str, source: UploadSource, industry: str, id_column: str) -> dict:
+    df = parse_bytes_to_df(filename, _read_source(source))
+    portfolio = analyze_portfolio(df, industry=industry, id_column=id_column)
+    results = portfolio.reset_index(names="company_id")
+    results["company_id"] = results["company_id"].astype(str)
+    return {
+        "companies": len(portfolio),
+        "tiers": portfolio["creditworthiness"].value_counts().to_dict(),
+        "average_risk_score": float(portfolio["risk_score"].mean()) if len(portfolio) else 0.0,
+        "results": results.to_dict(orient="records"),
+    }
+
+
+def _read_source(source: UploadSource) -> bytes:
+    if isinstance(source, bytes):
+        return source
+    with open(source, "rb") as fh:
+        return fh.read()
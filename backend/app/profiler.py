@@ -0,0 +1,96 @@
+"""
+Opt-in sampling profiler for individual requests.
+
+A background thread snapshots the profiled thread's stack at a fixed
+interval and counts where time is spent, which costs far less than
+deterministic profiling. Finished profiles are kept in a small in-memory ring
+and fetched by id.
+"""
+
+from __future__ import annotations
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Optional
+
+MAX_STORED_PROFILES = 32
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.005, max_depth: int = 40):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self._self_counts: Counter = Counter()
+        self._total_counts: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._target = 0
+        self._started = 0.0
+        self.elapsed = 0.0
+
+    def __enter__(self) -> "SamplingProfiler":
+        self._target = threading.get_ident()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self._started
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            self.samples += 1
+            seen = set()
+            depth = 0
+            leaf = True
+            while frame is not None and depth < self.max_depth:
+                code = frame.f_code
+                location = f"{code.co_filename}:{code.co_firstlineno}({code.co_name})"
+                if leaf:
+                    self._self_counts[location] += 1
+                    leaf = False
+                if location not in seen:
+                    self._total_counts[location] += 1
+                    seen.add(location)
+                frame = frame.f_back
+                depth += 1
+
+    def summary(self, top: int = 25) -> dict:
+        samples = max(self.samples, 1)
+        return {
+            "samples": self.samples,
+            "interval_ms": self.interval * 1000,
+            "elapsed_ms": self.elapsed * 1000,
+            "top_self": [
+                {"function": fn, "samples": n, "share": n / samples}
+                for fn, n in self._self_counts.most_common(top)
+            ],
+            "top_cumulative": [
+                {"function": fn, "samples": n, "share": n / samples}
+                for fn, n in self._total_counts.most_common(top)
+            ],
+        }
+
+
+_profiles: OrderedDict[str, dict] = OrderedDict()
+_lock = threading.Lock()
+
+
+def store(profile_id: str, profile: dict) -> None:
+    with _lock:
+        _profiles[profile_id] = profile
+        while len(_profiles) > MAX_STORED_PROFILES:
+            _profiles.popitem(last=False)
+
+
+def get(profile_id: str) -> Optional[dict]:
+    with _lock:
+        return _profiles.get(profile_id)
@@ -1,16 +1,25 @@
-from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Union
-import pandas as pd
+from datetime import datetime
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Dict, Any, Optional, Union
 
 
 class AnalysisRequest(BaseModel):
     industry: str = "Services"
     records: List[Dict[str, Any]] = Field(default_factory=list)
 
-    def to_dataframe(self) -> pd.DataFrame:
+    def to_dataframe(self):
+        import pandas as pd
+
         return pd.DataFrame(self.records)
 
 
+class PeerComparison(BaseModel):
+    industry: str
+    revenue_band: Optional[str] = None
+    peers: int
+    percentiles: Dict[str, float]
+
+
 class AnalysisResponse(BaseModel):
     industry: str
     revenue: float
@@ -21,6 +30,7 @@ class AnalysisResponse(BaseModel):
     current_ratio: float
     dso_days: float
     dscr: float
+    debt: Optional[float] = None
     risk_score: float
     creditworthiness: str
     benchmarks: Dict[str, float]
@@ -30,6 +40,129 @@ class AnalysisResponse(BaseModel):
     forecast: Dict[str, List[float]] = Field(default_factory=dict)
     anomalies: List[str] = Field(default_factory=list)
     scenarios: Dict[str, Dict[str, Union[float, str]]] = Field(default_factory=dict)
+    simulation: Dict[str, Any] = Field(default_factory=dict)
     default_probability: float = 0.0
     credit_risk_factors: List[str] = Field(default_factory=list)
+    receivables_aging: Optional[Dict[str, float]] = None
+    peers: Optional[PeerComparison] = None
+
+
+
+class CompanyAnalysisResponse(AnalysisResponse):
+    company_id: str
+    periods: int
+
+
+class IntegratedAnalysisResponse(AnalysisResponse):
+    providers: Dict[str, str]
+
+
+class PortfolioCompanyResult(BaseModel):
+    company_id: str
+    industry: str
+    revenue: float
+    expenses: float
+    net_income: float
+    net_margin: float
+    net_cashflow: float
+    current_ratio: float
+    dso_days: float
+    dscr: float
+    risk_score: float
+    creditworthiness: str
+    default_probability: float
+    flags: List[str] = Field(default_factory=list)
+
+
+class PortfolioResponse(BaseModel):
+    companies: int
+    tiers: Dict[str, int]
+    average_risk_score: float
+    results: List[PortfolioCompanyResult]
+
+
+class AssessmentRecord(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    industry: str
+    revenue: Optional[float] = None
+    expenses: Optional[float] = None
+    net_margin: Optional[float] = None
+    risk_score: Optional[float] = None
+    creditworthiness: Optional[str] = None
+    created_at: Optional[datetime] = None
+
 
+class AssessmentDetail(AssessmentRecord):
+    details: Optional[Dict[str, Any]] = None
+
+
+class AssessmentPage(BaseModel):
+    items: List[AssessmentRecord]
+    next_cursor: Optional[int] = None
+
+
+class JobStatus(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    status: str
+    filename: Optional[str] = None
+    industry: Optional[str] = None
+    progress: Optional[Dict[str, Any]] = None
+    attempts: int = 0
+    error: Optional[Dict[str, Any]] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class SensitivityBase(BaseModel):
+    """The parts of an analysis the what-if grid starts from; an AnalysisResponse fits as-is"""
+
+    industry: str = "Services"
+    revenue: float
+    expenses: float
+    net_cashflow: float
+    net_margin: float
+    current_ratio: float
+    dso_days: float
+    dscr: float
+    # Total debt; when omitted, a DSCR of exactly 2.0 is taken to mean no debt
+    debt: Optional[float] = None
+
+
+class SensitivityAxis(BaseModel):
+    input: str
+    changes: List[float] = Field(min_length=1)
+
+
+class SensitivityRequest(BaseModel):
+    assessment_id: Optional[int] = None
+    base: Optional[SensitivityBase] = None
+    axes: List[SensitivityAxis] = Field(default_factory=list)
+
+
+class BreakEven(BaseModel):
+    tier: str
+    risk_score: float
+    change: float
+    value: Optional[float] = None
+
+
+class SensitivityGrid(BaseModel):
+    inputs: List[str]
+    changes: List[List[float]]
+    shape: List[int]
+    risk_score: List[Any]
+    default_probability: List[Any]
+    creditworthiness: List[Any]
+
+
+class SensitivityResponse(BaseModel):
+    industry: str
+    base: Dict[str, Union[float, str]]
+    jacobian: Dict[str, Dict[str, float]]
+    break_evens: Dict[str, List[BreakEven]]
+    grid: Optional[SensitivityGrid] = None
@@ -0,0 +1,237 @@
+"""
+What-if sensitivity of the credit view to its inputs.
+
+From one base analysis, a grid of changes to net margin, current ratio, DSO,
+DSCR, expenses and debt is scored in one vectorized pass through
+``_risk_score_array`` and ``CreditRiskPredictor.predict_default_probability_batch``;
+nothing is re-parsed and no model is refitted. Each input moves the four risk
+ratios along a fixed direction, its row of the Jacobian precomputed from the
+base, except debt, which divides DSCR. Score slopes come from the same term
+tables the scoring functions use (``RISK_TERMS``, ``DEFAULT_TERMS``).
+Break-evens are the changes at which ``_credit_tier`` flips, found by
+bisection along each input on its own. Without debt, DSCR is a fixed
+placeholder rather than a ratio, so debt is not offered as an input and
+expenses don't move DSCR.
+"""
+
+from __future__ import annotations
+import math
+import numpy as np
+from fastapi import HTTPException
+from .analysis import CREDIT_TIERS, NO_DEBT_DSCR, RISK_TERMS, _credit_tier, _credit_tier_array, _risk_score_array
+from .config import settings
+from .ml_analytics import DEFAULT_TERMS, CreditRiskPredictor
+from .telemetry import span
+
+RATIOS = ("net_margin", "current_ratio", "dso_days", "dscr")
+# Changes to these are fractions of the base amount (0.1 = +10%); ratio changes are added
+RELATIVE_INPUTS = ("expenses", "debt")
+INPUTS = RATIOS + RELATIVE_INPUTS
+DEBT = INPUTS.index("debt")
+BASE_FIELDS = ("revenue", "expenses", "net_cashflow") + RATIOS
+
+# Ratio ranges outside which each risk score component is saturated; break-evens
+# of ratio inputs lie inside them. Relative inputs are searched over RELATIVE_SEARCH.
+SATURATION = {"net_margin": (0.0, 0.15), "current_ratio": (1.0, 2.5), "dso_days": (0.0, 120.0), "dscr": (0.0, 2.0)}
+RELATIVE_SEARCH = (-1.0, 1000.0)
+MIN_DEBT_CHANGE = -0.999
+BISECTION_STEPS = 80
+
+
+def _base(analysis: dict) -> dict[str, float]:
+    missing = [name for name in BASE_FIELDS if not isinstance(analysis.get(name), (int, float))]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Base analysis is missing: {', '.join(missing)}")
+    base = {name: float(analysis[name]) for name in BASE_FIELDS}
+    debt = analysis.get("debt")
+    if isinstance(debt, (int, float)):
+        base["debt"] = float(debt)
+    return base
+
+
+def _has_debt(analysis: dict) -> bool:
+    """Whether the analysis's DSCR is a real ratio rather than the no-debt placeholder"""
+    debt = analysis.get("debt")
+    if isinstance(debt, (int, float)):
+        return math.isfinite(debt) and debt != 0
+    return analysis.get("dscr") != NO_DEBT_DSCR  # analyses stored before debt was reported
+
+
+def _jacobian(base: dict[str, float], has_debt: bool) -> np.ndarray:
+    """d(ratio)/d(change) at the base, one row per input in INPUTS.
+
+    Extra expenses are assumed to be paid in cash, so they lower net cash flow
+    and with it DSCR (whose denominator, debt, is unchanged); without debt
+    DSCR stays at its placeholder.
+    """
+    jacobian = np.zeros((len(INPUTS), len(RATIOS)))
+    jacobian[: len(RATIOS)] = np.eye(len(RATIOS))
+    revenue, expenses, cashflow, dscr = base["revenue"], base["expenses"], base["net_cashflow"], base["dscr"]
+    expense_row = jacobian[INPUTS.index("expenses")]
+    expense_row[0] = -expenses / revenue if revenue else 0.0
+    expense_row[3] = -dscr * expenses / cashflow if cashflow and has_debt else 0.0
+    jacobian[DEBT, 3] = -dscr if has_debt else 0.0
+    return jacobian
+
+
+def _score(ratios0: np.ndarray, jacobian: np.ndarray, changes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Risk scores and default probabilities for an (n, len(INPUTS)) array of changes"""
+    ratios = ratios0 + changes[:, :DEBT] @ jacobian[:DEBT]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratios[:, 3] /= 1.0 + changes[:, DEBT]
+    net_margin, current_ratio, dso_days, dscr = ratios.T
+    risk = _risk_score_array(net_margin, current_ratio, dso_days, dscr)
+    return risk, CreditRiskPredictor.predict_default_probability_batch(net_margin, current_ratio, dscr)
+
+
+def _gradient(ratios0: np.ndarray, jacobian: np.ndarray, terms: dict, sign: float = 1.0) -> np.ndarray:
+    """Local slope per unit change of each input of a score built from ``terms`` (see RISK_TERMS).
+
+    Each term adds ``sign * points`` times its clipped component, so only
+    components strictly inside (0, 1) at the base move.
+    """
+    by_ratio = np.zeros(len(RATIOS))
+    for i, name in enumerate(RATIOS):
+        if name in terms:
+            offset, scale, points = terms[name]
+            raw = (ratios0[i] - offset) / scale
+            by_ratio[i] = sign * points / scale if 0.0 < raw < 1.0 else 0.0
+    return jacobian @ by_ratio
+
+
+def _search_range(input_name: str, ratios0: np.ndarray) -> tuple[float, float]:
+    if input_name in RELATIVE_INPUTS:
+        low, high = RELATIVE_SEARCH
+        return (max(low, MIN_DEBT_CHANGE) if input_name == "debt" else low), high
+    low, high = SATURATION[input_name]
+    base = ratios0[RATIOS.index(input_name)]
+    return low - base, high - base
+
+
+def _input_value(input_name: str, base: dict[str, float], change: float) -> float | None:
+    """The input itself after ``change``; None for debt when the analysis does not report it"""
+    if input_name == "debt":
+        return base["debt"] * (1.0 + change) if "debt" in base else None
+    if input_name == "expenses":
+        return base["expenses"] * (1.0 + change)
+    return base[input_name] + change
+
+
+def _break_evens(
+    base: dict[str, float], ratios0: np.ndarray, jacobian: np.ndarray, inputs: tuple[str, ...]
+) -> dict[str, list[dict]]:
+    """Per input, the change at which the risk score reaches each credit tier's threshold"""
+    thresholds = np.array([threshold for threshold, _ in CREDIT_TIERS], dtype=float)
+    results = {}
+    for name in inputs:
+        column = INPUTS.index(name)
+        def risk_at(changes: np.ndarray) -> np.ndarray:
+            grid = np.zeros((len(changes), len(INPUTS)))
+            grid[:, column] = changes
+            return _score(ratios0, jacobian, grid)[0]
+
+        low, high = _search_range(name, ratios0)
+        risk_low, risk_high = risk_at(np.array([low, high]))
+        increasing = risk_high >= risk_low
+        reachable = (min(risk_low, risk_high) < thresholds) & (thresholds <= max(risk_low, risk_high))
+        targets = thresholds[reachable]
+        # Invariant: the target is met at the "inside" end and missed at the "outside" end
+        inside = np.full(len(targets), high if increasing else low)
+        outside = np.full(len(targets), low if increasing else high)
+        for _ in range(BISECTION_STEPS):
+            middle = (inside + outside) / 2
+            met = risk_at(middle) >= targets
+            inside = np.where(met, middle, inside)
+            outside = np.where(met, outside, middle)
+
+        results[name] = [
+            {
+                "tier": _credit_tier(target),
+                "risk_score": float(target),
+                "change": round(float(change), 6),
+                "value": _input_value(name, base, float(change)),
+            }
+            for target, change in zip(targets, inside)
+        ]
+    return results
+
+
+def _grid_changes(axes: list[dict], inputs: tuple[str, ...]) -> tuple[list[str], np.ndarray, tuple[int, ...]]:
+    names = [axis["input"] for axis in axes]
+    if "debt" in names and "debt" not in inputs:
+        raise HTTPException(status_code=400, detail="The base analysis has no debt, so debt cannot be varied")
+    unknown = sorted(set(names) - set(inputs))
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown sensitivity inputs: {', '.join(unknown)}. Available: {', '.join(inputs)}",
+        )
+    if len(set(names)) != len(names):
+        raise HTTPException(status_code=400, detail="Each input may appear in only one axis")
+
+    values = [np.asarray(axis["changes"], dtype=float) for axis in axes]
+    for name, changes in zip(names, values):
+        if not np.isfinite(changes).all():
+            raise HTTPException(status_code=400, detail=f"Changes for {name} must be finite numbers")
+        if name in RELATIVE_INPUTS and (changes <= -1.0).any():
+            raise HTTPException(status_code=400, detail=f"Changes for {name} are fractions and must be above -1")
+    shape = tuple(len(changes) for changes in values)
+    points = math.prod(shape)
+    if points > settings.sensitivity_max_points:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Grid has {points} points; at most {settings.sensitivity_max_points} are allowed",
+        )
+
+    grid = np.zeros((points, len(INPUTS)))
+    for name, mesh in zip(names, np.meshgrid(*values, indexing="ij")):
+        grid[:, INPUTS.index(name)] = mesh.ravel()
+    return names, grid, shape
+
+
+def analyze_sensitivity(analysis: dict, axes: list[dict]) -> dict:
+    """Base scores, per-input slopes, tier break-evens and the scored grid of ``axes``.
+
+    ``axes`` is a list of ``{"input": name, "changes": [...]}``; the grid is
+    their Cartesian product, with unlisted inputs held at the base. Without
+    debt the debt input is left out of the slopes and break-evens.
+    """
+    with span("sensitivity"):
+        base = _base(analysis)
+        has_debt = _has_debt(analysis)
+        inputs = INPUTS if has_debt else tuple(name for name in INPUTS if name != "debt")
+        ratios0 = np.array([base[name] for name in RATIOS])
+        jacobian = _jacobian(base, has_debt)
+        names, grid, shape = _grid_changes(axes, inputs)
+
+        risk, default = _score(ratios0, jacobian, np.zeros((1, len(INPUTS))))
+        risk_slopes = _gradient(ratios0, jacobian, RISK_TERMS)
+        default_slopes = _gradient(ratios0, jacobian, DEFAULT_TERMS, sign=-1.0)
+
+        result = {
+            "industry": analysis.get("industry", "Services"),
+            "base": {
+                **{name: base[name] for name in RATIOS},
+                "risk_score": float(risk[0]),
+                "default_probability": float(default[0]),
+                "creditworthiness": _credit_tier(float(risk[0])),
+            },
+            "jacobian": {
+                name: {"risk_score": float(risk_slopes[i]), "default_probability": float(default_slopes[i])}
+                for i, name in enumerate(INPUTS)
+                if name in inputs
+            },
+            "break_evens": _break_evens(base, ratios0, jacobian, inputs),
+            "grid": None,
+        }
+        if names:
+            risk, default = _score(ratios0, jacobian, grid)
+            result["grid"] = {
+                "inputs": names,
+                "changes": [axis["changes"] for axis in axes],
+                "shape": list(shape),
+                "risk_score": risk.reshape(shape).tolist(),
+                "default_probability": default.reshape(shape).tolist(),
+                "creditworthiness": _credit_tier_array(risk).reshape(shape).tolist(),
+            }
+    return result
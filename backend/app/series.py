@@ -0,0 +1,98 @@
+"""
+Compact per-period financial series shared by the analysis stages.
+
+A parsed frame is turned into one ``FinancialSeries`` per request: each
+canonical column becomes a contiguous, read-only float array taken from the
+frame without copying when it is already float64/float32, and alias columns
+(``sales``, ``receivables``, ...) point at the same array instead of being
+duplicated. Headline metrics, forecasting, anomaly detection and the Monte
+Carlo shock fit all read these arrays rather than re-extracting them from a
+DataFrame.
+"""
+
+from __future__ import annotations
+from typing import Iterable, Mapping, Optional
+import numpy as np
+import pandas as pd
+
+FIELDS = ("revenue", "expenses", "cash_in", "cash_out", "ar", "ap", "inventory", "debt", "tax")
+FLOAT_DTYPES = (np.dtype(np.float64), np.dtype(np.float32))
+
+
+def _array(values) -> np.ndarray:
+    """Read-only contiguous float view of a column; copies only to convert"""
+    if isinstance(values, pd.Series):
+        if values.dtype in FLOAT_DTYPES:
+            array = values.to_numpy(copy=False)
+        else:
+            array = pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    else:
+        array = np.asarray(values)
+        if array.dtype not in FLOAT_DTYPES:
+            array = array.astype(np.float64)
+    array = np.ascontiguousarray(array).view()
+    array.flags.writeable = False
+    return array
+
+
+class FinancialSeries:
+    """One company's periods as a fixed set of optional float arrays of equal length"""
+
+    __slots__ = FIELDS + ("length",)
+
+    def __init__(self, length: int, columns: Mapping[str, np.ndarray]):
+        self.length = length
+        for name in FIELDS:
+            setattr(self, name, columns.get(name))
+
+    @classmethod
+    def from_arrays(cls, columns: Mapping[str, object]) -> "FinancialSeries":
+        arrays = {name: _array(values) for name, values in columns.items() if name in FIELDS}
+        lengths = {len(values) for values in arrays.values()}
+        if len(lengths) > 1:
+            raise ValueError("All columns must have the same length")
+        return cls(lengths.pop() if lengths else 0, arrays)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, names: Optional[Mapping[str, object]] = None) -> "FinancialSeries":
+        """``names`` maps canonical fields to ``df`` column labels (default: same-named columns)"""
+        if names is None:
+            names = {name: name for name in FIELDS if name in df.columns}
+        return cls(len(df), {name: _array(df[label]) for name, label in names.items() if name in FIELDS})
+
+    @classmethod
+    def of(cls, data) -> "FinancialSeries":
+        """``data`` itself if it is already a series, else one over its canonically named columns"""
+        return data if isinstance(data, cls) else cls.from_frame(data)
+
+    def __len__(self) -> int:
+        return self.length
+
+    @property
+    def columns(self) -> tuple[str, ...]:
+        return tuple(name for name in FIELDS if getattr(self, name) is not None)
+
+    def get(self, name: str, default: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        values = getattr(self, name, None) if name in FIELDS else None
+        return default if values is None else values
+
+    def totals(self, names: Iterable[str] = FIELDS) -> dict[str, tuple[float, int]]:
+        """(NaN-skipping sum, non-null count) per present column"""
+        totals = {}
+        for name in names:
+            values = self.get(name)
+            if values is not None:
+                valid = ~np.isnan(values)
+                count = int(valid.sum())
+                if count < self.length:
+                    values = np.where(valid, values, 0.0)
+                totals[name] = (float(values.sum(dtype=np.float64)), count)
+        return totals
+
+    def stack(self, names: Iterable[str], dtype=np.float64) -> np.ndarray:
+        """The named columns as rows of one (columns, periods) array"""
+        names = list(names)
+        stacked = np.empty((len(names), self.length), dtype=dtype)
+        for row, name in zip(stacked, names):
+            row[:] = self.get(name)
+        return stacked
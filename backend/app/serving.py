@@ -0,0 +1,137 @@
+"""
+Multi-worker (gunicorn) serving support; see ``backend/gunicorn.conf.py``.
+
+Workers are sized to the cores this container may actually use, the app and
+its read-only models are loaded once in the master and shared copy-on-write
+with the forked workers, BLAS/OpenMP pools are capped so workers don't
+oversubscribe the cores, and a worker whose private memory passes a
+high-water mark restarts itself gracefully.
+"""
+
+from __future__ import annotations
+import logging
+import math
+import os
+import signal
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Every native thread pool NumPy/SciPy/scikit-learn may start
+THREAD_POOL_ENV = [
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "BLIS_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+]
+MEMORY_CHECK_SECONDS = 5.0
+
+
+def available_cores() -> int:
+    """CPUs this process may run on: affinity mask, narrowed by a cgroup v2 CPU quota"""
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as handle:
+            quota, period = handle.read().split()[:2]
+        if quota != "max":
+            cores = min(cores, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(cores, 1)
+
+
+def worker_count(configured: int = 0) -> int:
+    return configured if configured > 0 else available_cores()
+
+
+def cap_native_threads(threads: int) -> None:
+    """Limit BLAS/OpenMP pools; must run before NumPy is imported, and explicit env settings win"""
+    for name in THREAD_POOL_ENV:
+        os.environ.setdefault(name, str(max(threads, 1)))
+
+
+def preload() -> None:
+    """Load the analytics stack, pretrained models and peer index in the master, then freeze the heap.
+
+    ``gc.freeze`` moves everything loaded so far out of the collector's reach,
+    so collections in a worker don't write to (and so un-share) those pages.
+    """
+    import gc
+
+    from . import startup
+
+    startup.warm_up()
+    refresh_peers()
+    gc.collect()
+    gc.freeze()
+
+
+def refresh_peers() -> None:
+    """Bring the master's peer index up to date so the next forked worker inherits it"""
+    from .peers import peer_index
+
+    if peer_index.refresh_seconds <= 0:
+        return
+    try:
+        peer_index.refresh()
+    except Exception:
+        # e.g. the tables don't exist yet; workers then load the index themselves
+        logger.warning("Could not load the peer index before forking", exc_info=True)
+
+
+def after_fork() -> None:
+    """Drop database connections inherited from the master; each worker opens its own"""
+    from .db import dispose_after_fork
+
+    dispose_after_fork()
+
+
+def private_bytes() -> Optional[int]:
+    """Memory only this process holds: pages still shared copy-on-write with the master don't count.
+
+    Falls back to RSS where ``/proc/self/smaps_rollup`` is unavailable (kernels before 4.14).
+    """
+    try:
+        with open("/proc/self/smaps_rollup") as handle:
+            kilobytes = sum(
+                int(line.split()[1]) for line in handle if line.startswith(("Private_Clean:", "Private_Dirty:"))
+            )
+        return kilobytes * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        with open("/proc/self/statm") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class MemoryWatchdog:
+    """Asks this worker to shut down gracefully (SIGTERM) once its private memory exceeds ``max_bytes``"""
+
+    def __init__(self, max_bytes: int, interval: float = MEMORY_CHECK_SECONDS):
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        if self.max_bytes <= 0 or private_bytes() is None:
+            return
+        threading.Thread(target=self._run, name="memory-watchdog", daemon=True).start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            used = private_bytes()
+            if used is not None and used > self.max_bytes:
+                logger.warning(
+                    "Worker %d private memory %.0f MB exceeds %.0f MB; restarting",
+                    os.getpid(), used / 2**20, self.max_bytes / 2**20,
+                )
+                os.kill(os.getpid(), signal.SIGTERM)
+                return
@@ -0,0 +1,76 @@
+"""
+Cold-start bookkeeping.
+
+The API module imports only the lightweight stack (FastAPI, SQLAlchemy); the
+analytics modules load on first use. ``warm_up`` imports them eagerly (timing
+each one) for long-running servers, and ``report`` exposes the breakdown.
+"""
+
+from __future__ import annotations
+import importlib
+import importlib.util
+import sys
+import threading
+import time
+from typing import Optional
+
+# Imported in dependency order so each timing reflects that module's own cost
+HEAVY_MODULES = [
+    "numpy",
+    "pandas",
+    "scipy.stats",
+    "sklearn.ensemble",
+    "pdfplumber",
+    ".analysis",
+    ".pipeline",
+]
+
+_import_seconds: dict[str, float] = {}
+_app_import_seconds: Optional[float] = None
+_warm_up_seconds: Optional[float] = None
+_lock = threading.Lock()
+
+
+def record_app_import(seconds: float) -> None:
+    global _app_import_seconds
+    _app_import_seconds = seconds
+
+
+def timed_import(module: str):
+    """Import ``module``, recording its cost unless something already loaded it"""
+    already_loaded = importlib.util.resolve_name(module, __package__) in sys.modules
+    started = time.perf_counter()
+    loaded = importlib.import_module(module, __package__)
+    if not already_loaded:
+        _import_seconds[module.lstrip(".")] = time.perf_counter() - started
+    return loaded
+
+
+def warm_up() -> dict:
+    """Import the analytics stack and preload pretrained models; safe to call repeatedly"""
+    global _warm_up_seconds
+    with _lock:
+        if _warm_up_seconds is None:
+            started = time.perf_counter()
+            for module in HEAVY_MODULES:
+                timed_import(module)
+            from .model_registry import anomaly_registry
+
+            anomaly_registry.preload()
+            _warm_up_seconds = time.perf_counter() - started
+    return report()
+
+
+def warm_worker() -> None:
+    """Process-pool initializer: load the analytics stack once per worker"""
+    for module in HEAVY_MODULES:
+        importlib.import_module(module, __package__)
+
+
+def report() -> dict:
+    return {
+        "app_import_seconds": _app_import_seconds,
+        "warmed": _warm_up_seconds is not None,
+        "warm_up_seconds": _warm_up_seconds,
+        "imports": dict(_import_seconds),
+    }
@@ -0,0 +1,164 @@
+"""
+Lightweight hot-path instrumentation.
+
+``span("stage")`` times a block into the ``finhealth_stage_seconds`` histogram.
+Inside executor jobs observations are buffered per job (``collect``) and shipped
+back with the result, so stages timed in worker processes still land in the
+API process's registry. ``render`` produces Prometheus text exposition.
+
+Long-running jobs can also install a progress reporter; spans then announce
+each stage as it is reached and stages may report finer progress (e.g. PDF
+pages parsed) via ``report_progress``.
+"""
+
+from __future__ import annotations
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Optional
+
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = tuple(float(1024 * 4 ** i) for i in range(10))  # 1 KiB .. 256 MiB
+ROW_BUCKETS = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+Observation = tuple[str, tuple[tuple[str, str], ...], float]
+
+# Upload extensions -> file_type label; anything else is "other", so clients can't mint label values
+FILE_TYPES = {
+    "csv": "csv",
+    "xlsx": "xlsx",
+    "xls": "xlsx",
+    "pdf": "pdf",
+    "parquet": "parquet",
+    "pq": "parquet",
+    "arrow": "arrow",
+    "arrows": "arrow",
+    "feather": "arrow",
+    "ipc": "arrow",
+    "json": "json",
+    "npz": "npz",
+}
+
+_buffer: ContextVar[Optional[list[Observation]]] = ContextVar("telemetry_buffer", default=None)
+_progress: ContextVar[Optional[Callable[[dict], None]]] = ContextVar("telemetry_progress", default=None)
+
+
+def _escape(value: str) -> str:
+    """A label value escaped for the text exposition format"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: tuple, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(float(b) for b in buckets)
+        self.labels = labels
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple((name, str(labels.get(name, ""))) for name in self.labels)
+        buffer = _buffer.get()
+        if buffer is not None:
+            buffer.append((self.name, key, value))
+            return
+        self._observe(key, value)
+
+    def _observe(self, key: tuple, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+        for key, counts, total, count in sorted(items):
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in key)
+            cumulative = 0
+            for bound, hits in zip(self.buckets + (float("inf"),), counts):
+                cumulative += hits
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                sep = "," if labels else ""
+                lines.append(f'{self.name}_bucket{{{labels}{sep}le="{le}"}} {cumulative}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("finhealth_stage_seconds", "Time spent per pipeline stage", TIME_BUCKETS, ("stage",))
+REQUEST_SECONDS = Histogram(
+    "finhealth_request_seconds", "End-to-end request latency", TIME_BUCKETS, ("route", "file_type")
+)
+PAYLOAD_BYTES = Histogram("finhealth_payload_bytes", "Request body size", SIZE_BUCKETS, ("route", "file_type"))
+ROWS = Histogram("finhealth_rows", "Rows (periods) analyzed per job", ROW_BUCKETS, ("file_type",))
+
+HISTOGRAMS = {h.name: h for h in (STAGE_SECONDS, REQUEST_SECONDS, PAYLOAD_BYTES, ROWS)}
+
+
+def report_progress(**fields: Any) -> None:
+    """Forward progress to the job being run in this context, if any"""
+    callback = _progress.get()
+    if callback is not None:
+        callback(fields)
+
+
+@contextmanager
+def progress_reporter(callback: Callable[[dict], None]) -> Iterator[None]:
+    token = _progress.set(callback)
+    try:
+        yield
+    finally:
+        _progress.reset(token)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    report_progress(stage=stage)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+
+
+def collect(fn: Callable, *args: Any) -> tuple[Any, list[Observation]]:
+    """Run ``fn`` buffering every observation it makes instead of recording it"""
+    buffer: list[Observation] = []
+    token = _buffer.set(buffer)
+    try:
+        return fn(*args), buffer
+    finally:
+        _buffer.reset(token)
+
+
+def record(observations: list[Observation]) -> None:
+    for name, key, value in observations:
+        histogram = HISTOGRAMS.get(name)
+        if histogram is not None:
+            histogram._observe(key, value)
+
+
+def file_type(filename: str) -> str:
+    """The ``file_type`` label for an upload, one of a fixed set of values"""
+    extension = filename.lower().rsplit(".", 1)[-1] if "." in filename else ""
+    return FILE_TYPES.get(extension, "other")
+
+
+def render(gauges: Optional[dict[str, float]] = None) -> str:
+    lines: list[str] = []
+    for histogram in HISTOGRAMS.values():
+        lines.extend(histogram.render())
+    for name, value in (gauges or {}).items():
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {float(value)}")
+    return "\n".join(lines) + "\n"
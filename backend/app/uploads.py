@@ -0,0 +1,95 @@
+"""
+Upload spooling.
+
+Kept free of pandas/NumPy imports so request handlers can receive uploads
+without loading the analytics stack.
+"""
+
+from __future__ import annotations
+import hashlib
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, NamedTuple, Union
+from fastapi import UploadFile
+from .config import settings
+from .telemetry import span
+
+SPOOL_READ_BYTES = 1024 * 1024
+
+
+class SpooledUpload(NamedTuple):
+    source: Union[bytes, str]  # raw bytes, or a temp-file path for large uploads
+    digest: str  # sha256 of the raw upload content
+
+
+PARQUET_SUFFIXES = (".parquet", ".pq")
+ARROW_SUFFIXES = (".arrow", ".arrows", ".feather", ".ipc")
+STREAMABLE_SUFFIXES = (".csv", ".xlsx") + PARQUET_SUFFIXES + ARROW_SUFFIXES
+
+
+def is_streamable(filename: str) -> bool:
+    return filename.lower().endswith(STREAMABLE_SUFFIXES)
+
+
+def is_spoolable(filename: str) -> bool:
+    """File types whose readers can work from a path instead of in-memory bytes"""
+    return is_streamable(filename) or filename.lower().endswith(".pdf")
+
+
+@asynccontextmanager
+async def spooled_upload(file: UploadFile) -> AsyncIterator[SpooledUpload]:
+    """Yield the upload as bytes, or as a temp-file path once it exceeds the spool threshold.
+
+    The upload is copied (and hashed) in fixed-size blocks, so a large file is
+    never held in memory in full; the temp file is removed when the block exits.
+    """
+    hasher = hashlib.sha256()
+    buffer = bytearray()
+    path = None
+    handle = None
+    try:
+        with span("upload_read"):
+            while True:
+                block = await file.read(SPOOL_READ_BYTES)
+                if not block:
+                    break
+                hasher.update(block)
+                if handle is not None:
+                    handle.write(block)
+                    continue
+                buffer += block
+                if len(buffer) > settings.stream_spool_threshold_bytes and is_spoolable(file.filename or ""):
+                    suffix = os.path.splitext(file.filename or "")[1]
+                    handle = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
+                    path = handle.name
+                    handle.write(buffer)
+                    buffer = bytearray()
+
+        if handle is not None:
+            handle.close()
+            yield SpooledUpload(path, hasher.hexdigest())
+        else:
+            yield SpooledUpload(bytes(buffer), hasher.hexdigest())
+    finally:
+        if handle is not None:
+            handle.close()
+        if path is not None:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+async def save_upload(file: UploadFile, path: str) -> str:
+    """Copy the upload to ``path`` in fixed-size blocks and return its sha256"""
+    hasher = hashlib.sha256()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with span("upload_read"), open(path, "wb") as handle:
+        while True:
+            block = await file.read(SPOOL_READ_BYTES)
+            if not block:
+                break
+            hasher.update(block)
+            handle.write(block)
+    return hasher.hexdigest()
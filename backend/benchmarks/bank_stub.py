@@ -0,0 +1,107 @@
+"""
+Local stand-in for the bank and payment provider APIs.
+
+Serves the protocol ``app.integrations`` expects, with deterministic data per
+company id and optional injected latency and failures, so integrations can be
+developed and load-tested offline:
+
+    cd backend
+    python -m benchmarks.bank_stub --port 8700 --latency-ms 40 --failure-rate 0.05
+    BANK_A_URL=http://127.0.0.1:8700/bank-a BANK_B_URL=http://127.0.0.1:8700/bank-b uvicorn app.main:app
+"""
+
+from __future__ import annotations
+import argparse
+import asyncio
+import hashlib
+import random
+from datetime import date
+from fastapi import FastAPI, HTTPException
+
+PROVIDERS = {
+    "bank-a": {"name": "StubBank A", "share": 0.7},
+    "bank-b": {"name": "StubPay B", "share": 0.3},
+}
+
+app = FastAPI(title="Bank provider stub")
+app.state.latency_ms = 0.0
+app.state.jitter_ms = 0.0
+app.state.failure_rate = 0.0
+
+
+def _company_rng(provider: str, company_id: str) -> random.Random:
+    seed = hashlib.sha256(f"{provider}:{company_id}".encode()).digest()
+    return random.Random(int.from_bytes(seed[:8], "big"))
+
+
+async def _simulate_network() -> None:
+    delay = app.state.latency_ms + random.uniform(0, app.state.jitter_ms)
+    if delay > 0:
+        await asyncio.sleep(delay / 1000)
+    if random.random() < app.state.failure_rate:
+        raise HTTPException(status_code=503, detail="Injected provider failure")
+
+
+def _provider(provider: str) -> dict:
+    if provider not in PROVIDERS:
+        raise HTTPException(status_code=404, detail="Unknown provider")
+    return PROVIDERS[provider]
+
+
+def _month(offset: int) -> str:
+    today = date.today()
+    index = today.year * 12 + today.month - 1 - offset
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+@app.get("/{provider}/accounts/{company_id}/cashflow")
+async def cashflow(provider: str, company_id: str, periods: int = 12):
+    meta = _provider(provider)
+    await _simulate_network()
+    rng = _company_rng(provider, company_id)
+    scale = rng.uniform(2e5, 8e5) * meta["share"]
+    rows = []
+    for offset in range(periods - 1, -1, -1):
+        inflows = scale * rng.uniform(0.85, 1.15)
+        rows.append({
+            "period": _month(offset),
+            "inflows": round(inflows, 2),
+            "outflows": round(inflows * rng.uniform(0.8, 1.02), 2),
+        })
+    return {"provider": meta["name"], "currency": "INR", "periods": rows}
+
+
+@app.get("/{provider}/accounts/{company_id}/summary")
+async def summary(provider: str, company_id: str):
+    meta = _provider(provider)
+    await _simulate_network()
+    rng = _company_rng(provider, company_id)
+    inflows = rng.uniform(2e5, 8e5) * meta["share"]
+    return {
+        "provider": meta["name"],
+        "accounts": rng.randint(1, 4),
+        "average_balance": round(inflows * rng.uniform(0.2, 0.6), 2),
+        "monthly_inflows": round(inflows, 2),
+        "monthly_outflows": round(inflows * rng.uniform(0.8, 1.02), 2),
+    }
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve stub bank/payment provider APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="fixed delay added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="extra uniform random delay")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    args = parser.parse_args()
+
+    app.state.latency_ms = args.latency_ms
+    app.state.jitter_ms = args.jitter_ms
+    app.state.failure_rate = args.failure_rate
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
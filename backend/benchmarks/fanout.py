@@ -0,0 +1,119 @@
+"""
+Fan-out latency load test for the bank integrations.
+
+Starts ``benchmarks.bank_stub`` in-process (or targets ``--url``), then drives
+concurrent cash-flow fan-outs through ``IntegrationHub`` and reports latency
+percentiles, throughput and the hub's cache/breaker counters.
+
+    cd backend
+    python -m benchmarks.fanout --requests 2000 --concurrency 100 --latency-ms 40
+"""
+
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import threading
+import time
+from typing import Optional
+import numpy as np
+from app.integrations import IntegrationHub, Provider
+
+
+def _start_stub(port: int, latency_ms: float, jitter_ms: float, failure_rate: float) -> None:
+    import uvicorn
+    from .bank_stub import app
+
+    app.state.latency_ms = latency_ms
+    app.state.jitter_ms = jitter_ms
+    app.state.failure_rate = failure_rate
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="bank-stub", daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+
+async def run(
+    url: str,
+    requests: int,
+    concurrency: int,
+    companies: int,
+    periods: int,
+    timeout: float,
+    cache_ttl: float,
+    sequential: bool = False,
+) -> dict:
+    hub = IntegrationHub(
+        providers=[Provider("bank_a", f"{url}/bank-a", timeout), Provider("bank_b", f"{url}/bank-b", timeout)],
+        max_connections=concurrency * 2,  # one connection per provider per in-flight fan-out
+        cache_ttl=cache_ttl,
+        breaker_failures=5,
+        breaker_reset=5.0,
+    )
+    limit = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def one(i: int) -> None:
+        company_id = f"company-{i % companies}"
+        async with limit:
+            started = time.perf_counter()
+            if sequential:
+                for name in hub.providers:
+                    try:
+                        await hub.fetch(name, f"/accounts/{company_id}/cashflow", {"periods": periods})
+                    except Exception:
+                        pass
+            else:
+                await hub.cashflow(company_id, periods)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    await hub.aclose()
+
+    ms = np.array(latencies) * 1000
+    return {
+        "mode": "sequential" if sequential else "fan-out",
+        "requests": requests,
+        "concurrency": concurrency,
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "requests_per_second": requests / elapsed,
+        "hub": hub.stats(),
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Load-test bank integration fan-out against the stub server")
+    parser.add_argument("--url", help="existing stub/provider base URL; by default a stub is started in-process")
+    parser.add_argument("--port", type=int, default=8701)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--companies", type=int, default=200, help="distinct company ids (cache key space)")
+    parser.add_argument("--periods", type=int, default=12)
+    parser.add_argument("--timeout", type=float, default=2.0, help="per-provider timeout in seconds")
+    parser.add_argument("--cache-ttl", type=float, default=0.0, help="response cache TTL (0 measures the network)")
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--sequential", action="store_true", help="also measure calling providers one by one")
+    args = parser.parse_args(argv)
+
+    url = args.url
+    if url is None:
+        _start_stub(args.port, args.latency_ms, args.jitter_ms, args.failure_rate)
+        url = f"http://127.0.0.1:{args.port}"
+
+    modes = [False, True] if args.sequential else [False]
+    for sequential in modes:
+        result = asyncio.run(run(
+            url, args.requests, args.concurrency, args.companies, args.periods, args.timeout, args.cache_ttl,
+            sequential=sequential,
+        ))
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Benchmark harness for the analysis pipeline.
+
+Times each stage (parsing per format, analyze_dataframe, forecasting, anomaly
+detection, portfolio scoring and the HTTP routes) on synthetic data, records
+latency percentiles, throughput, peak traced memory and allocation counts, and
+writes the results as JSON so runs can be compared across commits.
+
+    cd backend
+    python -m benchmarks.run --rows 2000 --formats csv,xlsx,pdf --output bench.json
+    python -m benchmarks.run --compare bench.json
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+# Benchmark the pipeline itself: in-process execution, no result cache, scratch database
+os.environ.setdefault("ANALYSIS_WORKERS", "0")
+os.environ.setdefault("CACHE_MAX_ENTRIES", "0")
+os.environ.setdefault("WARMUP_ON_STARTUP", "false")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'finhealth-bench.db')}")
+
+import numpy as np  # noqa: E402
+from .synthetic import generate_financials, to_bytes  # noqa: E402
+
+
+def allocations(fn: Callable[[], object]) -> tuple[int, int]:
+    """(calls that allocated, bytes they allocated) over one run of ``fn``.
+
+    Traced memory is sampled around every Python and C call and each call is
+    charged its own growth, net of its callees; memory a call frees before
+    returning is netted out, so the byte count is a lower bound.
+    """
+    calls = 0
+    allocated = 0
+    stack: list[list[int]] = []  # [traced bytes at entry, growth charged to callees]
+
+    def profile(frame, event, arg):
+        nonlocal calls, allocated
+        if event in ("call", "c_call"):
+            stack.append([tracemalloc.get_traced_memory()[0], 0])
+        elif stack:
+            started, nested = stack.pop()
+            grown = tracemalloc.get_traced_memory()[0] - started
+            own = grown - nested
+            if own > 0:
+                calls += 1
+                allocated += own
+            if stack:
+                stack[-1][1] += grown
+
+    tracemalloc.start()
+    sys.setprofile(profile)
+    try:
+        fn()
+    finally:
+        sys.setprofile(None)
+        tracemalloc.stop()
+    return calls, allocated
+
+
+def measure(fn: Callable[[], object], repeat: int, items: int = 0) -> dict:
+    """Run ``fn`` ``repeat`` times; report latency percentiles, throughput, peak memory and allocations"""
+    fn()  # warm caches and lazy imports outside the measurement
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    allocating_calls, allocated = allocations(fn)
+
+    timings_ms = np.array(timings) * 1000
+    result = {
+        "repeat": repeat,
+        "min_ms": float(timings_ms.min()),
+        "median_ms": float(np.median(timings_ms)),
+        "p95_ms": float(np.percentile(timings_ms, 95)),
+        "peak_memory_mb": peak / 1e6,
+        "allocations": allocating_calls,
+        "allocated_mb": allocated / 1e6,
+    }
+    if items:
+        result["items"] = items
+        result["items_per_second"] = items / float(np.median(timings))
+    return result
+
+
+def run(args: argparse.Namespace) -> dict:
+    from app.analysis import analyze_dataframe, analyze_portfolio, parse_bytes_to_df
+    from app.ml_analytics import AnomalyDetector, FinancialPredictor
+    from app.pipeline import analyze_upload
+
+    df = generate_financials(
+        rows=args.rows, columns=args.columns, anomaly_rate=args.anomaly_rate, seed=args.seed
+    )
+    stages: dict[str, dict] = {}
+
+    for fmt in args.formats:
+        payload = to_bytes(df, fmt)
+        stages[f"parse_{fmt}"] = {
+            **measure(lambda: parse_bytes_to_df(f"bench.{fmt}", payload), args.repeat, args.rows),
+            "payload_bytes": len(payload),
+        }
+        stages[f"pipeline_{fmt}"] = measure(
+            lambda: analyze_upload(f"bench.{fmt}", payload, args.industry), args.repeat, args.rows
+        )
+
+    stages["analyze_dataframe"] = measure(lambda: analyze_dataframe(df, args.industry), args.repeat, args.rows)
+
+    def forecast():
+        predictor = FinancialPredictor()
+        predictor.fit(df)
+        return predictor.forecast(3)
+
+    def anomalies():
+        detector = AnomalyDetector()
+        detector.fit(df)
+        return detector.detect(df)
+
+    stages["forecast"] = measure(forecast, args.repeat, args.rows)
+    stages["anomaly_detection"] = measure(anomalies, args.repeat, args.rows)
+
+    if args.companies > 1:
+        portfolio = generate_financials(
+            rows=args.portfolio_periods,
+            columns=args.columns,
+            companies=args.companies,
+            industries=args.industries,
+            anomaly_rate=args.anomaly_rate,
+            seed=args.seed,
+        )
+        stages["portfolio"] = measure(lambda: analyze_portfolio(portfolio), args.repeat, args.companies)
+
+    stages.update(_route_stages(df, args))
+    return stages
+
+
+def _route_stages(df, args: argparse.Namespace) -> dict:
+    try:
+        from fastapi.testclient import TestClient
+    except (ImportError, RuntimeError):
+        print("httpx not installed; skipping route benchmarks", file=sys.stderr)
+        return {}
+    from app.main import app
+
+    headers = {"X-API-Key": os.getenv("API_KEY", "dev-key")}
+    csv_payload = to_bytes(df, "csv")
+    records = json.loads(df.to_json(orient="records"))
+
+    with TestClient(app) as client:
+        def post_file():
+            response = client.post(
+                "/analyze", params={"industry": args.industry},
+                files={"file": ("bench.csv", csv_payload)}, headers=headers,
+            )
+            response.raise_for_status()
+
+        def post_json():
+            response = client.post(
+                "/analyze-json", json={"industry": args.industry, "records": records}, headers=headers
+            )
+            response.raise_for_status()
+
+        return {
+            "route_analyze": measure(post_file, args.repeat, args.rows),
+            "route_analyze_json": measure(post_json, args.repeat, args.rows),
+        }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Human-readable median-latency deltas (plus peak memory and allocations); returns the stages
+    whose latency regressed past ``threshold``"""
+    regressions = []
+    print(f"{'stage':<24}{'baseline ms':>14}{'current ms':>14}{'delta':>10}{'peak MB':>18}{'allocations':>18}")
+    for stage, result in current["stages"].items():
+        before = baseline.get("stages", {}).get(stage)
+        if before is None:
+            continue
+        delta = (result["median_ms"] - before["median_ms"]) / before["median_ms"] if before["median_ms"] else 0.0
+        marker = "  REGRESSION" if delta > threshold else ""
+        peak = f"{before['peak_memory_mb']:.2f} -> {result['peak_memory_mb']:.2f}"
+        allocs = f"{before.get('allocations', '-')} -> {result.get('allocations', '-')}"
+        print(f"{stage:<24}{before['median_ms']:>14.2f}{result['median_ms']:>14.2f}{delta:>+10.1%}"
+              f"{peak:>18}{allocs:>18}{marker}")
+        if delta > threshold:
+            regressions.append(stage)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the financial analysis pipeline")
+    parser.add_argument("--rows", type=int, default=1000, help="periods in the single-company dataset")
+    parser.add_argument("--columns", type=int, default=9, help="columns (base financial fields, then filler)")
+    parser.add_argument("--companies", type=int, default=1000, help="companies for the portfolio stage")
+    parser.add_argument("--portfolio-periods", type=int, default=12)
+    parser.add_argument("--industries", type=int, default=6)
+    parser.add_argument("--industry", default="Services")
+    parser.add_argument("--anomaly-rate", type=float, default=0.02)
+    parser.add_argument("--formats", default="csv,xlsx,pdf", type=lambda v: [f for f in v.split(",") if f])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="regression threshold for --compare")
+    args = parser.parse_args()
+
+    results = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "stages": run(args),
+    }
+
+    for stage, result in results["stages"].items():
+        rate = f"{result['items_per_second']:>12.0f}/s" if "items_per_second" in result else ""
+        print(f"{stage:<24}{result['median_ms']:>10.2f} ms  p95 {result['p95_ms']:>9.2f} ms  "
+              f"peak {result['peak_memory_mb']:>8.2f} MB  allocs {result['allocations']:>7} {rate}")
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+    if args.compare:
+        with open(args.compare) as fh:
+            regressions = compare(results, json.load(fh), args.threshold)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
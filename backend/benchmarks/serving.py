@@ -0,0 +1,159 @@
+"""
+Multi-worker scaling load test.
+
+Starts ``gunicorn -c gunicorn.conf.py`` with each requested worker count,
+drives /analyze-json with distinct payloads (so the result cache never hits)
+and reports throughput, latency percentiles, speedup over one worker and
+per-worker RSS. With CPU-bound analyses throughput should grow roughly
+linearly up to the number of available cores.
+
+    cd backend
+    python -m benchmarks.serving --workers 1,2,4 --requests 400 --rows 500
+"""
+
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Optional
+import httpx
+import numpy as np
+from app.serving import available_cores
+from .synthetic import generate_financials
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _start_server(workers: int, port: int, database_url: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "WEB_CONCURRENCY": str(workers),
+        "PORT": str(port),
+        "DATABASE_URL": database_url,
+        "CACHE_MAX_ENTRIES": "0",
+        "JOB_WORKERS": "0",
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app.main:app"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    _stop_server(process)
+    raise RuntimeError(f"gunicorn with {workers} workers did not become healthy")
+
+
+def _stop_server(process: subprocess.Popen) -> None:
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def _worker_rss_mb(master_pid: int) -> list[float]:
+    try:
+        children = subprocess.run(
+            ["pgrep", "-P", str(master_pid)], capture_output=True, text=True, check=False
+        ).stdout.split()
+    except OSError:
+        return []
+    sizes = []
+    for pid in children:
+        try:
+            with open(f"/proc/{pid}/statm") as handle:
+                sizes.append(int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20)
+        except (OSError, ValueError, IndexError):
+            continue
+    return sizes
+
+
+async def _drive(port: int, payloads: list[dict], concurrency: int, api_key: str) -> dict:
+    limit = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors = 0
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=120) as client:
+        async def one(payload: dict) -> None:
+            nonlocal errors
+            async with limit:
+                started = time.perf_counter()
+                response = await client.post("/analyze-json", json=payload, headers={"x-api-key": api_key})
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(payload) for payload in payloads))
+        elapsed = time.perf_counter() - started
+
+    ms = np.array(latencies) * 1000
+    return {
+        "requests_per_second": len(payloads) / elapsed,
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "errors": errors,
+    }
+
+
+def _payloads(requests: int, rows: int) -> list[dict]:
+    base = generate_financials(rows=rows, seed=0).to_dict(orient="records")
+    payloads = []
+    for i in range(requests):
+        records = [dict(record) for record in base]
+        records[0]["revenue"] += i  # distinct content per request defeats the result cache
+        payloads.append({"industry": "Services", "records": records})
+    return payloads
+
+
+def run(workers: list[int], requests: int, rows: int, concurrency: Optional[int], port: int, api_key: str) -> dict:
+    payloads = _payloads(requests, rows)
+    results = []
+    with tempfile.TemporaryDirectory() as scratch:
+        for count in workers:
+            database_url = f"sqlite:///{os.path.join(scratch, f'serving-{count}.db')}"
+            process = _start_server(count, port, database_url)
+            try:
+                asyncio.run(_drive(port, payloads[: min(len(payloads), count * 4)], count * 2, api_key))  # warm-up
+                result = asyncio.run(_drive(port, payloads, concurrency or count * 4, api_key))
+                result["workers"] = count
+                result["worker_rss_mb"] = [round(size, 1) for size in _worker_rss_mb(process.pid)]
+                results.append(result)
+            finally:
+                _stop_server(process)
+
+    baseline = results[0]["requests_per_second"] / results[0]["workers"]
+    for result in results:
+        result["speedup"] = round(result["requests_per_second"] / results[0]["requests_per_second"], 2)
+        result["scaling_efficiency"] = round(result["requests_per_second"] / (baseline * result["workers"]), 2)
+    return {"available_cores": available_cores(), "requests": requests, "rows": rows, "results": results}
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Measure throughput scaling across gunicorn worker counts")
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=500, help="periods per request payload")
+    parser.add_argument("--concurrency", type=int, help="in-flight requests (default: 4 per worker)")
+    parser.add_argument("--port", type=int, default=8702)
+    parser.add_argument("--api-key", default=os.getenv("API_KEY", "dev-key"))
+    args = parser.parse_args(argv)
+
+    workers = [int(count) for count in args.workers.split(",") if count.strip()]
+    print(json.dumps(run(workers, args.requests, args.rows, args.concurrency, args.port, args.api_key), indent=2))
+
+
+if __name__ == "__main__":
+    main()
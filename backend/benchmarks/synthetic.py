@@ -0,0 +1,153 @@
+"""
+Synthetic SME financials for benchmarks.
+
+Generates per-period statements with trend, seasonality and noise, optionally
+for several companies and industries, with injected anomalies, and writes them
+as CSV, XLSX or PDF (a plain text PDF with comma-separated lines, so it needs
+no PDF-writing dependency).
+"""
+
+from __future__ import annotations
+import io
+from typing import Optional
+import numpy as np
+import pandas as pd
+
+INDUSTRIES = ["Manufacturing", "Retail", "Agriculture", "Services", "Logistics", "E-commerce"]
+
+BASE_COLUMNS = ["revenue", "expenses", "cash_in", "cash_out", "ar", "ap", "inventory", "debt", "tax"]
+
+
+def generate_financials(
+    rows: int = 1000,
+    columns: int = len(BASE_COLUMNS),
+    companies: int = 1,
+    industries: int = 1,
+    anomaly_rate: float = 0.0,
+    seed: Optional[int] = 0,
+) -> pd.DataFrame:
+    """``rows`` periods per company; ``columns`` beyond the base set are filler noise columns.
+
+    With more than one company the frame is long-format with ``company_id`` and
+    ``industry`` columns, as ``analyze_portfolio`` expects.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.tile(np.arange(rows), companies)
+    scale = np.repeat(rng.uniform(5e4, 5e5, companies), rows)
+    growth = np.repeat(rng.normal(0.01, 0.005, companies), rows)
+
+    # Linear rather than compounding trend so very long histories stay finite
+    revenue = scale * (1 + growth * t) * (1 + 0.08 * np.sin(2 * np.pi * t / 12)) * rng.normal(1, 0.05, t.size)
+    expenses = revenue * rng.normal(0.85, 0.04, t.size)
+
+    if anomaly_rate > 0:
+        hits = rng.random(t.size) < anomaly_rate
+        expenses[hits] *= rng.uniform(1.5, 3.0, hits.sum())
+        revenue[hits] *= rng.uniform(0.3, 0.7, hits.sum())
+
+    data = {
+        "revenue": revenue,
+        "expenses": expenses,
+        "cash_in": revenue * rng.normal(0.95, 0.03, t.size),
+        "cash_out": expenses * rng.normal(0.97, 0.03, t.size),
+        "ar": revenue * rng.uniform(0.1, 0.4, t.size),
+        "ap": expenses * rng.uniform(0.1, 0.3, t.size),
+        "inventory": revenue * rng.uniform(0.05, 0.2, t.size),
+        "debt": scale * rng.uniform(0.05, 0.2, t.size),
+        "tax": revenue * 0.04,
+    }
+    df = pd.DataFrame({name: np.round(values, 2) for name, values in list(data.items())[:max(columns, 2)]})
+    for extra in range(columns - len(BASE_COLUMNS)):
+        df[f"extra_{extra}"] = np.round(rng.normal(0, 1000, t.size), 2)
+
+    if companies > 1:
+        company_ids = np.repeat(np.arange(companies), rows)
+        names = INDUSTRIES[: max(1, min(industries, len(INDUSTRIES)))]
+        df.insert(0, "company_id", [f"C{i:06d}" for i in company_ids])
+        df.insert(1, "industry", np.array(names)[company_ids % len(names)])
+    return df
+
+
+LEDGER_CATEGORIES = {
+    "Sales": 0.25,
+    "Invoice": 0.2,
+    "Customer Payment": 0.18,
+    "Supplier Bill": 0.1,
+    "Vendor Payment": 0.09,
+    "Salaries": 0.06,
+    "Rent": 0.04,
+    "Utilities": 0.04,
+    "Loan EMI": 0.02,
+    "GST": 0.02,
+}
+
+
+def generate_ledger(
+    transactions: int = 100_000,
+    months: int = 24,
+    customers: int = 500,
+    seed: Optional[int] = 0,
+) -> pd.DataFrame:
+    """Raw transaction ledger (date, amount, category, counterparty), signed cash-in positive"""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2024-01-01")
+    dates = start + rng.integers(0, months * 30, transactions).astype("timedelta64[D]")
+    names = list(LEDGER_CATEGORIES)
+    weights = np.array(list(LEDGER_CATEGORIES.values()))
+    category = rng.choice(len(names), transactions, p=weights / weights.sum())
+    amount = np.round(rng.lognormal(9, 1, transactions), 2)
+    outflow = np.isin(category, [names.index(n) for n in ("Supplier Bill", "Vendor Payment", "Salaries", "Rent", "Utilities", "Loan EMI", "GST")])
+    return pd.DataFrame({
+        "date": pd.to_datetime(dates).strftime("%Y-%m-%d"),
+        "amount": np.where(outflow, -amount, amount),
+        "category": pd.Categorical.from_codes(category, names),
+        "counterparty": [f"P{i:05d}" for i in rng.integers(0, customers, transactions)],
+    }).sort_values("date", ignore_index=True)
+
+
+def to_bytes(df: pd.DataFrame, fmt: str) -> bytes:
+    if fmt == "csv":
+        return df.to_csv(index=False).encode()
+    if fmt == "xlsx":
+        buffer = io.BytesIO()
+        df.to_excel(buffer, index=False)
+        return buffer.getvalue()
+    if fmt == "pdf":
+        return _text_pdf(df.to_csv(index=False).splitlines())
+    if fmt == "parquet":
+        return df.to_parquet(index=False)
+    if fmt == "arrow":
+        buffer = io.BytesIO()
+        df.to_feather(buffer)
+        return buffer.getvalue()
+    raise ValueError(f"Unsupported format: {fmt}")
+
+
+def _text_pdf(lines: list[str], lines_per_page: int = 60) -> bytes:
+    """Minimal multi-page PDF with one Helvetica text line per row"""
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page_lines in pages:
+        escaped = [ln.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for ln in page_lines]
+        body = "BT /F1 7 Tf 9 TL 20 780 Td " + " ".join(f"({ln}) '" for ln in escaped) + " ET"
+        objects.append(f"<< /Length {len(body)} >>\nstream\n{body}\nendstream")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(f"{number} 0 obj\n{obj}\nendobj\n".encode("latin-1"))
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for offset in offsets:
+        out.write(f"{offset:010d} 00000 n \n".encode())
+    out.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return out.getvalue()
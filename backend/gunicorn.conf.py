@@ -0,0 +1,49 @@
+"""
+Production serving: gunicorn managing uvicorn workers.
+
+    cd backend
+    gunicorn -c gunicorn.conf.py app.main:app
+
+WEB_CONCURRENCY (default: one per available core), BLAS_THREADS,
+WORKER_MAX_MEMORY_MB and WORKER_MAX_REQUESTS are read from the environment; see
+``app.serving``.
+"""
+
+import os
+
+# Gunicorn workers already give process parallelism; analyze on threads inside each one
+os.environ.setdefault("ANALYSIS_WORKERS", "0")
+
+from app import serving  # noqa: E402
+from app.config import settings  # noqa: E402
+
+workers = serving.worker_count(settings.web_concurrency)
+# Native math threads per worker, so workers x threads stays within the cores
+serving.cap_native_threads(settings.blas_threads or serving.available_cores() // workers)
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(settings.analysis_timeout_seconds) + 30
+graceful_timeout = 30
+keepalive = 5
+max_requests = settings.worker_max_requests
+max_requests_jitter = max_requests // 10
+
+
+def on_starting(server):
+    # Runs in the master after the app is preloaded and before any worker forks
+    serving.preload()
+
+
+def pre_fork(server, worker):
+    # Runs in the master before each fork, including replacements for recycled workers
+    serving.refresh_peers()
+
+
+def post_fork(server, worker):
+    serving.after_fork()
+
+
+def post_worker_init(worker):
+    serving.MemoryWatchdog(settings.worker_max_memory_mb * 2**20).start()
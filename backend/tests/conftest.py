@@ -0,0 +1,52 @@
+"""
+Shared fixtures. Settings are read from the environment at import time, so the
+test configuration (a throwaway SQLite database, thread-pool analysis, no
+background workers) is set before the app is first imported.
+"""
+
+import os
+import tempfile
+
+_DB_DIR = tempfile.mkdtemp(prefix="finhealth-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}",
+    "API_KEY": "test-key",
+    "ANALYSIS_WORKERS": "0",
+    "JOB_WORKERS": "0",
+    "PEER_REFRESH_SECONDS": "0",
+    "WARMUP_ON_STARTUP": "false",
+    "ANOMALY_MODEL_DIR": os.path.join(_DB_DIR, "models"),
+    "JOB_DIR": os.path.join(_DB_DIR, "jobs"),
+})
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+API_HEADERS = {"x-api-key": "test-key"}
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app.db import init_db
+    from app.main import app
+
+    init_db()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    from app.admission import admission_control
+    from app.cache import result_cache
+
+    result_cache.clear()
+    admission_control._buckets.clear()
+    with TestClient(app, headers=API_HEADERS) as client:
+        yield client
+
+
+@pytest.fixture
+def financials():
+    from benchmarks.synthetic import generate_financials
+
+    return generate_financials(rows=24, seed=1)
@@ -0,0 +1,199 @@
+import asyncio
+import types
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app import admission, main
+from app.admission import FILE, JSON, PDF, AdmissionController, SingleFlight, admission_control, request_kind
+from benchmarks.synthetic import to_bytes
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(admission, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def _controller(**options) -> AdmissionController:
+    defaults = {"enabled": True, "rate": 1.0, "burst": 5.0, "costs": {JSON: 1.0, PDF: 4.0},
+                "concurrency": {JSON: 2, PDF: 1}}
+    return AdmissionController(**{**defaults, **options})
+
+
+def _status(fn, *args) -> int:
+    try:
+        fn(*args)
+    except HTTPException as error:
+        return error.status_code
+    return 200
+
+
+@pytest.mark.parametrize("file_type, kind", [("pdf", PDF), ("json", JSON), ("npz", JSON), ("csv", FILE), ("xlsx", FILE)])
+def test_request_kinds(file_type, kind):
+    assert request_kind(file_type) == kind
+
+
+def test_token_bucket_spends_by_kind_and_refills_over_time(clock):
+    control = _controller()
+    control.charge("k", PDF)
+    control.check("k", JSON)  # checking spends nothing
+    control.charge("k", JSON)
+    with pytest.raises(HTTPException) as error:
+        control.check("k", PDF)
+    assert error.value.status_code == 429 and error.value.headers["Retry-After"] == "4"
+    assert _status(control.charge, "other", PDF) == 200  # buckets are per key
+
+    clock[0] += 4.0
+    control.charge("k", PDF)
+    clock[0] += 100.0
+    assert control._refill("k", clock[0])[0] == 5.0  # capped at the burst
+    assert control.stats()["admitted"] == 4 and control.stats()["rate_limited"] == 1
+
+
+def test_costs_above_the_burst_are_capped(clock):
+    control = _controller(costs={PDF: 50.0})
+    control.charge("k", PDF)
+    assert _status(control.check, "k", PDF) == 429
+
+
+def test_concurrency_slots_are_per_key_and_kind():
+    control = _controller()
+    with control.slot("k", PDF):
+        assert _status(control.check, "k", PDF) == 429
+        with control.slot("k", JSON), control.slot("k", JSON):
+            assert control.stats()["running"] == 3
+            assert _status(control._acquire, "k", JSON) == 429
+        with control.slot("other", PDF):
+            pass
+    assert control.stats()["running"] == 0 and control.stats()["concurrency_limited"] == 2
+    with control.slot("k", PDF):
+        pass
+
+
+def test_disabled_admission_admits_everything():
+    control = _controller(enabled=False, burst=0.0, concurrency={PDF: 1})
+    with control.slot("k", PDF), control.slot("k", PDF):
+        control.check("k", PDF)
+        control.charge("k", PDF)
+    assert control.stats()["keys"] == 0
+
+
+def test_idle_buckets_are_pruned(clock, monkeypatch):
+    monkeypatch.setattr(admission, "MAX_TRACKED_KEYS", 2)
+    control = _controller()
+    control.charge("a", PDF)
+    control.charge("b", JSON)
+    clock[0] += 2.0  # "b" has refilled, "a" has not
+    control.charge("c", JSON)
+    assert set(control._buckets) == {"a", "c"}
+
+
+def test_single_flight_shares_one_computation():
+    flight = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"value": len(calls)}
+
+    async def run():
+        return await asyncio.gather(*(flight.run("key", compute) for _ in range(4)), flight.run("other", compute))
+
+    results = asyncio.run(run())
+    assert len(calls) == 2 and results[:4] == [results[0]] * 4
+    assert flight.stats() == {"in_flight": 0, "coalesced": 3}
+
+
+def test_single_flight_leader_failures():
+    flight = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.05)
+        raise ValueError("boom")
+
+    def refuse():
+        raise HTTPException(status_code=429)
+
+    async def run():
+        refused = await asyncio.gather(flight.run("key", compute, on_lead=refuse), return_exceptions=True)
+        shared = await asyncio.gather(*(flight.run("key", compute) for _ in range(2)), return_exceptions=True)
+        return refused + shared
+
+    refused, *shared = asyncio.run(run())
+    assert isinstance(refused, HTTPException)
+    assert [type(error) for error in shared] == [ValueError, ValueError]
+
+
+def test_follower_takes_over_when_the_leader_is_cancelled():
+    flight = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return len(calls)
+
+    async def run():
+        leader = asyncio.ensure_future(flight.run("key", compute))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.run("key", compute))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(run()) == 2
+
+
+def test_callers_over_their_limit_are_refused_before_upload(client, financials, monkeypatch):
+    monkeypatch.setattr(admission_control, "rate", 0.0)
+    monkeypatch.setattr(admission_control, "burst", 8.0)
+    monkeypatch.setattr(admission_control, "costs", {**admission_control.costs, FILE: 4.0})
+    spooled = []
+    original = main.spooled_upload
+
+    def counting(file):
+        spooled.append(file.filename)
+        return original(file)
+
+    monkeypatch.setattr(main, "spooled_upload", counting)
+
+    def post(frame):
+        files = {"file": ("f.csv", to_bytes(frame, "csv"))}
+        return client.post("/analyze", params={"industry": "Retail"}, files=files)
+
+    assert post(financials).status_code == 200
+    assert post(financials).status_code == 200  # a cache hit costs nothing
+    assert post(financials.head(12)).status_code == 200
+    refused = post(financials)
+    assert refused.status_code == 429 and "Retry-After" in refused.headers
+    assert len(spooled) == 3
+
+
+def test_identical_concurrent_requests_are_coalesced(client, financials, monkeypatch):
+    calls = []
+    run = main.analysis_executor.run
+
+    async def slow_run(*args, **kwargs):
+        calls.append(args[0])
+        await asyncio.sleep(0.2)
+        return await run(*args, **kwargs)
+
+    monkeypatch.setattr(main.analysis_executor, "run", slow_run)
+    body = {"records": financials.to_dict(orient="records"), "industry": "Retail"}
+    coalesced = main.request_coalescer.stats()["coalesced"]
+
+    async def burst():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", headers=dict(client.headers)) as http:
+            return await asyncio.gather(*(http.post("/analyze-json", json=body) for _ in range(3)))
+
+    responses = asyncio.run(burst())
+    assert [r.status_code for r in responses] == [200] * 3
+    assert responses[1].json() == responses[0].json() == responses[2].json()
+    assert len(calls) == 1
+    assert main.request_coalescer.stats()["coalesced"] == coalesced + 2
+    assert admission_control.stats()["running"] == 0
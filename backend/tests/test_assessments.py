@@ -0,0 +1,85 @@
+import math
+import uuid
+
+import pytest
+from sqlalchemy import inspect, text
+
+from app.db import SessionLocal, engine, init_db
+from app.models import Assessment
+from app.persistence import AssessmentWriter
+
+
+@pytest.fixture
+def writer(app):
+    return AssessmentWriter(batch_size=50, flush_interval=0.05, max_queue=100)
+
+
+def _industry() -> str:
+    return f"test-{uuid.uuid4().hex[:8]}"
+
+
+def _analysis(industry: str, risk_score: float, **extra) -> dict:
+    return {"industry": industry, "revenue": 100.0, "expenses": 90.0, "net_margin": 0.1,
+            "risk_score": risk_score, "creditworthiness": "Good", **extra}
+
+
+def _stored(industry: str) -> list[Assessment]:
+    with SessionLocal() as session:
+        return session.query(Assessment).filter(Assessment.industry == industry).order_by(Assessment.id).all()
+
+
+def test_writer_stores_non_finite_values_as_null(writer):
+    industry = _industry()
+    writer.submit(_analysis(industry, 40.0, net_margin=math.nan, dscr=math.inf, forecast=[1.0, math.nan]))
+    writer._write(writer._next_batch())
+
+    [row] = _stored(industry)
+    assert row.net_margin is None
+    assert row.details["dscr"] is None
+    assert row.details["forecast"] == [1.0, None]
+    assert writer.stats()["written"] == 1
+
+
+def test_failed_batch_is_retried_row_by_row(writer):
+    industry = _industry()
+    writer.submit_many([_analysis(industry, 10.0), _analysis(None, 20.0), _analysis(industry, 30.0)])
+    writer._write(writer._next_batch())
+
+    assert [row.risk_score for row in _stored(industry)] == [10.0, 30.0]
+    assert writer.stats() == {"queued": 0, "written": 2, "dropped": 0, "failed": 1}
+
+
+def test_full_queue_drops_instead_of_blocking(app):
+    writer = AssessmentWriter(batch_size=10, flush_interval=0.05, max_queue=2)
+    writer.submit_many([_analysis("x", 1.0)] * 3)
+    assert writer.stats()["queued"] == 2 and writer.stats()["dropped"] == 1
+
+
+def test_history_pages_by_keyset_and_filters(client, writer):
+    industry = _industry()
+    writer.submit_many([_analysis(industry, float(score)) for score in range(7)])
+    writer._write(writer._next_batch())
+
+    ids, cursor = [], None
+    while True:
+        params = {"industry": industry, "limit": 3, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/assessments", params=params).json()
+        ids += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert ids == sorted(ids, reverse=True)
+    assert ids == [row.id for row in reversed(_stored(industry))]
+
+    filtered = client.get("/assessments", params={"industry": industry, "min_risk_score": 2, "max_risk_score": 4})
+    assert sorted(item["risk_score"] for item in filtered.json()["items"]) == [2.0, 3.0, 4.0]
+    assert filtered.json()["next_cursor"] is None
+
+
+def test_init_db_adds_indexes_missing_from_an_existing_table(app):
+    with engine.begin() as connection:
+        connection.execute(text("DROP INDEX ix_assessments_risk_score_id"))
+    assert "ix_assessments_risk_score_id" not in {index["name"] for index in inspect(engine).get_indexes("assessments")}
+
+    init_db()
+    assert "ix_assessments_risk_score_id" in {index["name"] for index in inspect(engine).get_indexes("assessments")}
@@ -0,0 +1,70 @@
+import io
+import sys
+
+import pyarrow as pa
+import pytest
+
+from app.config import settings
+from benchmarks.synthetic import to_bytes
+
+HEADLINE = ["revenue", "expenses", "net_margin", "net_cashflow", "current_ratio", "dso_days", "dscr", "risk_score",
+            "default_probability"]
+
+
+def _analyze(client, filename: str, payload: bytes) -> dict:
+    response = client.post("/analyze", params={"industry": "Retail"}, files={"file": (filename, payload)})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _arrow_stream(df) -> bytes:
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=5):
+            writer.write_batch(batch)
+    return sink.getvalue()
+
+
+@pytest.fixture
+def expected(client, financials):
+    return _analyze(client, "q.csv", to_bytes(financials, "csv"))
+
+
+def _assert_same_analysis(result: dict, expected: dict) -> None:
+    for metric in HEADLINE:
+        assert result[metric] == pytest.approx(expected[metric], rel=1e-6), metric
+    assert result["creditworthiness"] == expected["creditworthiness"]
+    assert result["anomalies"] == expected["anomalies"]
+    assert result["forecast"]["revenue"] == pytest.approx(expected["forecast"]["revenue"], rel=1e-6)
+
+
+@pytest.mark.parametrize("fmt", ["xlsx", "pdf", "parquet", "arrow"])
+def test_every_format_matches_csv(client, financials, expected, fmt):
+    _assert_same_analysis(_analyze(client, f"q.{fmt}", to_bytes(financials, fmt)), expected)
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_spooled_uploads_are_memory_mapped_with_the_same_result(client, financials, expected, fmt, monkeypatch):
+    monkeypatch.setattr(settings, "stream_spool_threshold_bytes", 1)
+    _assert_same_analysis(_analyze(client, f"q.{fmt}", to_bytes(financials, fmt)), expected)
+
+
+def test_arrow_ipc_streams_and_extra_columns_are_accepted(client, financials, expected):
+    frame = financials.assign(notes="n/a", region=3)
+    _assert_same_analysis(_analyze(client, "q.arrows", _arrow_stream(frame)), expected)
+
+
+def test_binary_formats_without_pyarrow_are_unsupported_media(client, financials, monkeypatch):
+    payloads = {fmt: to_bytes(financials, fmt) for fmt in ("parquet", "arrow")}
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    monkeypatch.setitem(sys.modules, "pyarrow.parquet", None)
+    for fmt, payload in payloads.items():
+        response = client.post("/analyze", files={"file": (f"q.{fmt}", payload)})
+        assert response.status_code == 415, fmt
+        assert "pyarrow" in response.json()["detail"]
+
+
+def test_corrupt_parquet_is_a_bad_request(client):
+    response = client.post("/analyze", files={"file": ("q.parquet", b"PAR1 not really parquet")})
+    assert response.status_code == 400
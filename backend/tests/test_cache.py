@@ -0,0 +1,78 @@
+import math
+import time
+
+import app.cache as cache_module
+from app.cache import ResultCache, records_cache_key, result_cache, upload_cache_key
+
+RECORDS = [{"Revenue": 100.0, "Expenses": 80.0}, {"Revenue": 110.0, "Expenses": 85.0}]
+
+
+def test_records_key_is_stable_under_column_order_and_name_case():
+    reordered = [{" expenses ": row["Expenses"], "REVENUE": row["Revenue"]} for row in RECORDS]
+    assert records_cache_key(RECORDS, "Retail") == records_cache_key(reordered, "Retail")
+
+
+def test_records_key_changes_with_values_industry_and_alias_spelling():
+    key = records_cache_key(RECORDS, "Retail")
+    changed = [dict(RECORDS[0], Revenue=101.0), RECORDS[1]]
+    aliased = [{"sales": row["Revenue"], "expenses": row["Expenses"]} for row in RECORDS]
+    assert records_cache_key(changed, "Retail") != key
+    assert records_cache_key(RECORDS, "Technology") != key
+    assert records_cache_key(aliased, "Retail") != key
+
+
+def test_upload_key_includes_the_file_type():
+    assert upload_cache_key("abc", "a.csv", "Retail") == upload_cache_key("abc", "B.CSV", "Retail")
+    assert upload_cache_key("abc", "a.csv", "Retail") != upload_cache_key("abc", "a.xlsx", "Retail")
+
+
+def test_lru_evicts_by_entry_count_and_expires_by_ttl():
+    cache = ResultCache(max_entries=2, max_bytes=10_000, ttl_seconds=0.2)
+    cache.put("a", {"v": 1})
+    cache.put("b", {"v": 2})
+    assert cache.get("a") == {"v": 1}
+    cache.put("c", {"v": 3})
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+
+    time.sleep(0.25)
+    assert cache.get("a") is None and cache.get("c") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_entries_larger_than_the_byte_budget_are_not_stored():
+    cache = ResultCache(max_entries=10, max_bytes=50, ttl_seconds=60)
+    cache.put("big", {"v": "x" * 100})
+    assert cache.get("big") is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_shared_tier_serves_other_workers_and_stores_nan_as_null(app):
+    writer = ResultCache(max_entries=10, max_bytes=10_000, ttl_seconds=60, shared=True)
+    reader = ResultCache(max_entries=10, max_bytes=10_000, ttl_seconds=60, shared=True)
+    writer.put("shared-key", {"dscr": math.nan, "revenue": 1.0})
+
+    assert reader.get("shared-key") == {"dscr": None, "revenue": 1.0}
+    assert reader.stats()["shared_hits"] == 1
+
+
+def test_shared_tier_errors_count_as_a_miss(app, monkeypatch):
+    def broken_session():
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(cache_module, "SessionLocal", broken_session)
+    cache = ResultCache(max_entries=10, max_bytes=10_000, ttl_seconds=60, shared=True)
+    cache.put("k", {"v": 1})
+    assert cache.get("k") == {"v": 1}
+    assert cache.get("missing") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_repeated_request_is_served_from_the_cache(client, financials):
+    body = {"records": financials.to_dict(orient="records"), "industry": "Retail"}
+    first = client.post("/analyze-json", json=body)
+    hits = result_cache.stats()["hits"]
+    second = client.post("/analyze-json", json=body)
+    assert first.status_code == second.status_code == 200
+    assert second.json() == first.json()
+    assert result_cache.stats()["hits"] == hits + 1
@@ -0,0 +1,71 @@
+import io
+import json
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+from app.columnar import body_format, decode_columns
+
+
+def _npz(columns: dict) -> bytes:
+    buffer = io.BytesIO()
+    np.savez(buffer, **columns)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def expected(client, financials):
+    body = {"records": financials.to_dict(orient="records"), "industry": "Retail"}
+    response = client.post("/analyze-json", json=body)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_json_columns_match_analyze_json(client, financials, expected):
+    body = {"industry": "Retail", "columns": financials.to_dict(orient="list")}
+    response = client.post("/analyze-columnar", content=json.dumps(body), headers={"content-type": "application/json"})
+    assert response.status_code == 200
+    assert response.json() == expected
+
+
+def test_npz_body_matches_analyze_json(client, financials, expected):
+    columns = {name: financials[name].to_numpy() for name in financials.columns}
+    response = client.post(
+        "/analyze-columnar", params={"industry": "Retail"}, content=_npz(columns),
+        headers={"content-type": "application/x-npz"},
+    )
+    assert response.status_code == 200
+    assert response.json() == expected
+
+
+def test_decoding_keeps_label_columns_and_rejects_ragged_bodies():
+    columns, industry = decode_columns(
+        json.dumps({"industry": "Retail", "columns": {"period": ["Jan", "Feb"], "revenue": [1, 2.5]}}).encode(),
+        "json",
+    )
+    assert industry == "Retail"
+    assert columns["revenue"].dtype == np.float64 and columns["period"].dtype == object
+
+    for body in (b'{"columns": {"revenue": [1, 2], "expenses": [1]}}', b'{"columns": {"revenue": [[1, 2]]}}',
+                 b'{"records": []}', b"not json"):
+        with pytest.raises(HTTPException) as error:
+            decode_columns(body, "json")
+        assert error.value.status_code == 400, body
+
+
+def test_npz_archives_with_pickled_objects_are_refused():
+    buffer = io.BytesIO()
+    np.savez(buffer, revenue=np.array([{"a": 1}], dtype=object))
+    with pytest.raises(HTTPException) as error:
+        decode_columns(buffer.getvalue(), "npz")
+    assert error.value.status_code == 400
+
+
+def test_content_type_selects_the_decoder():
+    assert body_format(None) == "json"
+    assert body_format("application/json; charset=utf-8") == "json"
+    assert body_format("application/octet-stream") == "npz"
+    with pytest.raises(HTTPException) as error:
+        body_format("text/csv")
+    assert error.value.status_code == 415
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import db
+from app.config import settings
+from app.models import Assessment
+
+
+def test_async_urls_swap_in_the_async_driver():
+    assert db.async_database_url("postgresql://u:p@h/d") == "postgresql+asyncpg://u:p@h/d"
+    assert db.async_database_url("sqlite:////tmp/x.db") == "sqlite+aiosqlite:////tmp/x.db"
+    with pytest.raises(RuntimeError, match="ASYNC_DATABASE_URL"):
+        db.async_database_url("mysql://h/d")
+
+
+def test_pool_options_follow_the_pool_mode(monkeypatch):
+    assert db._pool_options("sqlite://", db.TimedQueuePool) == {}
+    monkeypatch.setattr(settings, "db_pool_size", 3)
+    options = db._pool_options("postgresql://h/d", db.TimedQueuePool)
+    assert options["poolclass"] is db.TimedQueuePool and options["pool_size"] == 3
+    monkeypatch.setattr(settings, "db_pool_mode", "null")
+    assert db._pool_options("postgresql://h/d", db.TimedQueuePool) == {"poolclass": db.TimedNullPool}
+
+
+def test_checkouts_and_pool_timeouts_are_counted(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", poolclass=db.TimedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.1
+    )
+    before = db.pool_stats.snapshot()
+    held = engine.connect()
+    with pytest.raises(PoolTimeout):
+        engine.connect()
+
+    release = threading.Timer(0.05, held.close)
+    release.start()
+    with engine.connect() as connection:  # waits for the held connection
+        assert connection.execute(text("select 1")).scalar() == 1
+    release.join()
+    engine.dispose()
+
+    after = db.pool_stats.snapshot()
+    assert after["checkouts"] == before["checkouts"] + 2
+    assert after["timeouts"] == before["timeouts"] + 1
+    assert after["wait_ms_max"] >= 40.0
+
+
+def test_sessions_open_only_when_used(app, monkeypatch):
+    opened = []
+    factory = db.SessionLocal
+
+    def session_local():
+        opened.append(factory())
+        return opened[-1]
+
+    monkeypatch.setattr(db, "SessionLocal", session_local)
+    dependency = db.get_db()
+    next(dependency)
+    dependency.close()
+    assert opened == []
+
+    dependency = db.get_db()
+    session = next(dependency)
+    assert session.execute(select(1)).scalar() == 1
+    assert len(opened) == 1
+    dependency.close()
+    assert session._session is None
+
+
+def test_run_db_uses_a_threadpool_session_by_default(app):
+    def query(session, n):
+        assert threading.current_thread() is not threading.main_thread()
+        return session.execute(select(n)).scalar()
+
+    assert db.AsyncSessionLocal is None
+    assert asyncio.run(db.run_db(query, 7)) == 7
+
+
+def test_run_db_runs_on_the_async_engine_when_configured(app, monkeypatch):
+    engine = create_async_engine(db.async_database_url(settings.database_url))
+    monkeypatch.setattr(db, "AsyncSessionLocal", async_sessionmaker(engine, expire_on_commit=False))
+    on_threads = []
+
+    def count(session):
+        on_threads.append(threading.current_thread())
+        return session.query(Assessment).count()
+
+    async def run():
+        try:
+            return await db.run_db(count)
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(run()) >= 0
+    assert on_threads == [threading.main_thread()]  # on the event loop, not a threadpool thread
+
+
+def test_pool_status_is_reported_on_health(client):
+    database = client.get("/health").json()["database"]
+    assert database["mode"] == settings.db_pool_mode
+    assert {"checkouts", "timeouts", "wait_ms_avg", "wait_ms_max"} <= database.keys()
+    assert database["sync"]["checked_out"] == 0
+    assert "finhealth_db_pool_checkouts_total" in client.get("/metrics").text
@@ -0,0 +1,95 @@
+import asyncio
+import os
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.executor import AnalysisExecutor
+
+
+def _square(value):
+    return value * value
+
+
+def _reject(status_code):
+    raise HTTPException(status_code=status_code, detail="bad input")
+
+
+def _crash():
+    os._exit(1)
+
+
+def _hang():
+    time.sleep(600)
+
+
+def _pid():
+    return os.getpid()
+
+
+@pytest.fixture
+def executor():
+    executor = AnalysisExecutor(workers=1, queue_depth=1, timeout=2.0, retry_after=3)
+    yield executor
+    executor.shutdown()
+
+
+def test_runs_jobs_in_a_worker_process(executor):
+    assert asyncio.run(executor.run(_square, 7)) == 49
+    assert asyncio.run(executor.run(_pid)) != os.getpid()
+    assert executor.stats()["in_flight"] == 0
+
+
+def test_worker_http_errors_keep_their_status(executor):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(executor.run(_reject, 422))
+    assert error.value.status_code == 422
+    assert error.value.detail == "bad input"
+
+
+def test_rejects_beyond_capacity_with_retry_after():
+    executor = AnalysisExecutor(workers=0, queue_depth=0, timeout=5.0, retry_after=3)
+
+    async def scenario():
+        slow = asyncio.ensure_future(executor.run(time.sleep, 0.3))
+        await asyncio.sleep(0.05)
+        with pytest.raises(HTTPException) as error:
+            await executor.run(_square, 2)
+        await slow
+        return error.value
+
+    error = asyncio.run(scenario())
+    executor.shutdown()
+    assert error.status_code == 503
+    assert error.headers["Retry-After"] == "3"
+    assert executor.stats()["rejected"] == 1
+
+
+def test_crashed_worker_returns_503_and_the_pool_recovers(executor):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(executor.run(_crash))
+    assert error.value.status_code == 503
+    assert asyncio.run(executor.run(_square, 3)) == 9
+    assert executor.stats()["recycled"] >= 1
+    assert executor.stats()["in_flight"] == 0
+
+
+def test_hung_job_times_out_and_its_worker_is_terminated(executor):
+    hung_pid = asyncio.run(executor.run(_pid))
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(executor.run(_hang))
+    assert error.value.status_code == 504
+    stats = executor.stats()
+    assert stats["timed_out"] == 1 and stats["recycled"] == 1 and stats["in_flight"] == 0
+
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        try:
+            os.kill(hung_pid, 0)
+        except ProcessLookupError:
+            break
+        time.sleep(0.05)
+    else:
+        pytest.fail("the hung worker process is still running")
+    assert asyncio.run(executor.run(_square, 4)) == 16
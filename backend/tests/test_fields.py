@@ -0,0 +1,61 @@
+import pytest
+from fastapi import HTTPException
+
+from app.analysis import analyze_dataframe
+from app.cache import result_cache
+from app.fields import STAGE_FIELDS, parse_fields, select_fields, skipped_stages
+from app.schemas import AnalysisResponse
+
+
+def test_parse_fields_validates_against_the_response_model():
+    assert parse_fields(None, AnalysisResponse) is None
+    assert parse_fields(" ", AnalysisResponse) is None
+    assert parse_fields("risk_score, creditworthiness,", AnalysisResponse) == {"risk_score", "creditworthiness"}
+    with pytest.raises(HTTPException) as error:
+        parse_fields("risk_score,secret", AnalysisResponse)
+    assert error.value.status_code == 400 and "secret" in error.value.detail
+
+
+@pytest.mark.parametrize("fields, skipped", [
+    (None, set()),
+    ({"risk_score"}, set(STAGE_FIELDS)),
+    ({"forecast", "revenue"}, set(STAGE_FIELDS) - {"forecast"}),
+    ({"simulation"}, set(STAGE_FIELDS) - {"scenarios"}),
+    ({"recommendations"}, set()),
+])
+def test_stages_are_skipped_only_when_nothing_needs_them(fields, skipped):
+    assert skipped_stages(None if fields is None else frozenset(fields)) == skipped
+
+
+def test_skipped_stages_leave_the_other_fields_unchanged(financials):
+    full = analyze_dataframe(financials, "Retail")
+    partial = analyze_dataframe(financials, "Retail", skip=skipped_stages(frozenset({"risk_score", "forecast"})))
+    assert "anomalies" not in partial and "simulation" not in partial
+    assert partial["forecast"] == full["forecast"]
+    assert select_fields(partial, frozenset({"risk_score"})) == {"risk_score": full["risk_score"]}
+
+
+def test_selected_fields_are_served_from_a_cached_full_result(client, financials):
+    body = {"records": financials.to_dict(orient="records"), "industry": "Retail"}
+    full = client.post("/analyze-json", json=body).json()
+    hits = result_cache.stats()["hits"]
+
+    response = client.post("/analyze-json", params={"fields": "risk_score,creditworthiness"}, json=body)
+    assert response.json() == {"risk_score": full["risk_score"], "creditworthiness": full["creditworthiness"]}
+    assert result_cache.stats()["hits"] == hits + 1
+    assert client.post("/analyze-json", params={"fields": "nope"}, json=body).status_code == 400
+
+
+def test_partial_results_are_cached_apart_from_full_ones(client, financials):
+    body = {"records": financials.to_dict(orient="records"), "industry": "Retail"}
+    partial = client.post("/analyze-json", params={"fields": "risk_score"}, json=body).json()
+    full = client.post("/analyze-json", json=body).json()
+    assert "forecast" in full and full["risk_score"] == partial["risk_score"]
+
+
+def test_large_responses_are_gzipped_on_request(client, financials):
+    body = {"records": financials.to_dict(orient="records"), "industry": "Retail"}
+    response = client.post("/analyze-json", json=body, headers={"accept-encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    small = client.post("/analyze-json", params={"fields": "risk_score"}, json=body, headers={"accept-encoding": "gzip"})
+    assert "content-encoding" not in small.headers
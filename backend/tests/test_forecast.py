@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.ml_analytics import FinancialPredictor, TrendForecaster
+
+
+def test_forecast_continues_after_the_last_observed_period():
+    t = np.arange(10)
+    predictor = FinancialPredictor()
+    predictor.fit(pd.DataFrame({"revenue": 100 + 10 * t, "expenses": 80 + 5 * t}))
+    forecast = predictor.forecast(3)
+
+    assert forecast["revenue"] == pytest.approx([200, 210, 220])
+    assert forecast["expenses"] == pytest.approx([130, 135, 140])
+    assert forecast["net_margin"] == pytest.approx([70 / 200, 75 / 210, 80 / 220])
+    assert forecast["revenue_lower"] == pytest.approx(forecast["revenue"])
+    assert "cash_in" not in forecast
+
+
+def test_stacked_series_match_per_series_least_squares():
+    rng = np.random.default_rng(0)
+    series = rng.normal(100, 10, (5, 30)).cumsum(axis=1)
+    engine = TrendForecaster().fit(series)
+    mean = engine.forecast(4)["mean"]
+
+    future = np.arange(30, 34)
+    for row, predicted in zip(series, mean):
+        slope, intercept = np.polyfit(np.arange(30), row, 1)
+        assert predicted == pytest.approx(intercept + slope * future)
+
+
+def test_prediction_intervals_bracket_the_mean_and_widen():
+    rng = np.random.default_rng(1)
+    engine = TrendForecaster(confidence=0.9).fit(np.arange(24) * 3.0 + rng.normal(0, 5, 24))
+    result = engine.forecast(6)
+    width = (result["upper"] - result["lower"])[0]
+    assert np.all(result["lower"] < result["mean"]) and np.all(result["mean"] < result["upper"])
+    assert np.all(np.diff(width) > 0)
+
+
+def test_seasonal_pattern_is_recovered():
+    pattern = np.array([0.0, 20.0, -10.0, 5.0])
+    t = np.arange(16)
+    engine = TrendForecaster(season_length=4).fit(50 + 2 * t + pattern[t % 4])
+    assert engine.forecast(4)["mean"][0] == pytest.approx(50 + 2 * np.arange(16, 20) + pattern)
+    assert engine.sigma[0] == pytest.approx(0, abs=1e-9)
+
+
+def test_short_history_falls_back_to_a_plain_trend():
+    engine = TrendForecaster(season_length=12).fit(np.arange(10) * 1.0)
+    assert not engine._use_seasonal
+    assert engine.forecast(2)["mean"][0] == pytest.approx([10.0, 11.0])
+
+
+@pytest.mark.parametrize("season_length", [0, 4])
+def test_moments_of_blocks_fit_like_the_whole_history(season_length):
+    rng = np.random.default_rng(2)
+    series = rng.normal(100, 10, (2, 20))
+    engine = TrendForecaster(season_length=season_length)
+    blocks = [engine.moments(series[:, :7]), engine.moments(series[:, 7:], start=7)]
+    xtx, xty, yty = (sum(parts) for parts in zip(*blocks))
+
+    from_moments = TrendForecaster(season_length=season_length).fit_moments(20, xtx, xty, yty).forecast(3)
+    direct = TrendForecaster(season_length=season_length).fit(series).forecast(3)
+    for bound in ("mean", "lower", "upper"):
+        assert from_moments[bound] == pytest.approx(direct[bound])
+
+
+def test_single_period_gives_an_empty_forecast():
+    predictor = FinancialPredictor()
+    predictor.fit(pd.DataFrame({"revenue": [100.0], "expenses": [90.0]}))
+    assert predictor.forecast(3) == {"revenue": [], "expenses": [], "net_margin": []}
@@ -0,0 +1,109 @@
+import json
+import math
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from app import company_state
+from app.analysis import analyze_dataframe
+from app.config import settings
+from app.db import SessionLocal
+from app.incremental import append_periods
+from benchmarks.synthetic import generate_financials
+
+
+def _assert_close(actual, expected, path="analysis"):
+    if isinstance(expected, dict):
+        assert set(actual) == set(expected), path
+        for key in expected:
+            _assert_close(actual[key], expected[key], f"{path}.{key}")
+    elif isinstance(expected, list):
+        assert len(actual) == len(expected), path
+        for index, (a, e) in enumerate(zip(actual, expected)):
+            _assert_close(a, e, f"{path}[{index}]")
+    elif isinstance(expected, float) and not isinstance(actual, str):
+        assert actual == pytest.approx(expected, rel=1e-6, abs=1e-9, nan_ok=True), path
+    else:
+        assert actual == expected, path
+
+
+def _append_in_batches(df, sizes, industry="Retail"):
+    state, start = None, 0
+    for size in sizes:
+        state, analysis = append_periods(state, df.iloc[start:start + size].reset_index(drop=True), industry)
+        state = json.loads(json.dumps(state))  # stored as JSON between appends
+        start += size
+    assert start == len(df)
+    return state, analysis
+
+
+@pytest.mark.parametrize("season_length", [0, 4])
+def test_batched_appends_match_a_full_recompute(financials, monkeypatch, season_length):
+    monkeypatch.setattr(settings, "forecast_season_length", season_length)
+    state, incremental = _append_in_batches(financials, [5, 1, 7, 11])
+    assert state["periods"] == len(financials)
+    _assert_close(incremental, analyze_dataframe(financials, "Retail"))
+
+
+def test_anomalies_cover_the_trailing_window_numbered_in_the_whole_history(monkeypatch):
+    monkeypatch.setattr(settings, "incremental_window_periods", 30)
+    df = generate_financials(rows=80, seed=4)
+    df.loc[70, "revenue"] *= 40
+    state, analysis = _append_in_batches(df, [40, 25, 15])
+
+    assert state["window_length"] == 30 and len(state["window"]["revenue"]) == 30
+    assert any("period 71" in message for message in analysis["anomalies"])
+    full = analyze_dataframe(df, "Retail")
+    for metric in ("revenue", "net_margin", "dscr", "risk_score", "default_probability"):
+        assert analysis[metric] == pytest.approx(full[metric], rel=1e-9), metric
+
+
+def test_gaps_in_optional_columns_match_a_full_recompute():
+    df = generate_financials(rows=12, seed=2)
+    df.loc[3:5, "ar"] = math.nan
+    df.loc[0:2, "debt"] = math.nan
+    _, incremental = _append_in_batches(df, [4, 8])
+    _assert_close(incremental, analyze_dataframe(df, "Retail"))
+
+
+def test_first_append_needs_periods_and_state_version_is_checked(financials):
+    with pytest.raises(HTTPException) as error:
+        append_periods(None, financials.iloc[:0], "Retail")
+    assert error.value.status_code == 400
+
+    state, _ = append_periods(None, financials, "Retail")
+    with pytest.raises(HTTPException) as error:
+        append_periods({**state, "version": 0}, financials, "Retail")
+    assert error.value.status_code == 409
+
+
+def test_stale_state_writes_conflict(app, financials):
+    company_id = uuid.uuid4().hex
+    state, analysis = append_periods(None, financials.iloc[:5], "Retail")
+    with SessionLocal() as db:
+        company_state.save(db, company_id, "Retail", None, state, analysis)
+        with pytest.raises(HTTPException) as error:
+            company_state.save(db, company_id, "Retail", None, state, analysis)
+        assert error.value.status_code == 409
+
+        newer, analysis = append_periods(json.loads(json.dumps(state)), financials.iloc[5:10], "Retail")
+        company_state.save(db, company_id, "Retail", 5, newer, analysis)
+        with pytest.raises(HTTPException) as error:
+            company_state.save(db, company_id, "Retail", 5, newer, analysis)
+        assert error.value.status_code == 409
+
+
+def test_company_endpoints(client, financials):
+    url = f"/companies/{uuid.uuid4().hex}"
+    for start in (0, 10):
+        records = financials.iloc[start:start + 10].to_dict(orient="records")
+        response = client.post(f"{url}/periods", json={"records": records, "industry": "Retail"})
+        assert response.status_code == 200
+    assert response.json()["periods"] == 20
+
+    stored = client.get(f"{url}/analysis").json()
+    assert stored["periods"] == 20 and stored["risk_score"] == response.json()["risk_score"]
+    assert client.delete(url).status_code == 204
+    assert client.get(f"{url}/analysis").status_code == 404
+    assert client.delete(url).status_code == 404
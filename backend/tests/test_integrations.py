@@ -0,0 +1,144 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+import httpx
+import pytest
+
+from app.cache import result_cache
+from app.integrations import CircuitBreaker, IntegrationError, IntegrationHub, Provider, integration_hub, merge_cash_flows
+from benchmarks import bank_stub
+
+
+def _stub_client() -> httpx.AsyncClient:
+    """A client that serves requests from the bank stub in-process"""
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=bank_stub.app))
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    monkeypatch.setattr(bank_stub.app.state, "failure_rate", 0.0)
+    return bank_stub.app.state
+
+
+@pytest.fixture
+def hub(stub):
+    hub = IntegrationHub(
+        providers=[Provider("bank_a", "http://stub/bank-a", 1.0), Provider("bank_b", "http://stub/bank-b", 1.0)],
+        max_connections=4,
+        cache_ttl=60,
+        breaker_failures=2,
+        breaker_reset=0.1,
+    )
+    hub._client = _stub_client()
+    return hub
+
+
+def test_breaker_opens_after_consecutive_failures_and_half_opens_for_one_trial():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.05)
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    assert breaker.allow() and not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_cashflow_sums_providers_per_period(hub):
+    cash = asyncio.run(hub.cashflow("acme", 6))
+    assert cash["providers"] == {"bank_a": "ok", "bank_b": "ok"}
+    assert len(cash["periods"]) == 6
+    assert [p["period"] for p in cash["periods"]] == sorted(p["period"] for p in cash["periods"])
+
+    a = asyncio.run(hub.fetch("bank_a", "/accounts/acme/cashflow", {"periods": 6}))["periods"]
+    b = asyncio.run(hub.fetch("bank_b", "/accounts/acme/cashflow", {"periods": 6}))["periods"]
+    assert cash["periods"][0]["cash_in"] == pytest.approx(a[0]["inflows"] + b[0]["inflows"])
+    assert hub.stats()["cache_hits"] == 2 and hub.stats()["requests"] == 2
+
+
+def test_failing_provider_opens_its_breaker_without_failing_the_fan_out(hub, stub):
+    stub.failure_rate = 1.0
+    for company in ("a", "b"):
+        cash = asyncio.run(hub.cashflow(company, 3))
+        assert cash["periods"] == [] and "503" in cash["providers"]["bank_a"]
+    assert hub.stats()["breakers"] == {"bank_a": "open", "bank_b": "open"}
+
+    requests = hub.stats()["requests"]
+    with pytest.raises(IntegrationError) as error:
+        asyncio.run(hub.fetch("bank_a", "/accounts/c/summary"))
+    assert error.value.status_code == 503 and error.value.reason == "circuit open"
+    assert hub.stats()["requests"] == requests and hub.stats()["short_circuited"] == 1
+
+    stub.failure_rate = 0.0
+    time.sleep(0.11)
+    asyncio.run(hub.fetch("bank_a", "/accounts/c/summary"))
+    assert hub.stats()["breakers"]["bank_a"] == "closed"
+
+
+def test_provider_timeouts_are_504():
+    def timeout(request):
+        raise httpx.ReadTimeout("slow", request=request)
+
+    hub = IntegrationHub([Provider("bank_a", "http://stub/bank-a", 0.1)], 1, 60, 5, 30)
+    hub._client = httpx.AsyncClient(transport=httpx.MockTransport(timeout))
+    with pytest.raises(IntegrationError) as error:
+        asyncio.run(hub.fetch("bank_a", "/accounts/x/summary"))
+    assert error.value.status_code == 504 and hub.stats()["failures"] == 1
+
+
+def test_unknown_or_unconfigured_providers():
+    hub = IntegrationHub([Provider("bank_a", "", 1.0, lambda: {"provider": "mock"})], 1, 60, 5, 30)
+    assert asyncio.run(hub.summary("bank_a", "x")) == {"provider": "mock"}
+    with pytest.raises(IntegrationError) as error:
+        asyncio.run(hub.fetch("bank_z", "/"))
+    assert error.value.status_code == 404
+    assert asyncio.run(hub.fan_out("/")) == {}
+
+
+def test_cash_flows_overlay_the_latest_records():
+    periods = [{"period": p, "cash_in": float(p), "cash_out": 1.0} for p in range(3)]
+    records = [{"revenue": 10.0}, {"revenue": 11.0}]
+    assert merge_cash_flows(records, periods) == [
+        {"revenue": 10.0, "cash_in": 1.0, "cash_out": 1.0},
+        {"revenue": 11.0, "cash_in": 2.0, "cash_out": 1.0},
+    ]
+    assert merge_cash_flows([], periods[:1]) == [{"revenue": 0.0, "expenses": 1.0, "cash_in": 0.0, "cash_out": 1.0}]
+
+
+def test_integrated_analysis_is_cached(client, stub, monkeypatch, financials):
+    monkeypatch.setattr(integration_hub, "providers", {
+        "bank_a": Provider("bank_a", "http://stub/bank-a", 1.0),
+        "bank_b": Provider("bank_b", "http://stub/bank-b", 1.0),
+    })
+    monkeypatch.setattr(integration_hub, "_client", _stub_client())
+    monkeypatch.setattr(integration_hub, "_cache", OrderedDict())
+
+    body = {"records": financials.tail(12).to_dict(orient="records"), "industry": "Retail"}
+    first = client.post("/integrations/acme/analyze", params={"periods": 6}, json=body)
+    assert first.status_code == 200
+    assert first.json()["providers"] == {"bank_a": "ok", "bank_b": "ok"}
+
+    hits = result_cache.stats()["hits"]
+    second = client.post("/integrations/acme/analyze", params={"periods": 6}, json=body)
+    assert second.json() == first.json()
+    assert result_cache.stats()["hits"] == hits + 1
+
+
+def test_integrated_analysis_without_cash_flows_is_502(client, stub, monkeypatch):
+    stub.failure_rate = 1.0
+    monkeypatch.setattr(integration_hub, "providers", {"bank_a": Provider("bank_a", "http://stub/bank-a", 1.0)})
+    monkeypatch.setattr(integration_hub, "breakers", {"bank_a": CircuitBreaker(5, 30)})
+    monkeypatch.setattr(integration_hub, "_client", _stub_client())
+    monkeypatch.setattr(integration_hub, "_cache", OrderedDict())
+    response = client.post("/integrations/acme/analyze", json={"records": [], "industry": "Retail"})
+    assert response.status_code == 502
+    assert "503" in response.json()["detail"]["providers"]["bank_a"]
@@ -0,0 +1,128 @@
+import os
+import time
+from datetime import timedelta
+
+import pytest
+
+from app import jobs, pipeline
+from app.db import SessionLocal
+from app.models import AnalysisJob
+from benchmarks.synthetic import to_bytes
+
+
+@pytest.fixture(autouse=True)
+def empty_queue(app):
+    def clear():
+        with SessionLocal() as db:
+            db.query(AnalysisJob).delete()
+            db.commit()
+
+    clear()
+    yield
+    clear()
+
+
+def _worker(**options) -> jobs.JobWorker:
+    defaults = {"concurrency": 1, "poll_interval": 0.05, "lease_seconds": 60, "max_attempts": 3, "timeout": 30,
+                "processes": False}
+    return jobs.JobWorker(**{**defaults, **options})
+
+
+def _submit(client, payload: bytes, filename: str = "q.csv") -> str:
+    response = client.post("/jobs", params={"industry": "Retail"}, files={"file": (filename, payload)})
+    assert response.status_code == 202
+    return response.json()["id"]
+
+
+def _job(job_id: str) -> AnalysisJob:
+    with SessionLocal() as db:
+        return db.get(AnalysisJob, job_id)
+
+
+def test_job_result_matches_a_direct_analysis(client, financials):
+    payload = to_bytes(financials, "csv")
+    job_id = _submit(client, payload)
+    assert client.get(f"/jobs/{job_id}/result").status_code == 202
+
+    worker = _worker()
+    worker._run(jobs.claim(worker.worker_id, 60, 3))
+    job = _job(job_id)
+    assert job.status == jobs.SUCCEEDED and job.progress == {"stage": "done"}
+    assert not os.path.exists(job.input_path)
+    assert worker.stats()["succeeded"] == 1
+
+    expected = client.post("/analyze", params={"industry": "Retail"}, files={"file": ("q.csv", payload)}).json()
+    assert client.get(f"/jobs/{job_id}/result").json() == expected
+
+    cached = client.post("/jobs", params={"industry": "Retail"}, files={"file": ("q.csv", payload)}).json()
+    assert cached["status"] == jobs.SUCCEEDED and cached["progress"]["cached"] is True
+
+
+def test_jobs_are_claimed_oldest_first_and_only_once(client, financials):
+    second = _submit(client, to_bytes(financials.head(6), "csv"))
+    first = _submit(client, to_bytes(financials.head(5), "csv"))
+    with SessionLocal() as db:  # created_at has one-second resolution on SQLite
+        db.get(AnalysisJob, first).created_at -= timedelta(minutes=1)
+        db.commit()
+    assert jobs.claim("w1", 60, 3)["id"] == first
+    assert jobs.claim("w2", 60, 3)["id"] == second
+    assert jobs.claim("w3", 60, 3) is None
+    assert (_job(first).worker, _job(second).worker) == ("w1", "w2")
+
+
+def test_lapsed_lease_is_reclaimed_and_the_old_worker_loses_the_job(client, financials):
+    job_id = _submit(client, to_bytes(financials, "csv"))
+    assert jobs.claim("w1", 0.05, 3)["id"] == job_id
+    assert jobs.claim("w2", 60, 3) is None
+
+    time.sleep(0.1)
+    assert jobs.claim("w2", 60, 3)["id"] == job_id
+    assert _job(job_id).attempts == 2
+    assert not jobs._finish(job_id, "w1", jobs.SUCCEEDED, result={})
+    assert jobs._finish(job_id, "w2", jobs.SUCCEEDED, result={"ok": True})
+    assert _job(job_id).result == {"ok": True}
+
+
+def test_jobs_are_abandoned_after_max_attempts(client, financials):
+    job_id = _submit(client, to_bytes(financials, "csv"))
+    for worker in ("w1", "w2"):
+        assert jobs.claim(worker, 0.01, 2)["id"] == job_id
+        time.sleep(0.02)
+    assert jobs.claim("w3", 60, 2) is None
+
+    response = client.get(f"/jobs/{job_id}/result")
+    assert response.status_code == 500
+    assert response.json()["detail"] == "Job abandoned after 2 attempts"
+
+
+def test_failed_analysis_keeps_its_status_code(client):
+    job_id = _submit(client, b"foo,bar\n1,2\n")
+    worker = _worker()
+    worker._run(jobs.claim(worker.worker_id, 60, 3))
+    assert _job(job_id).status == jobs.FAILED
+    assert client.get(f"/jobs/{job_id}/result").status_code == 400
+    assert worker.stats()["failed"] == 1
+
+
+def _hang(*args, **kwargs):
+    time.sleep(600)
+
+
+def test_job_past_its_timeout_fails_with_504_and_its_worker_is_killed(client, financials, monkeypatch):
+    # Pool workers are forked after this patch, so they run the hanging analysis
+    monkeypatch.setattr(pipeline, "analyze_upload", _hang)
+    job_id = _submit(client, to_bytes(financials, "csv"))
+    worker = _worker(timeout=0.5, processes=True)
+    pool = worker._get_pool()
+    pool.submit(os.getpid).result()  # start the worker process
+    processes = list(pool._processes.values())
+
+    started = time.monotonic()
+    worker._run(jobs.claim(worker.worker_id, 60, 3))
+    assert time.monotonic() - started < 5
+    assert _job(job_id).status == jobs.FAILED and _job(job_id).error["status_code"] == 504
+    assert worker.stats()["timed_out"] == 1 and worker.stats()["recycled"] == 1
+    for process in processes:
+        process.join(5)
+        assert not process.is_alive()
+    assert client.get(f"/jobs/{job_id}/result").status_code == 504
@@ -0,0 +1,107 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+
+from app.ledger import CLASSES, CategoryClassifier, aggregate_ledger, is_ledger, stream_ledger
+from benchmarks.synthetic import generate_ledger, to_bytes
+
+
+def _ledger() -> pd.DataFrame:
+    return pd.DataFrame({
+        "Date": ["2024-01-05", "2024-01-10", "2024-01-20", "2024-02-15", "2024-03-10", "2024-04-30", "bad"],
+        "Amount": [100.0, 50.0, -30.0, 60.0, 40.0, -20.0, 5.0],
+        "Category": ["Invoice", "Card Sales", "Office Rent", "Customer Payment", "Invoice", "Salaries", "Sales"],
+        "Customer": ["A", None, None, "A", "A", None, None],
+    })
+
+
+def test_ledgers_are_detected_by_their_columns():
+    assert is_ledger(["Date", "Amount", "Category"])
+    assert is_ledger(["txn_date", "Debit", "Credit"])
+    assert not is_ledger(["date", "debit"])
+    assert not is_ledger(["date", "amount", "revenue"])
+
+
+def test_categories_are_classified_once_with_overrides_first():
+    classifier = CategoryClassifier({"Card Sales": "ignore"})
+    assert CLASSES[classifier.classify("Card Sales")] == "ignore"
+    assert CLASSES[classifier.classify("Vendor Payment")] == "payment"
+    assert CLASSES[classifier.classify("GST Filing")] == "tax"
+    assert classifier.classify("Miscellaneous") == -1
+
+    codes = classifier.codes(pd.Series(["Miscellaneous", None, "Invoice"]), np.array([-5.0, 5.0, 5.0]))
+    assert [CLASSES[c] for c in codes] == ["expenses", "revenue", "receivable"]
+    with pytest.raises(ValueError, match="bogus"):
+        CategoryClassifier({"x": "bogus"})
+
+
+def test_transactions_fold_into_period_columns():
+    frame, totals, aging, dropped = aggregate_ledger([_ledger()])
+    assert dropped == 0
+    assert list(frame.columns) == ["revenue", "expenses", "cash_in", "cash_out", "ar"]
+    assert frame.to_dict(orient="list") == {
+        "revenue": [150.0, 0.0, 40.0, 0.0],
+        "expenses": [30.0, 0.0, 0.0, 20.0],
+        "cash_in": [50.0, 60.0, 0.0, 0.0],
+        "cash_out": [30.0, 0.0, 0.0, 20.0],
+        "ar": [100.0, 40.0, 80.0, 80.0],
+    }
+    assert totals["revenue"] == (190.0, 4)
+
+
+def test_receivables_are_aged_oldest_invoice_first():
+    _, _, aging, _ = aggregate_ledger([_ledger()])
+    # 60 of January's 100 was settled; the rest is ~90 days old at the last ledger date
+    assert aging == {"0-30": 40.0, "31-60": 0.0, "61-90": 40.0, "90+": 0.0, "total": 80.0}
+    cash_only = _ledger().loc[[1, 2, 5]]
+    assert aggregate_ledger([cash_only])[2] is None
+
+
+def test_debit_and_credit_columns_replace_a_signed_amount():
+    signed = _ledger().iloc[:6]
+    split = signed.drop(columns="Amount").assign(
+        Credit=signed["Amount"].clip(lower=0), Debit=(-signed["Amount"]).clip(lower=0)
+    )
+    assert aggregate_ledger([split])[0].equals(aggregate_ledger([signed])[0])
+
+
+def test_chunked_aggregation_matches_a_single_pass():
+    ledger = generate_ledger(transactions=5_000, months=12, customers=40, seed=3)
+    whole = aggregate_ledger([ledger])
+    chunked = aggregate_ledger(ledger.iloc[i:i + 700] for i in range(0, len(ledger), 700))
+    pd.testing.assert_frame_equal(chunked[0], whole[0])
+    assert chunked[2] == pytest.approx(whole[2])
+    assert len(whole[0]) == 12 and {"ap", "debt", "tax"} <= set(whole[0].columns)
+
+
+@pytest.mark.parametrize("fmt, filename", [("csv", "l.csv"), ("parquet", "l.parquet")])
+def test_streamed_ledger_matches_the_in_memory_fold(fmt, filename):
+    ledger = generate_ledger(transactions=3_000, months=12, customers=20, seed=4)
+    expected = aggregate_ledger([ledger], max_periods=6)
+    frame, totals, aging, dropped = stream_ledger(io.BytesIO(to_bytes(ledger, fmt)), filename, 500, 6)
+    pd.testing.assert_frame_equal(frame, expected[0])
+    assert dropped == 6 and totals.keys() == expected[1].keys()
+    for column, (total, count) in totals.items():
+        assert total == pytest.approx(expected[1][column][0]) and count == expected[1][column][1]
+    assert aging == pytest.approx(expected[2])
+
+
+def test_ledger_without_dated_amounts_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        aggregate_ledger([pd.DataFrame({"date": ["x"], "amount": [1.0]})])
+    assert error.value.status_code == 400
+
+
+def test_ledger_uploads_report_receivables_aging(client):
+    ledger = generate_ledger(transactions=2_000, months=6, customers=10, seed=5)
+    response = client.post(
+        "/analyze", params={"industry": "Retail"}, files={"file": ("ledger.csv", to_bytes(ledger, "csv"))}
+    )
+    assert response.status_code == 200
+    analysis = response.json()
+    aging = aggregate_ledger([ledger])[2]
+    assert analysis["receivables_aging"] == pytest.approx(aging)
+    assert analysis["dso_days"] > 0
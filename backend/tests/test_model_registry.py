@@ -0,0 +1,109 @@
+import json
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.db import SessionLocal
+from app.ml_analytics import PeerAnomalyDetector
+from app.model_registry import MANIFEST, ModelRegistry, load_training_frame
+from app.models import CompanyState
+
+
+def _periods(industry: str, rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    revenue = rng.normal(1000, 50, rows)
+    expenses = revenue * rng.normal(0.8, 0.02, rows)
+    return pd.DataFrame({
+        "industry": industry,
+        "revenue": revenue,
+        "expenses": expenses,
+        "cash_in": revenue * 0.95,
+        "cash_out": expenses * 1.02,
+    })
+
+
+def _rewrite_manifest(directory: str, version: str) -> None:
+    path = os.path.join(directory, MANIFEST)
+    with open(path) as fh:
+        manifest = json.load(fh)
+    manifest["version"] = version
+    with open(path, "w") as fh:
+        json.dump(manifest, fh)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_train_writes_models_for_industries_with_enough_periods(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    frame = pd.concat([_periods("Retail", 60), _periods("Services", 10)], ignore_index=True)
+    manifest = registry.train(frame, min_samples=50)
+
+    assert list(manifest["models"]) == ["Retail"]
+    assert manifest["models"]["Retail"]["samples"] == 60
+    assert registry.version == manifest["version"]
+    assert isinstance(registry.get("Retail"), PeerAnomalyDetector)
+    assert registry.get("Services") is None
+    assert registry.preload() == 1
+
+
+def test_missing_manifest_means_no_models(tmp_path):
+    registry = ModelRegistry(str(tmp_path / "absent"))
+    assert registry.version == "none"
+    assert registry.get("Retail") is None
+
+
+def test_manifest_change_swaps_version_and_reloads_models(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    registry.train(_periods("Retail", 60), min_samples=50)
+    first = registry.get("Retail")
+    assert registry.get("Retail") is first
+
+    _rewrite_manifest(str(tmp_path), "retrained")
+    assert registry.version == "retrained"
+    reloaded = registry.get("Retail")
+    assert reloaded is not None and reloaded is not first
+
+
+def test_training_frame_has_one_row_per_stored_period(app):
+    industry = f"test-{uuid.uuid4().hex[:8]}"
+    windows = [
+        {"revenue": [100.0, 110.0, 0.0], "expenses": [90.0, None, 5.0], "cash_in": [95.0, 100.0, 1.0]},
+        {"revenue": [200.0], "expenses": [150.0], "cash_out": [160.0]},
+        {"expenses": [1.0]},
+    ]
+    with SessionLocal() as session:
+        for window in windows:
+            session.add(CompanyState(
+                company_id=uuid.uuid4().hex, industry=industry, periods=3, state={"window": window}
+            ))
+        session.commit()
+
+    frame = load_training_frame(batch_size=2)
+    frame = frame[frame["industry"] == industry].reset_index(drop=True)
+    assert frame.to_dict(orient="list") == {
+        "industry": [industry] * 3,
+        "revenue": [100.0, 110.0, 200.0],
+        "expenses": [90.0, 0.0, 150.0],
+        "cash_in": [95.0, 100.0, 200.0],
+        "cash_out": [90.0, 0.0, 160.0],
+    }
+
+
+def test_pretrained_detector_scores_single_periods():
+    detector = PeerAnomalyDetector()
+    detector.fit(_periods("Retail", 200).drop(columns="industry"))
+    periods = _periods("Retail", 12, seed=1).drop(columns="industry")
+    periods.loc[5, ["revenue", "cash_in"]] *= 5
+    flagged = detector.detect(periods)
+    assert any("period 6" in message for message in flagged)
+
+
+@pytest.mark.parametrize("industry", ["Retail", "Real Estate/REIT"])
+def test_model_files_are_named_by_industry_slug(tmp_path, industry):
+    manifest = ModelRegistry(str(tmp_path)).train(_periods(industry, 60), min_samples=50)
+    filename = manifest["models"][industry]["file"]
+    assert os.path.exists(tmp_path / filename)
+    assert "/" not in filename and " " not in filename
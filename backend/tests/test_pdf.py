@@ -0,0 +1,84 @@
+import io
+import os
+
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+
+from app import executor, pdf_extract
+from app.pdf_extract import RowCollector, extract_pdf_frame, shutdown_page_pool
+from benchmarks.synthetic import _text_pdf, generate_financials, to_bytes
+
+
+@pytest.fixture(scope="module")
+def upload():
+    df = generate_financials(rows=150, seed=6)
+    return pd.read_csv(io.BytesIO(to_bytes(df, "csv"))), to_bytes(df, "pdf")
+
+
+@pytest.fixture
+def page_pool(monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 2)
+    yield
+    shutdown_page_pool()
+
+
+def test_serial_extraction_matches_the_csv(upload):
+    expected, pdf = upload
+    frame = extract_pdf_frame(pdf, workers=1, pages_per_task=1, max_periods=0)
+    pd.testing.assert_frame_equal(frame, expected)
+
+
+def test_page_pool_extraction_matches_the_csv(upload, page_pool):
+    expected, pdf = upload
+    frame = extract_pdf_frame(pdf, workers=2, pages_per_task=1, max_periods=0)
+    pd.testing.assert_frame_equal(frame, expected)
+    assert pdf_extract._pool is not None and pdf_extract._pool_workers == 2
+
+
+def test_shutdown_terminates_the_page_pool(upload, page_pool):
+    extract_pdf_frame(upload[1], workers=2, pages_per_task=1, max_periods=0)
+    processes = list(pdf_extract._pool._processes.values())
+    shutdown_page_pool()
+    for process in processes:
+        process.join(5)
+        assert not process.is_alive()
+    assert pdf_extract._pool is None
+
+
+def test_pool_workers_parse_pages_serially(monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    assert pdf_extract._page_workers(16) == 8
+    monkeypatch.setattr(executor, "in_pool_worker", True)
+    assert pdf_extract._page_workers(16) == 0
+
+
+def test_extraction_stops_at_max_periods(upload):
+    expected, pdf = upload
+    frame = extract_pdf_frame(pdf, workers=1, pages_per_task=1, max_periods=70)
+    pd.testing.assert_frame_equal(frame, expected.head(70))
+
+
+def test_page_cap_and_non_tabular_pdfs_are_rejected(upload):
+    with pytest.raises(HTTPException) as error:
+        extract_pdf_frame(upload[1], workers=1, max_pages=1)
+    assert error.value.status_code == 400 and "limit is 1" in error.value.detail
+
+    with pytest.raises(HTTPException) as error:
+        extract_pdf_frame(_text_pdf(["Quarterly report", "no table here"]), workers=1)
+    assert error.value.status_code == 400
+
+
+def test_row_collector_emits_rows_in_page_order():
+    collector = RowCollector()
+    collector.add(1, [["200", "150"]])
+    assert collector.rows == []
+    collector.add(0, [["Revenue", "Expenses"], ["100", "90"], ["Revenue", "Expenses"], ["bad"]])
+    assert collector.rows == [["100", "90"], ["200", "150"]]
+    assert collector.to_frame().to_dict(orient="list") == {"Revenue": [100.0, 200.0], "Expenses": [90.0, 150.0]}
+
+
+def test_accounting_number_formats():
+    assert pdf_extract._to_number("₹1,200.50") == 1200.5
+    assert pdf_extract._to_number("(300)") == -300
+    assert pd.isna(pdf_extract._to_number("n/a"))
@@ -0,0 +1,96 @@
+import math
+import random
+import uuid
+
+import pytest
+
+from app import peers
+from app.peers import PeerIndex, SortedValues, revenue_band
+from app.persistence import AssessmentWriter
+
+
+def _percentile(values: list[float], value: float) -> float:
+    below = sum(v < value for v in values)
+    equal = sum(v == value for v in values)
+    return round(100.0 * (below + 0.5 * equal) / len(values), 2)
+
+
+def _store(analyses: list[dict]) -> None:
+    writer = AssessmentWriter(batch_size=len(analyses), flush_interval=0.05, max_queue=len(analyses))
+    writer.submit_many(analyses)
+    writer._write(writer._next_batch())
+
+
+def _analysis(industry: str, revenue: float, risk_score: float, **ratios) -> dict:
+    return {
+        "industry": industry, "revenue": revenue, "expenses": revenue * 0.9, "risk_score": risk_score,
+        "creditworthiness": "Good", "net_margin": 0.1, "current_ratio": 1.5, "dso_days": 30.0, "dscr": 2.0, **ratios,
+    }
+
+
+def test_sorted_values_rank_like_a_linear_scan(monkeypatch):
+    monkeypatch.setattr(peers, "MIN_RECENT_BUFFER", 8)
+    rng = random.Random(0)
+    values = SortedValues()
+    seen = []
+    for _ in range(300):
+        value = float(rng.randint(0, 50))
+        values.add(value)
+        seen.append(value)
+    values.replace(values.merged([1.5, 60.0]))
+    seen += [1.5, 60.0]
+
+    assert len(values) == len(seen)
+    for probe in (-1.0, 0.0, 1.5, 25.0, 50.0, 60.0, 61.0):
+        assert values.rank(probe) == (sum(v < probe for v in seen), seen.count(probe))
+
+
+@pytest.mark.parametrize("revenue, band", [
+    (None, None), (math.nan, None), (999_999.0, "<1M"), (1e6, "1M-10M"), (5e7, "10M-100M"), (2e8, "100M+"),
+])
+def test_revenue_bands(revenue, band):
+    assert revenue_band(revenue) == band
+
+
+def test_refresh_indexes_new_assessments_incrementally(app):
+    industry = f"test-{uuid.uuid4().hex[:8]}"
+    index = PeerIndex(min_peers=3, refresh_seconds=0)
+    index.refresh()
+    scores = [10.0, 20.0, 20.0, 40.0, 80.0]
+    _store([_analysis(industry, 5e6, score) for score in scores])
+
+    assert index.refresh() == 5
+    assert index.refresh() == 0
+    comparison = index.compare(_analysis(industry, 5e6, 20.0))
+    assert comparison["revenue_band"] == "1M-10M" and comparison["peers"] == 5
+    assert comparison["percentiles"]["risk_score"] == _percentile(scores, 20.0)
+
+    _store([_analysis(industry, 5e6, 90.0, dscr=math.inf)])
+    assert index.refresh() == 1
+    comparison = index.compare(_analysis(industry, 5e6, 20.0))
+    assert comparison["percentiles"]["risk_score"] == _percentile(scores + [90.0], 20.0)
+    assert comparison["percentiles"]["dscr"] == 50.0  # the infinite DSCR is not indexed
+
+
+def test_small_bands_fall_back_to_the_whole_industry():
+    index = PeerIndex(min_peers=3, refresh_seconds=0)
+    for revenue, score in ((5e5, 10.0), (5e5, 30.0), (5e6, 50.0), (5e7, 70.0)):
+        index.add("Retail", revenue, {"risk_score": score, "net_margin": math.nan})
+
+    comparison = index.compare({"industry": "Retail", "revenue": 5e5, "risk_score": 40.0, "net_margin": 0.1})
+    assert comparison["revenue_band"] is None and comparison["peers"] == 4
+    assert comparison["percentiles"] == {"risk_score": 50.0}
+    assert index.compare({"industry": "Services", "revenue": 5e5, "risk_score": 40.0}) is None
+    assert PeerIndex(min_peers=5, refresh_seconds=0).compare({"industry": "Retail", "risk_score": 1.0}) is None
+
+
+def test_responses_carry_peer_percentiles(client, financials, monkeypatch):
+    index = PeerIndex(min_peers=1, refresh_seconds=0)
+    for score in (0.0, 100.0):
+        index.add("Retail", None, {"risk_score": score})
+    monkeypatch.setattr("app.main.peer_index", index)
+
+    body = {"records": financials.to_dict(orient="records"), "industry": "Retail"}
+    peers_block = client.post("/analyze-json", json=body).json()["peers"]
+    assert peers_block["industry"] == "Retail" and peers_block["peers"] == 2
+    assert peers_block["percentiles"]["risk_score"] == 50.0
@@ -0,0 +1,60 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+
+from app.analysis import analyze_dataframe, analyze_portfolio
+from benchmarks.synthetic import generate_financials, to_bytes
+
+METRICS = ["revenue", "expenses", "net_margin", "current_ratio", "dso_days", "dscr", "risk_score", "default_probability"]
+
+
+def _single(df: pd.DataFrame, company_id: str, industry: str) -> dict:
+    rows = df[df["company_id"] == company_id].drop(columns=["company_id", "industry"], errors="ignore")
+    return analyze_dataframe(rows.reset_index(drop=True), industry, skip=frozenset({"forecast", "anomalies"}))
+
+
+def test_portfolio_matches_single_company_analysis():
+    df = generate_financials(rows=12, companies=5, industries=3, seed=3)
+    portfolio = analyze_portfolio(df)
+    assert len(portfolio) == 5
+    for company_id, row in portfolio.iterrows():
+        single = _single(df, company_id, row["industry"])
+        for metric in METRICS:
+            assert row[metric] == pytest.approx(single[metric], rel=1e-9, abs=1e-9), (company_id, metric)
+        assert row["creditworthiness"] == single["creditworthiness"]
+
+
+@pytest.mark.parametrize("debt", [[100.0, 200.0, None], [None, None, None], [np.inf, 1.0, 2.0], [0.0, 0.0, 0.0]])
+def test_portfolio_debt_edge_cases_match_single_company(debt):
+    df = pd.DataFrame({
+        "company_id": "a",
+        "revenue": [1000.0, 1001.0, 1002.0],
+        "expenses": 900.0,
+        "ar": 50.0,
+        "debt": debt,
+    })
+    row = analyze_portfolio(df, "Retail").loc["a"]
+    single = analyze_dataframe(df.drop(columns="company_id"), "Retail", skip=frozenset({"forecast", "anomalies"}))
+    assert math.isfinite(row["dscr"]) and math.isfinite(row["default_probability"])
+    for metric in ("dscr", "default_probability", "risk_score", "current_ratio"):
+        assert row[metric] == pytest.approx(single[metric], nan_ok=True), metric
+
+
+def test_portfolio_requires_the_id_column():
+    with pytest.raises(HTTPException) as error:
+        analyze_portfolio(pd.DataFrame({"revenue": [1.0], "expenses": [1.0]}))
+    assert error.value.status_code == 400
+    assert "company_id" in error.value.detail
+
+
+def test_analyze_batch_endpoint(client):
+    df = generate_financials(rows=6, companies=4, industries=2, seed=5)
+    response = client.post("/analyze-batch", files={"file": ("portfolio.csv", to_bytes(df, "csv"))})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["companies"] == 4
+    assert sum(body["tiers"].values()) == 4
+    assert sorted(result["company_id"] for result in body["results"]) == sorted(df["company_id"].unique())
@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+from app.analysis import _credit_tier, _risk_score
+from app.config import settings
+from app.db import SessionLocal
+from app.ml_analytics import CreditRiskPredictor
+from app.models import Assessment
+from app.persistence import AssessmentWriter
+from app.sensitivity import analyze_sensitivity
+
+BASE = {
+    "industry": "Retail", "revenue": 1000.0, "expenses": 900.0, "net_cashflow": 100.0, "net_margin": 0.1,
+    "current_ratio": 1.5, "dso_days": 66.0, "dscr": 1.0, "debt": 100.0,
+}
+
+
+def _ratios(base: dict, **changes) -> dict:
+    """The four risk ratios after ``changes``, recomputed from the base amounts"""
+    expenses = base["expenses"] * (1 + changes.get("expenses", 0.0))
+    cashflow = base["net_cashflow"] - (expenses - base["expenses"])
+    return {
+        "net_margin": base["net_margin"] + changes.get("net_margin", 0.0) - (expenses - base["expenses"]) / base["revenue"],
+        "current_ratio": base["current_ratio"] + changes.get("current_ratio", 0.0),
+        "dso_days": base["dso_days"] + changes.get("dso_days", 0.0),
+        "dscr": (base["dscr"] * cashflow / base["net_cashflow"] + changes.get("dscr", 0.0))
+        / (1 + changes.get("debt", 0.0)),
+    }
+
+
+def test_grid_points_match_the_scalar_scores():
+    axes = [{"input": "expenses", "changes": [-0.05, 0.0, 0.02]}, {"input": "debt", "changes": [-0.5, 0.0, 1.0, 3.0]}]
+    grid = analyze_sensitivity(BASE, axes)["grid"]
+    assert grid["shape"] == [3, 4] and grid["inputs"] == ["expenses", "debt"]
+    for i, expenses in enumerate(axes[0]["changes"]):
+        for j, debt in enumerate(axes[1]["changes"]):
+            ratios = _ratios(BASE, expenses=expenses, debt=debt)
+            risk = _risk_score(**ratios)
+            assert grid["risk_score"][i][j] == pytest.approx(risk, abs=0.011)
+            assert grid["creditworthiness"][i][j] == _credit_tier(grid["risk_score"][i][j])
+            assert grid["default_probability"][i][j] == pytest.approx(
+                CreditRiskPredictor.predict_default_probability(ratios), abs=0.011
+            )
+
+
+def test_slopes_follow_the_risk_terms():
+    result = analyze_sensitivity(BASE, [])
+    assert result["grid"] is None
+    assert result["base"]["risk_score"] == _risk_score(**_ratios(BASE))
+    slopes = {name: value["risk_score"] for name, value in result["jacobian"].items()}
+    assert slopes["net_margin"] == pytest.approx(25 / 0.15)
+    assert slopes["dso_days"] == pytest.approx(-25 / 120)
+    assert slopes["dscr"] == pytest.approx(12.5)
+    assert slopes["debt"] == pytest.approx(-12.5)
+    assert slopes["expenses"] == pytest.approx(-0.9 * 25 / 0.15 - 9 * 12.5)
+    assert result["jacobian"]["current_ratio"]["default_probability"] == pytest.approx(-20.0)
+
+
+def test_break_evens_are_where_the_tier_flips():
+    result = analyze_sensitivity(BASE, [])
+    assert result["base"]["creditworthiness"] == "High Risk"
+    assert [point["tier"] for point in result["break_evens"]["net_margin"]] == ["Fair"]  # saturates at 57.08
+    assert result["break_evens"]["dso_days"] == [
+        {"tier": "Fair", "risk_score": 50.0, "change": pytest.approx(-6.0, abs=0.05), "value": pytest.approx(60.0, abs=0.05)}
+    ]
+    for name, points in result["break_evens"].items():
+        for point in points:
+            scores = [_risk_score(**_ratios(BASE, **{name: point["change"] + step})) for step in (-1e-4, 1e-4)]
+            assert min(scores) < point["risk_score"] <= max(scores)
+    debt = result["break_evens"]["debt"][0]
+    assert debt["value"] == pytest.approx(BASE["debt"] * (1 + debt["change"]))
+
+
+def test_without_debt_the_debt_input_is_not_offered():
+    base = {**BASE, "dscr": 2.0, "debt": None}
+    result = analyze_sensitivity(base, [])
+    assert "debt" not in result["jacobian"] and "debt" not in result["break_evens"]
+    assert result["jacobian"]["expenses"]["risk_score"] == pytest.approx(-0.9 * 25 / 0.15)
+    with pytest.raises(HTTPException) as error:
+        analyze_sensitivity(base, [{"input": "debt", "changes": [0.1]}])
+    assert error.value.status_code == 400 and "no debt" in error.value.detail
+
+
+@pytest.mark.parametrize("axes", [
+    [{"input": "nope", "changes": [0.1]}],
+    [{"input": "dscr", "changes": [0.1]}, {"input": "dscr", "changes": [0.2]}],
+    [{"input": "expenses", "changes": [-1.0]}],
+    [{"input": "dscr", "changes": [np.nan]}],
+])
+def test_invalid_axes_are_rejected(axes):
+    with pytest.raises(HTTPException) as error:
+        analyze_sensitivity(BASE, axes)
+    assert error.value.status_code == 400
+
+
+def test_oversized_grids_are_rejected(monkeypatch):
+    monkeypatch.setattr(settings, "sensitivity_max_points", 5)
+    axes = [{"input": "dscr", "changes": [0.0, 0.1, 0.2]}, {"input": "dso_days", "changes": [0.0, 10.0]}]
+    with pytest.raises(HTTPException) as error:
+        analyze_sensitivity(BASE, axes)
+    assert "6 points" in error.value.detail
+
+
+def test_endpoint_starts_from_a_response_or_a_stored_assessment(client, financials):
+    analysis = client.post(
+        "/analyze-json", json={"records": financials.to_dict(orient="records"), "industry": "Retail"}
+    ).json()
+    body = {"base": analysis, "axes": [{"input": "dso_days", "changes": [-10.0, 0.0, 10.0]}]}
+    from_response = client.post("/sensitivity", json=body).json()
+    assert from_response["base"]["risk_score"] == analysis["risk_score"]
+    assert from_response["base"]["default_probability"] == analysis["default_probability"]
+    assert from_response["grid"]["risk_score"][1] == analysis["risk_score"]
+
+    writer = AssessmentWriter(batch_size=1, flush_interval=0.05, max_queue=1)
+    writer.submit(analysis)
+    writer._write(writer._next_batch())
+    with SessionLocal() as db:
+        assessment_id = db.scalar(select(func.max(Assessment.id)))
+    stored = client.post("/sensitivity", json={"assessment_id": assessment_id, "axes": body["axes"]}).json()
+    assert stored == from_response
+
+    assert client.post("/sensitivity", json={"assessment_id": 10**9}).status_code == 404
+    assert client.post("/sensitivity", json={"axes": []}).status_code == 400
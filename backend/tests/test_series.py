@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.analysis import _column_totals, _prepare_series, analyze_dataframe
+from app.ml_analytics import AnomalyDetector
+from app.series import FinancialSeries
+
+
+def test_float_columns_are_shared_read_only():
+    df = pd.DataFrame({"revenue": [1.0, 2.0, 3.0], "expenses": np.array([1, 1, 2], dtype=np.float32), "ar": [1, 2, 3]})
+    series = FinancialSeries.from_frame(df)
+    assert np.shares_memory(series.revenue, df["revenue"].to_numpy())
+    assert series.expenses.dtype == np.float32 and np.shares_memory(series.expenses, df["expenses"].to_numpy())
+    assert series.ar.dtype == np.float64 and series.ap is None
+    assert series.columns == ("revenue", "expenses", "ar") and len(series) == 3
+    with pytest.raises(ValueError):
+        series.revenue[0] = 5.0
+    assert df["revenue"].to_numpy().flags.writeable  # the frame itself stays writable
+
+
+def test_aliases_point_at_the_frame_column():
+    df = pd.DataFrame({"Sales": [10.0, 20.0], "Cost": [5.0, 6.0], "Receivables": [1.0, 2.0]})
+    series = _prepare_series(df)
+    assert np.shares_memory(series.revenue, df["Sales"].to_numpy())
+    assert np.shares_memory(series.expenses, df["Cost"].to_numpy())
+    assert list(df.columns) == ["Sales", "Cost", "Receivables"]
+    assert analyze_dataframe(df, "Retail")["revenue"] == 30.0
+
+
+def test_non_numeric_values_become_nan():
+    series = FinancialSeries.from_arrays({"revenue": pd.Series(["1", "x", None]), "other": [1, 2, 3]})
+    assert np.isnan(series.revenue[1:]).all() and series.columns == ("revenue",)
+    with pytest.raises(ValueError, match="same length"):
+        FinancialSeries.from_arrays({"revenue": [1.0], "expenses": [1.0, 2.0]})
+    assert len(FinancialSeries.from_arrays({})) == 0
+
+
+def test_totals_skip_nans_like_the_frame_path():
+    df = pd.DataFrame({"revenue": [1.0, np.nan, 3.0], "expenses": [1.0, 2.0, 3.0]})
+    series = FinancialSeries.from_frame(df)
+    assert series.totals() == _column_totals(df) == {"revenue": (4.0, 2), "expenses": (6.0, 3)}
+    assert series.totals(["ar"]) == {}
+
+
+def test_get_stack_and_of():
+    series = FinancialSeries.from_arrays({"revenue": [1.0, 2.0], "expenses": [3.0, 4.0]})
+    default = np.zeros(2)
+    assert series.get("ar", default) is default and series.get("nope") is None
+    np.testing.assert_array_equal(series.stack(["expenses", "revenue"], np.float32), [[3.0, 4.0], [1.0, 2.0]])
+    assert FinancialSeries.of(series) is series
+
+
+def test_detector_reads_a_series_like_its_frame(financials):
+    frame_result = AnomalyDetector().fit_detect(financials)
+    series_result = AnomalyDetector().fit_detect(FinancialSeries.from_frame(financials))
+    assert series_result == frame_result
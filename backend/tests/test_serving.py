@@ -0,0 +1,92 @@
+import io
+import json
+import os
+import signal
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app import serving
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture
+def cpu_quota(monkeypatch):
+    """Set the cgroup ``cpu.max`` this process sees (None: no cgroup file)"""
+    real_open = open
+
+    def set_quota(text):
+        def fake_open(path, *args, **kwargs):
+            if path == "/sys/fs/cgroup/cpu.max":
+                if text is None:
+                    raise FileNotFoundError(path)
+                return io.StringIO(text)
+            return real_open(path, *args, **kwargs)
+
+        monkeypatch.setattr(serving, "open", fake_open, raising=False)
+
+    monkeypatch.setattr(os, "sched_getaffinity", lambda pid: set(range(8)))
+    return set_quota
+
+
+@pytest.mark.parametrize("quota, cores", [(None, 8), ("max 100000\n", 8), ("150000 100000\n", 2), ("5000 100000", 1)])
+def test_available_cores_respects_affinity_and_cgroup_quota(cpu_quota, quota, cores):
+    cpu_quota(quota)
+    assert serving.available_cores() == cores
+    assert serving.worker_count() == cores
+    assert serving.worker_count(3) == 3
+
+
+def test_native_thread_caps_keep_explicit_settings(monkeypatch):
+    for name in serving.THREAD_POOL_ENV:
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("MKL_NUM_THREADS", "4")
+    serving.cap_native_threads(0)
+    assert os.environ["OMP_NUM_THREADS"] == "1"
+    assert os.environ["MKL_NUM_THREADS"] == "4"
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/smaps_rollup"), reason="needs /proc/self/smaps_rollup")
+def test_private_bytes_excludes_pages_shared_with_the_parent():
+    ballast = bytearray(os.urandom(64 * 2**20))
+    parent = serving.private_bytes()
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.write(write_end, str(serving.private_bytes()).encode())
+        os._exit(0)
+    os.close(write_end)
+    child = int(os.read(read_end, 64))
+    os.waitpid(pid, 0)
+    os.close(read_end)
+    assert parent > len(ballast)
+    assert child < parent - len(ballast) // 2
+
+
+def test_watchdog_signals_its_own_worker_past_the_limit(monkeypatch):
+    signals = []
+    monkeypatch.setattr(os, "kill", lambda pid, signum: signals.append((pid, signum)))
+    serving.MemoryWatchdog(max_bytes=1, interval=0.01)._run()
+    assert signals == [(os.getpid(), signal.SIGTERM)]
+
+
+def test_gunicorn_config_preloads_and_sizes_workers():
+    code = (
+        "import json, os, runpy\n"
+        "config = runpy.run_path('gunicorn.conf.py')\n"
+        "keys = ['workers', 'worker_class', 'preload_app', 'max_requests']\n"
+        "print(json.dumps({**{k: config[k] for k in keys}, 'omp': os.environ['OMP_NUM_THREADS'],"
+        " 'analysis_workers': os.environ['ANALYSIS_WORKERS']}))\n"
+    )
+    env = {k: v for k, v in os.environ.items() if k not in serving.THREAD_POOL_ENV and k != "ANALYSIS_WORKERS"}
+    env.update({"WEB_CONCURRENCY": "3", "BLAS_THREADS": "2", "PYTHONPATH": str(BACKEND)})
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND, env=env, capture_output=True, text=True,
+                            timeout=60)
+    assert result.returncode == 0, result.stderr
+    config = json.loads(result.stdout)
+    assert config["workers"] == 3 and config["preload_app"] is True
+    assert config["worker_class"] == "uvicorn.workers.UvicornWorker"
+    assert config["omp"] == "2" and config["analysis_workers"] == "0"
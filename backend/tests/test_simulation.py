@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from app.analysis import TOTAL_COLUMNS, _headline_metrics, _prepare_series, _risk_score, _risk_score_array, simulate_dataframe
+from app.ml_analytics import MonteCarloSimulator
+
+
+def test_same_seed_reproduces_the_distribution(financials):
+    first = simulate_dataframe(financials, paths=2000, horizon=3, seed=7)
+    assert simulate_dataframe(financials, paths=2000, horizon=3, seed=7) == first
+    assert simulate_dataframe(financials, paths=2000, horizon=3, seed=8) != first
+
+
+def test_summaries_are_ordered_percentiles(financials):
+    result = simulate_dataframe(financials, paths=5000, horizon=3, seed=1)
+    assert result["paths"] == 5000
+    for metric in ("net_margin", "dscr", "current_ratio", "dso_days", "risk_score"):
+        percentiles = [result[metric][f"p{q}"] for q in MonteCarloSimulator.PERCENTILES]
+        assert percentiles == sorted(percentiles), metric
+    for probability in ("probability_negative_margin", "probability_dscr_below_1", "probability_high_risk"):
+        assert 0.0 <= result[probability] <= 1.0
+    assert 0 <= result["risk_score"]["p1"] <= result["risk_score"]["p99"] <= 100
+
+
+def test_shocks_follow_the_company_history(financials):
+    mean, cov = MonteCarloSimulator()._shock_distribution(_prepare_series(financials))
+    revenue = financials["revenue"].to_numpy()
+    expenses = financials["expenses"].to_numpy()
+    changes = np.vstack([np.diff(np.log(revenue)), np.diff(np.log(expenses))])
+    assert mean[:2] == pytest.approx(changes.mean(axis=1))
+    assert cov[:2, :2] == pytest.approx(np.cov(changes))
+
+
+def test_short_or_non_positive_history_uses_default_shocks(financials):
+    simulator = MonteCarloSimulator()
+    default = simulator.DEFAULT_CORRELATION * np.outer(simulator.DEFAULT_VOLATILITY, simulator.DEFAULT_VOLATILITY)
+    for frame in (financials.head(3), financials.assign(revenue=financials["revenue"] * -1)):
+        mean, cov = simulator._shock_distribution(_prepare_series(frame))
+        assert mean == pytest.approx(np.zeros(3))
+        assert cov == pytest.approx(default)
+
+
+def test_zero_volatility_reproduces_the_base_metrics(financials):
+    series = _prepare_series(financials)
+    base = _headline_metrics(series.totals(TOTAL_COLUMNS))
+    result = MonteCarloSimulator(paths=10, horizon=1).simulate(
+        None, base, _risk_score_array, distribution=(np.zeros(3), np.zeros((3, 3)))
+    )
+    assert result["net_margin"]["std"] == pytest.approx(0, abs=1e-12)
+    assert result["net_margin"]["mean"] == pytest.approx(base["net_margin"])
+    assert result["risk_score"]["mean"] == pytest.approx(
+        _risk_score(base["net_margin"], base["current_ratio"], base["dso_days"], base["dscr"]), abs=0.01
+    )
+
+
+def test_simulate_endpoint(client, financials):
+    body = {"records": financials.to_dict(orient="records"), "industry": "Retail"}
+    response = client.post("/simulate-json", params={"paths": 500, "horizon": 2, "seed": 3}, json=body)
+    assert response.status_code == 200
+    assert response.json()["paths"] == 500 and response.json()["horizon"] == 2
+    assert client.post("/simulate-json", params={"paths": 0}, json=body).status_code == 422
@@ -0,0 +1,57 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+HEAVY = ["numpy", "pandas", "scipy", "sklearn", "pdfplumber"]
+SERVERLESS_DEFAULTS = {"WARMUP_ON_STARTUP": "false", "ANALYSIS_WORKERS": "0", "JOB_WORKERS": "0", "PEER_REFRESH_SECONDS": "0"}
+
+
+def _run(code: str, cwd: Path, **env: str) -> dict:
+    """Run ``code`` in a fresh interpreter (this one has the analytics stack loaded) and parse its JSON output"""
+    environment = {key: value for key, value in os.environ.items() if key not in SERVERLESS_DEFAULTS}
+    environment.update(env)
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=cwd, env=environment, capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_lightweight_routes_do_not_load_the_analytics_stack():
+    loaded = _run(
+        "import json, sys\n"
+        "from fastapi.testclient import TestClient\n"
+        "from app.main import app\n"
+        "with TestClient(app) as client:\n"
+        "    assert client.get('/health').status_code == 200\n"
+        "    report = client.get('/startup').json()\n"
+        f"print(json.dumps({{'loaded': [m for m in {HEAVY!r} if m in sys.modules], 'report': report}}))\n",
+        BACKEND,
+        PYTHONPATH=str(BACKEND),
+        **SERVERLESS_DEFAULTS,
+    )
+    assert loaded["loaded"] == []
+    assert loaded["report"]["warmed"] is False
+    assert loaded["report"]["app_import_seconds"] > 0
+
+
+def test_serverless_entry_point_defaults_to_no_background_work():
+    entry = _run(
+        "import json, os, sys\n"
+        "from api.index import app\n"
+        f"print(json.dumps({{'env': {{n: os.environ[n] for n in {list(SERVERLESS_DEFAULTS)!r}}}, 'root_path': app.root_path,"
+        f" 'loaded': [m for m in {HEAVY!r} if m in sys.modules]}}))\n",
+        BACKEND.parent,
+    )
+    assert entry["env"] == SERVERLESS_DEFAULTS
+    assert entry["root_path"] == "/api"
+    assert entry["loaded"] == []
+
+
+def test_warmup_reports_import_timings(client):
+    report = client.post("/warmup").json()
+    assert report["warmed"] is True and report["warm_up_seconds"] >= 0
+    assert client.get("/startup").json()["warmed"] is True
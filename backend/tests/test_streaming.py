@@ -0,0 +1,61 @@
+import io
+import re
+
+import pytest
+from fastapi import HTTPException
+
+from app.analysis import _column_totals, _normalize_columns, analyze_dataframe
+from app.config import settings
+from app.ingest import stream_tabular
+from app.pipeline import analyze_upload
+from benchmarks.synthetic import generate_financials, to_bytes
+
+HEADLINE = ["revenue", "expenses", "net_margin", "net_cashflow", "current_ratio", "dso_days", "dscr", "risk_score"]
+
+
+def _periods(anomalies: list[str]) -> list[int]:
+    return [int(re.search(r"period (\d+)", text).group(1)) for text in anomalies]
+
+
+@pytest.mark.parametrize("fmt", ["csv", "xlsx"])
+def test_stream_totals_cover_every_row_and_keep_a_trailing_window(fmt):
+    df = generate_financials(rows=50, seed=2)
+    frame, totals, dropped = stream_tabular(io.BytesIO(to_bytes(df, fmt)), f"upload.{fmt}", chunksize=7, max_periods=20)
+
+    expected = _column_totals(_normalize_columns(df))
+    for column, (total, count) in expected.items():
+        assert totals[column][0] == pytest.approx(total)
+        assert totals[column][1] == count
+    assert len(frame) == 20
+    assert dropped == 30
+    assert frame["revenue"].to_numpy() == pytest.approx(df["revenue"].to_numpy()[-20:], rel=1e-6)
+
+
+def test_streamed_upload_matches_in_memory_analysis(monkeypatch):
+    df = generate_financials(rows=120, seed=4)
+    monkeypatch.setattr(settings, "stream_chunk_rows", 25)
+    monkeypatch.setattr(settings, "stream_max_periods", 40)
+
+    streamed = analyze_upload("upload.csv", to_bytes(df, "csv"), "Retail")
+    full = analyze_dataframe(df, "Retail")
+    for metric in HEADLINE:
+        assert streamed[metric] == pytest.approx(full[metric], rel=1e-6), metric
+
+
+def test_streamed_anomalies_are_numbered_within_the_whole_upload(monkeypatch):
+    df = generate_financials(rows=300, seed=4)
+    df.loc[250, "revenue"] *= 40
+    monkeypatch.setattr(settings, "stream_chunk_rows", 30)
+    monkeypatch.setattr(settings, "stream_max_periods", 100)
+
+    periods = _periods(analyze_upload("upload.csv", to_bytes(df, "csv"), "Retail")["anomalies"])
+    assert 251 in periods
+    assert all(200 < period <= 300 for period in periods)
+    assert 251 in _periods(analyze_dataframe(df, "Retail")["anomalies"])
+
+
+def test_stream_requires_revenue_and_expenses():
+    with pytest.raises(HTTPException) as error:
+        stream_tabular(io.BytesIO(b"date,amount_due\n2024-01,5\n"), "upload.csv")
+    assert error.value.status_code == 400
+    assert "revenue" in error.value.detail
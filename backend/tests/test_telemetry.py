@@ -0,0 +1,80 @@
+import time
+
+from app import telemetry
+from app.config import settings
+from app.profiler import SamplingProfiler
+from benchmarks.synthetic import to_bytes
+
+
+def _busy(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_histogram_renders_cumulative_buckets_and_escapes_labels():
+    histogram = telemetry.Histogram("test_seconds", "Test", (0.1, 1.0), ("stage",))
+    for value in (0.05, 0.5, 0.7, 5.0):
+        histogram.observe(value, stage='say "hi"\n')
+    assert histogram.render() == [
+        "# HELP test_seconds Test",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{stage="say \\"hi\\"\\n",le="0.1"} 1',
+        'test_seconds_bucket{stage="say \\"hi\\"\\n",le="1"} 3',
+        'test_seconds_bucket{stage="say \\"hi\\"\\n",le="+Inf"} 4',
+        'test_seconds_sum{stage="say \\"hi\\"\\n"} 6.25',
+        'test_seconds_count{stage="say \\"hi\\"\\n"} 4',
+    ]
+
+
+def test_collected_observations_are_recorded_later():
+    def work():
+        with telemetry.span("test_collect"):
+            return 42
+
+    before = telemetry.render().count('stage="test_collect"')
+    result, observations = telemetry.collect(work)
+    assert result == 42 and [name for name, _, _ in observations] == ["finhealth_stage_seconds"]
+    assert telemetry.render().count('stage="test_collect"') == before
+
+    telemetry.record(observations)
+    assert telemetry.render().count('stage="test_collect"') > before
+
+
+def test_file_type_label_has_a_fixed_set_of_values():
+    assert telemetry.file_type("Q1.XLS") == "xlsx"
+    assert telemetry.file_type("data.feather") == "arrow"
+    assert telemetry.file_type('x.csv"} 1\nfake_metric') == "other"
+    assert telemetry.file_type("no-extension") == "other"
+
+
+def test_metrics_endpoint_reports_stages_and_request_sizes(client, financials):
+    response = client.post("/analyze", files={"file": ("q.csv", to_bytes(financials, "csv"))})
+    assert response.status_code == 200
+
+    text = client.get("/metrics").text
+    for stage in ("upload_read", "parse", "normalize", "metrics", "forecast", "anomaly_detection", "credit_scoring"):
+        assert f'finhealth_stage_seconds_count{{stage="{stage}"}}' in text, stage
+    assert 'finhealth_request_seconds_count{route="/analyze",file_type="csv"}' in text
+    assert 'finhealth_payload_bytes_count{route="/analyze",file_type="csv"}' in text
+    assert 'finhealth_rows_count{file_type="csv"}' in text
+    assert "# TYPE finhealth_cache_hits_total gauge" in text
+
+
+def test_profiling_is_opt_in(client, financials, monkeypatch):
+    body = {"records": financials.to_dict(orient="records"), "industry": "Retail"}
+    assert "X-Profile-Id" not in client.post("/analyze-json", params={"profile": True}, json=body).headers
+
+    monkeypatch.setattr(settings, "profiling_enabled", True)
+    response = client.post("/analyze-json", params={"profile": True}, json=body)
+    profile = client.get(f"/profiles/{response.headers['X-Profile-Id']}").json()
+    assert profile["samples"] >= 0 and "top_cumulative" in profile
+    assert client.get("/profiles/unknown").status_code == 404
+
+
+def test_sampling_profiler_attributes_time_to_the_running_function():
+    with SamplingProfiler(interval=0.002) as profiler:
+        _busy(0.2)
+    summary = profiler.summary()
+    assert summary["samples"] > 10
+    assert "_busy" in summary["top_self"][0]["function"]
@@ -183,7 +183,7 @@ export default function App() {
                 ref={fileInputRef}
                 className="file-input"
                 type="file"
-                accept=".csv,.xlsx,.xls,.pdf"
+                accept=".csv,.xlsx,.xls,.pdf,.parquet,.arrow,.feather"
                 onChange={(e) => {
                   const selected = e.target.files?.[0] || null;
                   setFile(selected);